@@ -1,30 +1,46 @@
 import os
 import json
-import pandas as pd
-import google.generativeai as genai
+import asyncio
 from io import StringIO
-import time
 import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
-import pickle
-from multiprocessing import Pool, cpu_count, freeze_support
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import cpu_count, freeze_support
 import argparse
 import csv
 from datetime import datetime
+from functools import lru_cache, partial
+from utils.gemini_pipeline import (
+    GEMINI_API_BASE, GEMINI_MODEL, GeminiClient, RateLimiter, AdaptiveConcurrency, ChunkingPipeline,
+)
+from utils.table_cache import TABLE_CACHE_DIR, TableCache
+from utils.table_chunker import DEFAULT_REGULARITY_THRESHOLD, analyze_table, structural_chunks
+from utils.download_manifest import DownloadManifest, MANIFEST_FILE, MANIFEST_PATH
+from utils.chunk_checkpoint import CHUNKS_CHECKPOINT_FILE, LEGACY_CHECKPOINT_FILE, ChunkCheckpoint
+from utils.embedding_cache import EMBEDDING_CACHE_DIR, EmbeddingCache
+from utils.embedding_backend import EMBEDDING_BACKENDS, cache_key, load_embedding_model, parity_check
+from utils.lexical_index import LEXICAL_INDEX_DIR, append_from_store, build_from_store
+from utils.table_router import TABLE_ROUTER_DIR, append_table_router, build_table_router
+from utils.chunk_store import CHUNK_STORE_DIR, ChunkStore, ChunkStoreWriter, write_chunk_store, append_chunks, new_build_id
+from utils.faiss_index import (
+    INDEX_FILE, INDEX_TYPES, DEFAULT_INDEX_PARAMS, build_index, write_index, params_path,
+    load_index, is_id_mapped, remove_vectors, create_index, train_index, add_vectors, apply_search_params,
+    VECTORS_FILE, needs_rescore, write_vectors, append_vectors, replace_vectors, delete_vectors_file, read_vectors_build_id, write_vectors_meta,
+)
 
 # --- KONTROL NOKTASI VE LOG DOSYA ADLARI ---
-PROCESSED_LOG_FILE = 'processed_files.log'
+# İşlenen dosyalar ve chunk'ları tek bir kontrol noktasında tutulur (bkz. utils/chunk_checkpoint.py)
 FAILED_LOG_FILE = 'failed_files.log'
-CHUNKS_CHECKPOINT_FILE = 'all_chunks.pkl'
+EMBEDDING_MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
+# Akış modunda vektörlerin biriktirildiği bellek eşlemeli geçici dosya
+EMBEDDINGS_SPILL_FILE = 'tuik_embeddings.npy'
 
 # ==============================================================================
 # FONKSİYON 1: Tüm Dosya Bilgilerini Yükleme
 # ==============================================================================
 def load_all_files_from_data_json():
     """
-    data.json dosyasını okur ve her dosya için tam yolunu ve kategori adını
-    içeren bir liste döndürür.
+    data.json dosyasını okur ve her dosya için tam yolunu, kategori adını ve kategori
+    klasörünü (sunucudaki kategori filtresinde kullanılır) içeren bir liste döndürür.
     """
     print("data.json okunuyor ve dosya yolları hazırlanıyor...")
     try:
@@ -45,7 +61,8 @@ def load_all_files_from_data_json():
             if os.path.exists(full_path):
                 file_info_list.append({
                     "path": full_path,
-                    "category": kategori_adi
+                    "category": kategori_adi,
+                    "kategori": kategori_folder
                 })
     print(f"Toplam {len(file_info_list)} adet Excel dosyası bulundu.")
     return file_info_list
@@ -66,97 +83,393 @@ def log_failure(file_info, error_message):
         writer.writerow([timestamp, category_name, file_basename, str(error_message)])
 
 # ==============================================================================
-# FONKSİYON 3: Gemini ile Chunk Oluşturma (Tekrar Deneme Mekanizmalı)
+# FONKSİYON 3: Tabloyu Hazırlama (CPU Yoğun, Ayrı İşlemde Çalışır)
 # ==============================================================================
-def get_llm_chunks_from_gemini(table_as_csv_string: str, file_name: str, max_retries: int = 3) -> list:
-    model = genai.GenerativeModel('gemini-2.5-pro')
-    prompt = f"""
-    Sen, karmaşık ve düzensiz TÜİK Excel tablolarını analiz etme konusunda uzman bir veri analistisin.
-    Görevin, sana CSV formatında verilen bir tabloyu inceleyip, içindeki her anlamlı veri noktasını,
-    kendi başına bir anlam ifade eden, bağlamı zenginleştirilmiş tam bir cümleye dönüştürmektir.
-    - Sadece gerçek veri içeren satırlara odaklan.
-    - Sonucu, her cümlenin bir eleman olduğu bir JSON Array (liste) olarak döndür.
-    - Sadece ve sadece JSON listesini döndür, başka hiçbir açıklama veya metin ekleme.
-    İşte analiz edilecek tablo. Dosya Adı: {file_name}\n\nTablo (CSV Formatı):\n{table_as_csv_string}
+def prepare_table(file_path, regularity_threshold=DEFAULT_REGULARITY_THRESHOLD, table_cache_dir=TABLE_CACHE_DIR):
     """
-    for attempt in range(max_retries):
+    Sadeleştirilmiş tabloyu önbellekten (yoksa Excel dosyasından) okur. Tablo düzenli bir
+    başlık x satır ızgarasıysa (skor >= `regularity_threshold`) tüm hücreleri yerel olarak
+    chunk listesine dönüştürür; değilse ilk 250 satırı Gemini için CSV metni olarak döndürür.
+    """
+    df = TableCache(table_cache_dir).load(file_path)
+    if regularity_threshold <= 1:
+        layout = analyze_table(df)
+        if layout is not None and layout.score >= regularity_threshold:
+            chunks = structural_chunks(df, os.path.basename(file_path), layout)
+            if chunks:
+                return chunks
+    csv_buffer = StringIO()
+    df.to_csv(csv_buffer, index=False, header=False)
+    csv_string = csv_buffer.getvalue()
+    if len(csv_string.splitlines()) > 250:
+        csv_string = "\n".join(csv_string.splitlines()[:250])
+    return csv_string
+
+# ==============================================================================
+# FONKSİYON 4: Excel Ayrıştırma Aşaması (Ayrı İşlemlerde, Önbellekli)
+# ==============================================================================
+def parse_tables(files_to_process_info, args):
+    """
+    Önbellekte olmayan Excel dosyalarını işlem havuzunda ayrıştırıp tablo önbelleğine yazar.
+    Okunamayan dosyalar hata kaydına yazılır ve listeden çıkarılır.
+    """
+    table_cache = TableCache(args.table_cache_dir)
+    pending = [info for info in files_to_process_info if info['path'] not in table_cache]
+    print(f"Tablo önbelleği: {len(files_to_process_info) - len(pending)} dosya hazır, {len(pending)} dosya {args.parse_workers} işlemde ayrıştırılacak.")
+    if not pending:
+        return files_to_process_info
+    failed = set()
+    with ProcessPoolExecutor(max_workers=args.parse_workers) as executor:
+        futures = {executor.submit(table_cache.parse, info['path']): info for info in pending}
+        for done_count, future in enumerate(as_completed(futures), 1):
+            info = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                print(f"  -> ❌ Excel okunamadı: {os.path.basename(info['path'])}: {e}")
+                log_failure(info, f"Excel okunamadı: {e}")
+                failed.add(info['path'])
+            if done_count % 100 == 0 or done_count == len(pending):
+                print(f"     ... {done_count}/{len(pending)} dosya ayrıştırıldı.")
+    return [info for info in files_to_process_info if info['path'] not in failed]
+
+# ==============================================================================
+# FONKSİYON 5: Yerel ve Gemini ile Asenkron Chunk Oluşturma
+# ==============================================================================
+def run_gemini_chunking(files_to_process_info, args, on_result):
+    """
+    Dosyaları asyncio tabanlı işlem hattıyla işler. Tablolar önceden ayrıştırılıp önbelleğe
+    alındığından (bkz. parse_tables) burada yalnızca önbellekten okunur; düzenli tabloların
+    yerel chunk'lanması ayrı işlemlerde yapılır; yalnızca düzensiz tablolar için yapılan Gemini
+    çağrıları RPM/TPM kotalarına ve 429 cevaplarına göre ayarlanan eşzamanlılıkla tek bir olay
+    döngüsünde yürütülür.
+
+    `on_result(dosya_adı, chunk_listesi)` her başarılı dosya için ana süreçte çağrılır.
+    """
+    total = len(files_to_process_info)
+    done = {'count': 0}
+
+    def on_success(file_info, result_chunks):
+        done['count'] += 1
+        file_basename = os.path.basename(file_info['path'])
+        method = "yerel" if result_chunks and result_chunks[0]['metadata']['type'] == 'table_cell' else "Gemini"
+        print(f"  -> [{done['count']}/{total} | {file_info['category']}] İşlendi ({method}): {file_basename}")
+        on_result(file_basename, result_chunks)
+
+    def on_failure(file_info, error):
+        done['count'] += 1
+        print(f"  -> [{done['count']}/{total} | {file_info['category']}] ❌ Başarısız: {os.path.basename(file_info['path'])}: {error}")
+        log_failure(file_info, error)
+
+    async def _run():
+        api_key = os.environ.get("GOOGLE_API_KEY")
+        client = GeminiClient(api_key, model=args.gemini_model, endpoint=args.gemini_endpoint) if api_key else None
+        pipeline = ChunkingPipeline(
+            client,
+            RateLimiter(args.rpm, args.tpm),
+            AdaptiveConcurrency(initial=min(8, args.max_concurrency), maximum=args.max_concurrency),
+            max_retries=args.max_retries,
+            max_quota_wait=args.max_quota_wait,
+        )
         try:
-            response = model.generate_content(prompt, generation_config=genai.types.GenerationConfig(temperature=0.0))
-            if not response.parts:
-                if response.prompt_feedback.block_reason:
-                    raise Exception(f"Cevap güvenlik nedeniyle engellendi (Sebep: {response.prompt_feedback.block_reason.name})")
-                else:
-                    raise Exception("Model boş bir cevap döndürdü.")
-            content = response.text
-            if content.strip().startswith("```json"):
-                content = content.strip()[7:-3].strip()
-            generated_chunks = json.loads(content)
-            final_chunks = []
-            if isinstance(generated_chunks, list):
-                for text in generated_chunks:
-                    final_chunks.append({'text': str(text), 'metadata': {'source': file_name, 'type': 'llm_generated_data_point'}})
-            return final_chunks
-        except Exception as e:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** (attempt + 1)
-                print(f"     ⚠️ Hata (Deneme {attempt + 1}/{max_retries}), {wait_time} saniye sonra tekrar denenecek: {e}")
-                time.sleep(wait_time)
-            else:
-                raise e
-    return []
+            with ProcessPoolExecutor(max_workers=args.parse_workers) as executor:
+                prepare = partial(
+                    prepare_table,
+                    regularity_threshold=2 if args.llm_only else args.regularity_threshold,
+                    table_cache_dir=args.table_cache_dir,
+                )
+                await pipeline.run(files_to_process_info, prepare, on_success, on_failure, executor)
+        finally:
+            if client is not None:
+                await client.aclose()
+
+    asyncio.run(_run())
 
 # ==============================================================================
-# FONKSİYON 4: Tek Dosyayı İşleme
+# FONKSİYON 6: Komut Satırından İndeks Parametreleri
+# ==============================================================================
+def index_params_from_args(args):
+    """Komut satırı argümanlarından FAISS indeks parametre sözlüğünü oluşturur."""
+    return {
+        'index_type': args.index_type,
+        'nlist': args.nlist,
+        'nprobe': args.nprobe,
+        'pq_m': args.pq_m,
+        'pq_nbits': args.pq_nbits,
+        'hnsw_m': args.hnsw_m,
+        'ef_construction': args.ef_construction,
+        'ef_search': args.ef_search,
+        'train_sample': args.train_sample,
+        'rescore': args.rescore,
+        'rescore_factor': args.rescore_factor,
+    }
+
 # ==============================================================================
-def process_file_with_llm(file_path):
+# FONKSİYON 7: Embedding Modelini Gerektiğinde Yükleyen Kodlayıcı
+# ==============================================================================
+@lru_cache(maxsize=None)
+def make_lazy_encoder(model_name, backend='torch', threads=None):
+    """
+    Modeli ilk çağrıda yükleyen bir kodlama fonksiyonu döndürür. Tüm chunk'lar
+    önbellekteyse ~1.11 GB'lık model hiç yüklenmez. Aynı model için her zaman aynı
+    fonksiyon döndürülür; böylece chunk'lar ve tablo açıklamaları tek bir model kopyasıyla kodlanır.
+    """
+    state = {}
+    def encode(texts):
+        if 'model' not in state:
+            print(f"\nEmbedding modeli ('{model_name}', arka uç: {backend}) yükleniyor...")
+            if backend == 'torch':
+                print("Not: Bu model ~1.11 GB boyutundadır ve hafızaya yüklenmesi zaman alabilir.")
+            state['model'] = load_embedding_model(model_name, backend, threads)
+            print("✅ Embedding modeli başarıyla yüklendi.")
+        return state['model'].encode(texts, show_progress_bar=True)
+    return encode
+
+
+def embedding_cache_from_args(args):
+    """Seçilen arka uca ait embedding önbelleğini açar."""
+    return EmbeddingCache(cache_key(EMBEDDING_MODEL_NAME, args.embedding_backend), args.embedding_cache_dir)
+
+
+def encoder_from_args(args):
+    return make_lazy_encoder(EMBEDDING_MODEL_NAME, args.embedding_backend, args.embedding_threads)
+
+# ==============================================================================
+# FONKSİYON 8: Embedding Arka Ucunun PyTorch ile Tutarlılık Kontrolü
+# ==============================================================================
+def run_parity_check(checkpoint, args):
+    """
+    Kontrol noktasındaki ilk `--parity-check` chunk'ı hem PyTorch hem de seçilen arka uçla
+    kodlar ve vektörler arasındaki kosinüs sapmasını raporlar.
+    """
+    texts = []
+    for chunk in checkpoint.iter_chunks():
+        texts.append(chunk['text'])
+        if len(texts) >= args.parity_check:
+            break
+    if not texts:
+        print("❌ Tutarlılık kontrolü için kontrol noktasında chunk bulunamadı."); return
+    print(f"\n{len(texts)} chunk ile '{args.embedding_backend}' arka ucu PyTorch'a karşı karşılaştırılıyor...")
+    reference = load_embedding_model(EMBEDDING_MODEL_NAME, 'torch', args.embedding_threads)
+    candidate = load_embedding_model(EMBEDDING_MODEL_NAME, args.embedding_backend, args.embedding_threads)
+    result = parity_check(reference, candidate, texts)
+    print(f"✅ Ortalama kosinüs: {result['mean_cosine']:.6f} | En düşük: {result['min_cosine']:.6f} | En büyük sapma: {result['max_drift']:.6f}")
+
+# ==============================================================================
+# FONKSİYON 9: Sözcüksel (BM25) İndeksi Oluşturma
+# ==============================================================================
+def _meta_build_id(directory):
+    """Sözcüksel veya yönlendirme indeksinin eşlendiği deponun derleme kimliği; indeks yoksa None."""
     try:
-        df = pd.read_excel(file_path, header=None, engine='openpyxl' if file_path.endswith('.xlsx') else 'xlrd')
-        df.dropna(how='all', inplace=True); df.dropna(how='all', axis=1, inplace=True)
-        csv_buffer = StringIO()
-        df.to_csv(csv_buffer, index=False, header=False)
-        csv_string = csv_buffer.getvalue()
-        if len(csv_string.splitlines()) > 250:
-            csv_string = "\n".join(csv_string.splitlines()[:250])
-        return get_llm_chunks_from_gemini(csv_string, os.path.basename(file_path))
-    except Exception as e:
-        raise e
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            return json.load(f).get('build_id')
+    except FileNotFoundError:
+        return None
+
+
+def write_lexical_index(previous_build_id=None, removed_ids=(), start_row=None):
+    """
+    Chunk deposundaki silinmemiş chunk'lardan BM25 ters indeksini oluşturur. Sunucu bu
+    indeksi vektör aramasıyla birleştirerek tablo adı, yıl ve bölge adı gibi birebir
+    eşleşmeleri yakalar.
+
+    Artımlı eklemede (`start_row` verilirse) mevcut indeks güncellemeden önceki depoya
+    (`previous_build_id`) aitse yalnızca silinen ve eklenen chunk'lar işlenir; değilse
+    indeks baştan oluşturulur.
+    """
+    store = ChunkStore(CHUNK_STORE_DIR)
+    if start_row is not None and previous_build_id is not None and _meta_build_id(LEXICAL_INDEX_DIR) == previous_build_id:
+        print("\nSözcüksel (BM25) indeks güncelleniyor...")
+        indexed = append_from_store(store, removed_ids, start_row, LEXICAL_INDEX_DIR)
+    else:
+        print("\nSözcüksel (BM25) indeks oluşturuluyor...")
+        indexed = build_from_store(store, LEXICAL_INDEX_DIR)
+    print(f"✅ {indexed} chunk için sözcüksel indeks '{LEXICAL_INDEX_DIR}/' dizinine kaydedildi.")
 
 # ==============================================================================
-# FONKSİYON 5: Multiprocessing için Sarmalayıcı Fonksiyon
+# FONKSİYON 10: Tablo Yönlendirme İndeksini Oluşturma
 # ==============================================================================
-def process_file_wrapper(args):
-    index, total, file_info = args
-    file_basename = os.path.basename(file_info['path'])
+def write_table_router(args, previous_build_id=None, changed_sources=None):
+    """
+    Her kaynak tablo için (başlık, kategori ve örnek chunk'lardan oluşan) tek bir vektör
+    içeren küçük yönlendirme indeksini oluşturur. Sunucu `--route-tables` ile sorguyu önce
+    en yakın tablolara yönlendirip chunk aramasını bu tablolarla sınırlayabilir.
+
+    Artımlı eklemede (`changed_sources` verilirse) mevcut indeks önceki depoya aitse
+    yalnızca değişen tablolar yeniden kodlanır.
+    """
+    embedding_cache = embedding_cache_from_args(args)
+    encode = partial(embedding_cache.encode, encode_fn=encoder_from_args(args), verbose=False)
+    store = ChunkStore(CHUNK_STORE_DIR)
+    if changed_sources is not None and previous_build_id is not None and _meta_build_id(TABLE_ROUTER_DIR) == previous_build_id:
+        print("\nTablo yönlendirme indeksi güncelleniyor...")
+        tables = append_table_router(store, encode, changed_sources, TABLE_ROUTER_DIR)
+    else:
+        print("\nTablo yönlendirme indeksi oluşturuluyor...")
+        tables = build_table_router(store, encode, TABLE_ROUTER_DIR)
+    print(f"✅ {tables} tablo için yönlendirme indeksi '{TABLE_ROUTER_DIR}/' dizinine kaydedildi.")
+
+# ==============================================================================
+# FONKSİYON 11: Mevcut Veritabanına Artımlı Ekleme
+# ==============================================================================
+def append_to_database(new_chunks_by_source, remove_sources, source_categories, args):
+    """
+    Mevcut indeks ve chunk deposunu baştan oluşturmadan günceller: yeniden işlenen veya
+    silinmesi istenen kaynak dosyalara ait eski vektörleri kaldırır, yeni chunk'ların
+    vektörlerini ekler. Maliyet, derlemin boyutuyla değil değişiklik miktarıyla orantılıdır.
+    """
+    index, index_params = load_index(INDEX_FILE)
+    if not is_id_mapped(index):
+        print(f"❌ '{INDEX_FILE}' kimlik eşlemeli değil (eski format). Artımlı ekleme için veritabanını bir kez baştan oluşturun.")
+        return False
+
+    new_chunks = [chunk for chunks in new_chunks_by_source.values() for chunk in chunks]
+    replaced_sources = set(new_chunks_by_source) | set(remove_sources)
+    embeddings = None
+    if new_chunks:
+        # Dosyalara dokunmadan önce en uzun adımı (kodlama) tamamla
+        print(f"\n{len(new_chunks)} adet yeni metin parçası vektörlere dönüştürülüyor...")
+        embedding_cache = embedding_cache_from_args(args)
+        embeddings = embedding_cache.encode([chunk['text'] for chunk in new_chunks], encoder_from_args(args))
+
+    # Silme bellekteki indekste, diske dokunmadan önce yapılır (HNSW gibi desteklemeyen türler burada hata verir)
     try:
-        api_key = os.environ.get("GOOGLE_API_KEY")
-        if not api_key: raise ValueError("GOOGLE_API_KEY worker process'te bulunamadı.")
-        genai.configure(api_key=api_key)
-        print(f"  -> [{index}/{total} | {file_info['category']}] İşleniyor: {file_basename}")
-        result_chunks = process_file_with_llm(file_info['path'])
-        return (file_basename, result_chunks)
-    except Exception as e:
-        log_failure(file_info, e)
-        return (file_basename, [])
+        removed_count = remove_vectors(index, ChunkStore(CHUNK_STORE_DIR).ids_for_sources(replaced_sources))
+    except ValueError as e:
+        print(f"❌ HATA: {e}")
+        return False
+    # Önce depo güncellenir ve yeni bir derleme kimliği alır; sunucu, yeni kimlikle yazılan indeks
+    # gelene kadar eski indeksi kullanmaya devam eder
+    previous_store = ChunkStore(CHUNK_STORE_DIR)
+    previous_build_id, start_row = previous_store.build_id, len(previous_store)
+    build_id = new_build_id()
+    removed_ids, new_ids = append_chunks(CHUNK_STORE_DIR, new_chunks, replaced_sources, source_categories, build_id=build_id)
+    if new_chunks:
+        index.add_with_ids(embeddings, new_ids)
+    # Sıkıştırılmış indekslerde yeni vektörler yeniden puanlama dosyasına da eklenir
+    if needs_rescore(index_params) and os.path.exists(VECTORS_FILE):
+        if read_vectors_build_id(VECTORS_FILE) != previous_build_id:
+            delete_vectors_file(VECTORS_FILE)
+            print(f"⚠️ '{VECTORS_FILE}' chunk deposuyla uyuşmuyordu ve silindi; yeniden puanlama için veritabanını baştan oluşturun.")
+        elif not new_chunks:
+            write_vectors_meta(VECTORS_FILE, build_id)
+        elif not append_vectors(embeddings, int(new_ids[0]), VECTORS_FILE, build_id=build_id):
+            print(f"⚠️ '{VECTORS_FILE}' chunk deposuyla uyuşmuyordu ve silindi; yeniden puanlama için veritabanını baştan oluşturun.")
+    write_index(index, index_params, INDEX_FILE, chunk_count=len(ChunkStore(CHUNK_STORE_DIR)), build_id=build_id)
+    # Sözcüksel ve yönlendirme indekslerinde yalnızca değişen chunk'lar ve tablolar işlenir
+    write_lexical_index(previous_build_id, removed_ids, start_row)
+    write_table_router(args, previous_build_id, replaced_sources)
+    print(f"✅ Artımlı güncelleme tamamlandı: {removed_count} vektör silindi, {len(new_ids)} vektör eklendi (toplam: {index.ntotal}).")
+    return True
+
+# ==============================================================================
+# FONKSİYON 12: Belleği Sınırlı Akış Modunda Veritabanı Oluşturma
+# ==============================================================================
+def build_database_streaming(checkpoint, index_params, source_categories, args, build_id):
+    """
+    Chunk'ları kontrol noktasından gruplar halinde okuyup kodlar; her grup chunk deposuna
+    yazılır, vektörleri bellek eşlemeli bir dosyaya aktarılır ve (eğitim gerektirmeyen
+    indekslerde) hemen indekse eklenir. Bellek kullanımı derlemin boyutuyla değil grup
+    boyutuyla sınırlıdır (indeksin kendisi hariç). Depo ve vektör dosyası `build_id` ile işaretlenir.
+    """
+    total = checkpoint.chunk_count()
+    embedding_cache = embedding_cache_from_args(args)
+    encode = encoder_from_args(args)
+    index, spill, row = None, None, 0
+    print(f"\n{total} adet metin parçası {args.embed_batch_size}'lik gruplar halinde vektörlere dönüştürülüyor (akış modu)...")
+    with ChunkStoreWriter(CHUNK_STORE_DIR, source_categories, build_id) as writer:
+        for batch in checkpoint.iter_batches(args.embed_batch_size):
+            writer.extend(batch)
+            vectors = embedding_cache.encode([chunk['text'] for chunk in batch], encode, verbose=False)
+            if spill is None:
+                spill = np.lib.format.open_memmap(EMBEDDINGS_SPILL_FILE, mode='w+', dtype='float32', shape=(total, vectors.shape[1]))
+                index = create_index(vectors.shape[1], index_params, total)
+            spill[row:row + len(batch)] = vectors
+            # IVF indeksleri önce eğitilmeli; onlara vektörler tüm gruplar bittikten sonra eklenir
+            if index.is_trained:
+                add_vectors(index, vectors, start_id=row)
+            row += len(batch)
+            print(f"     ... {row}/{total} metin parçası işlendi.")
+    print(f"✅ Metin parçaları bellek eşlemeli '{CHUNK_STORE_DIR}/' deposuna kaydedildi.")
+
+    spill.flush()
+    if index.ntotal < row:
+        train_index(index, spill, index_params.get('train_sample'))
+        add_vectors(index, spill, batch_size=args.embed_batch_size)
+    apply_search_params(index, index_params)
+    del spill
+    if needs_rescore(index_params):
+        # Biriktirilen tam vektörler yeniden puanlama dosyası olarak saklanır
+        replace_vectors(EMBEDDINGS_SPILL_FILE, VECTORS_FILE, build_id)
+        print(f"✅ Tam hassasiyetli vektörler yeniden puanlama için '{VECTORS_FILE}' dosyasına kaydedildi.")
+    else:
+        os.remove(EMBEDDINGS_SPILL_FILE)
+        delete_vectors_file(VECTORS_FILE)
+    return index
 
 # ==============================================================================
-# FONKSİYON 6: Ana Fonksiyon
+# FONKSİYON 13: Ana Fonksiyon
 # ==============================================================================
 def main():
     parser = argparse.ArgumentParser(description="TÜİK verilerini işleyip RAG veritabanı oluşturan betik.")
     parser.add_argument('--reprocess-failed', action='store_true', help="Sadece 'failed_files.log' dosyasındaki başarısız dosyaları yeniden işler.")
+    parser.add_argument('--compact-checkpoint', action='store_true', help="Kontrol noktası dosyasından yeniden işlenen dosyaların geçersiz kılınmış eski kayıtlarını temizler.")
+    parser.add_argument('--append', action='store_true', help="Mevcut indeksi ve chunk deposunu baştan oluşturmak yerine yalnızca bu çalıştırmada işlenen dosyalarla günceller.")
+    parser.add_argument('--remove-source', action='append', default=[], metavar='DOSYA_ADI', help="(--append ile) Bu kaynak dosyaya ait vektörleri veritabanından siler. Birden fazla kez verilebilir.")
+    parser.add_argument('--llm-only', action='store_true', help="Düzenli tablolar dahil tüm tabloları Gemini ile chunk'lar (yerel yapısal ayrıştırıcıyı kapatır).")
+    parser.add_argument('--regularity-threshold', type=float, default=DEFAULT_REGULARITY_THRESHOLD, help="Tablonun Gemini'ye gönderilmeden yerel olarak chunk'lanması için gereken en düşük düzenlilik skoru (0-1).")
+    parser.add_argument('--gemini-model', default=GEMINI_MODEL, help="Tabloları chunk'lara dönüştürecek Gemini modeli.")
+    parser.add_argument('--gemini-endpoint', default=os.environ.get('GEMINI_API_BASE', GEMINI_API_BASE), help="Gemini REST API adresi (test için yerel bir sahte sunucu verilebilir).")
+    parser.add_argument('--rpm', type=float, default=60, help="Dakikadaki en fazla Gemini isteği (0: sınırsız).")
+    parser.add_argument('--tpm', type=float, default=1000000, help="Dakikadaki en fazla Gemini token'ı (0: sınırsız).")
+    parser.add_argument('--max-concurrency', type=int, default=16, help="Aynı anda bekleyen en fazla Gemini isteği; 429 alındıkça otomatik düşürülür.")
+    parser.add_argument('--max-retries', type=int, default=5, help="Kota dışı hatalarda bir dosya için en fazla deneme sayısı.")
+    parser.add_argument('--max-quota-wait', type=float, default=900.0, help="Bir dosyanın kota (429) nedeniyle toplamda en fazla bekleyebileceği süre (saniye); aşılırsa dosya başarısız sayılır.")
+    parser.add_argument('--parse-workers', type=int, default=max(1, cpu_count() - 1), help="Excel dosyalarını okuyacak işlem sayısı.")
+    parser.add_argument('--table-cache-dir', default=TABLE_CACHE_DIR, help="Ayrıştırılmış Excel tablolarının saklandığı önbellek dizini.")
+    parser.add_argument('--embedding-cache-dir', default=EMBEDDING_CACHE_DIR, help="Önceden kodlanmış chunk vektörlerinin saklandığı önbellek dizini.")
+    parser.add_argument('--embedding-backend', choices=EMBEDDING_BACKENDS, default=os.environ.get('EMBEDDING_BACKEND', 'torch'), help="Embedding çıkarım arka ucu: torch, onnx, onnx-int8 (nicemlenmiş) veya openvino. Sunucu da aynı arka ucu kullanmalıdır.")
+    parser.add_argument('--embedding-threads', type=int, default=int(os.environ.get('EMBEDDING_THREADS', 0)) or None, help="Embedding çıkarımında kullanılacak iş parçacığı sayısı (varsayılan: kütüphane varsayılanı).")
+    parser.add_argument('--parity-check', type=int, default=0, metavar='N', help="Veritabanı oluşturmak yerine ilk N chunk'ı PyTorch ve seçilen arka uçla kodlayıp kosinüs sapmasını raporlar.")
+    parser.add_argument('--index-type', choices=INDEX_TYPES, default=DEFAULT_INDEX_PARAMS['index_type'], help="FAISS indeks türü: flat (tam tarama), ivf_flat, ivf_pq, hnsw veya sıkıştırılmış sq_fp16 / sq8.")
+    parser.add_argument('--no-rescore', dest='rescore', action='store_false', help="Sıkıştırılmış indekslerde (ivf_pq, sq_fp16, sq8) tam vektörleri yeniden puanlama için saklamaz.")
+    parser.add_argument('--rescore-factor', type=int, default=DEFAULT_INDEX_PARAMS['rescore_factor'], help="Yeniden puanlamada sunucunun indeksten alacağı aday katsayısı.")
+    parser.add_argument('--nlist', type=int, default=DEFAULT_INDEX_PARAMS['nlist'], help="IVF küme sayısı (varsayılan: ~4*sqrt(chunk sayısı)).")
+    parser.add_argument('--nprobe', type=int, default=DEFAULT_INDEX_PARAMS['nprobe'], help="IVF aramasında taranacak küme sayısı (geri çağırma/hız ayarı).")
+    parser.add_argument('--pq-m', type=int, default=DEFAULT_INDEX_PARAMS['pq_m'], help="IVF-PQ alt vektör sayısı (vektör boyutunu tam bölmeli).")
+    parser.add_argument('--pq-nbits', type=int, default=DEFAULT_INDEX_PARAMS['pq_nbits'], help="IVF-PQ alt vektör başına bit sayısı.")
+    parser.add_argument('--hnsw-m', type=int, default=DEFAULT_INDEX_PARAMS['hnsw_m'], help="HNSW düğüm başına bağlantı sayısı (M).")
+    parser.add_argument('--ef-construction', type=int, default=DEFAULT_INDEX_PARAMS['ef_construction'], help="HNSW oluşturma sırasındaki aday listesi boyutu.")
+    parser.add_argument('--ef-search', type=int, default=DEFAULT_INDEX_PARAMS['ef_search'], help="HNSW aramasındaki aday listesi boyutu (geri çağırma/hız ayarı).")
+    parser.add_argument('--stream', action='store_true', help="Chunk'ları gruplar halinde kodlayıp indekse ekler; bellek kullanımı derlemin boyutundan bağımsız kalır.")
+    parser.add_argument('--embed-batch-size', type=int, default=2048, help="(--stream ile) Tek seferde kodlanıp indekse eklenecek chunk sayısı.")
+    parser.add_argument('--train-sample', type=int, default=DEFAULT_INDEX_PARAMS['train_sample'], help="IVF eğitimi için kullanılacak en fazla vektör sayısı.")
     args = parser.parse_args()
     print(f"--- RAG Veritabanı Oluşturucu Başlatıldı ---")
     
     try:
         api_key = os.environ.get("GOOGLE_API_KEY")
         if not api_key: raise ValueError("GOOGLE_API_KEY ortam değişkeni bulunamadı.")
-        genai.configure(api_key=api_key)
         print("✅ Google API anahtarı başarıyla yüklendi.")
     except Exception as e:
-        print(f"❌ HATA: {e}"); exit()
+        if args.llm_only:
+            print(f"❌ HATA: {e}"); exit()
+        print(f"⚠️ {e} Yalnızca düzenli tablolar yerel olarak işlenecek; düzensiz tablolar başarısız olarak kaydedilecek.")
 
     full_file_info_list = load_all_files_from_data_json()
     if not full_file_info_list: exit()
+    # Chunk deposundaki kategori sütunu için: kaynak dosya adı -> kategori klasörü
+    source_categories = {os.path.basename(info['path']): info['kategori'] for info in full_file_info_list}
+
+    checkpoint = ChunkCheckpoint(CHUNKS_CHECKPOINT_FILE)
+    manifest = DownloadManifest(MANIFEST_PATH)
+    if len(checkpoint) == 0 and os.path.exists(LEGACY_CHECKPOINT_FILE):
+        print(f"Eski '{LEGACY_CHECKPOINT_FILE}' dosyası yeni kontrol noktası formatına aktarılıyor...")
+        migrated = checkpoint.migrate_legacy(LEGACY_CHECKPOINT_FILE)
+        print(f"✅ {migrated} dosyanın chunk'ları '{CHUNKS_CHECKPOINT_FILE}' dosyasına aktarıldı.")
+    if args.parity_check:
+        run_parity_check(checkpoint, args)
+        return
 
     files_to_process_info = []
     if args.reprocess_failed:
@@ -173,67 +486,89 @@ def main():
         os.remove(FAILED_LOG_FILE)
     else:
         print("** Normal İşleme Modu Aktif **")
-        processed_files = set()
-        if os.path.exists(PROCESSED_LOG_FILE):
-            with open(PROCESSED_LOG_FILE, 'r', encoding='utf-8') as f:
-                processed_files = set(line.strip() for line in f)
-        files_to_process_info = [info for info in full_file_info_list if os.path.basename(info['path']) not in processed_files]
+        processed_files = checkpoint.sources()
+        # prepare_data.py --refresh ile içeriği değiştiği tespit edilen dosyalar yeniden işlenir
+        dirty_files = manifest.dirty_sources() & processed_files
+        if dirty_files:
+            print(f"'{MANIFEST_FILE}' içinde değiştiği işaretlenmiş {len(dirty_files)} dosya yeniden işlenecek.")
+        files_to_process_info = [
+            info for info in full_file_info_list
+            if os.path.basename(info['path']) not in processed_files or os.path.basename(info['path']) in dirty_files
+        ]
 
+    new_chunks_by_source = {}
     if not files_to_process_info:
         print("✅ İşlenecek yeni dosya bulunamadı. Gömme (embedding) adımına geçiliyor.")
     else:
-        print(f"\n{len(files_to_process_info)} adet dosya Gemini ile işlenecek (paralel olarak)...")
-        worker_count = 8
-        print(f"Kullanılacak paralel işlemci sayısı: {worker_count}")
-        tasks_with_metadata = [(idx + 1, len(files_to_process_info), info) for idx, info in enumerate(files_to_process_info)]
-        
-        with Pool(processes=worker_count) as pool:
-            for file_basename, result_chunks in pool.imap_unordered(process_file_wrapper, tasks_with_metadata):
-                if result_chunks:
-                    print(f"     ... {file_basename} için {len(result_chunks)} adet chunk başarıyla oluşturuldu.")
-                    with open(PROCESSED_LOG_FILE, 'a', encoding='utf-8') as f_log:
-                        f_log.write(f"{file_basename}\n")
-                    with open(CHUNKS_CHECKPOINT_FILE, 'ab') as f_chunks:
-                        pickle.dump(result_chunks, f_chunks)
-
-    print("\nParalel işlemler tamamlandı. Sonuçlar birleştiriliyor...")
-    all_chunks = []
-    if os.path.exists(CHUNKS_CHECKPOINT_FILE):
-        try:
-            file_size_mb = os.path.getsize(CHUNKS_CHECKPOINT_FILE) / (1024 * 1024)
-            print(f"'{CHUNKS_CHECKPOINT_FILE}' okunuyor ({file_size_mb:.2f} MB). Bu işlem biraz sürebilir...")
-            with open(CHUNKS_CHECKPOINT_FILE, 'rb') as f:
-                while True:
-                    all_chunks.extend(pickle.load(f))
-        except EOFError:
-            pass
-        except Exception as e:
-            print(f"Checkpoint dosyası okunurken hata: {e}")
-    
-    if not all_chunks:
+        print(f"\n{len(files_to_process_info)} adet dosya işlenecek (düzenli tablolar yerel, diğerleri Gemini ile, asenkron olarak)...")
+        print(f"Kota: {args.rpm:g} istek/dk, {args.tpm:g} token/dk | En fazla eşzamanlı istek: {args.max_concurrency}")
+
+        def save_result(file_basename, result_chunks):
+            if result_chunks:
+                print(f"     ... {file_basename} için {len(result_chunks)} adet chunk başarıyla oluşturuldu.")
+            else:
+                print(f"     ... {file_basename} hiç chunk üretmedi; boş kayıt yazılıyor.")
+            # Aynı dosya için yazılan yeni kayıt (boş olsa da) eskisini geçersiz kılar; böylece
+            # chunk üretmeyen dosya sonraki çalıştırmalarda yeniden işlenmez ve eski chunk'ları atılır
+            checkpoint.append(file_basename, result_chunks)
+            manifest.clear_dirty(file_basename)
+            if args.append:
+                new_chunks_by_source[file_basename] = result_chunks
+
+        files_to_process_info = parse_tables(files_to_process_info, args)
+        run_gemini_chunking(files_to_process_info, args, save_result)
+        if os.path.exists(MANIFEST_PATH):
+            manifest.save()
+
+    if args.compact_checkpoint:
+        print(f"'{CHUNKS_CHECKPOINT_FILE}' sıkıştırılıyor (geçersiz kılınmış eski kayıtlar atılıyor)...")
+        checkpoint.compact()
+
+    if args.append:
+        if os.path.exists(INDEX_FILE) and os.path.exists(os.path.join(CHUNK_STORE_DIR, 'meta.json')):
+            if append_to_database(new_chunks_by_source, args.remove_source, source_categories, args):
+                print("\n🎉 RAG veritabanınız başarıyla güncellendi! 🎉")
+            return
+        print("⚠️ Mevcut indeks veya chunk deposu bulunamadı; veritabanı baştan oluşturulacak.")
+
+    print("\nChunk oluşturma tamamlandı. Sonuçlar birleştiriliyor...")
+    total_chunks = checkpoint.chunk_count()
+    if not total_chunks:
         print("❌ Hiç metin parçası (chunk) oluşturulamadı. Gömme işlemi atlanıyor."); exit()
-    print(f"✅ Hafızaya toplam {len(all_chunks)} adet chunk yüklendi.")
-    
-    model_name = 'paraphrase-multilingual-mpnet-base-v2'
-    print(f"\nEmbedding modeli ('{model_name}') yükleniyor...")
-    print("Not: Bu model ~1.11 GB boyutundadır ve hafızaya yüklenmesi zaman alabilir.")
-    model = SentenceTransformer(model_name)
-    print("✅ Embedding modeli başarıyla yüklendi.")
-    
-    texts_to_embed = [chunk['text'] for chunk in all_chunks]
+    print(f"✅ '{CHUNKS_CHECKPOINT_FILE}' içinde {len(checkpoint)} dosyadan toplam {total_chunks} adet chunk bulundu.")
+
+    index_params = index_params_from_args(args)
+    # Depo ve ona eşlenen tüm dosyalar aynı derleme kimliğini taşır. Depo indeksten önce yazılır;
+    # sunucu, aynı kimlikli indeks yazılana kadar yeni depoyu eski indeksle eşleştirmez
+    build_id = new_build_id()
+    if args.stream:
+        index = build_database_streaming(checkpoint, index_params, source_categories, args, build_id)
+        write_index(index, index_params, INDEX_FILE, chunk_count=total_chunks, build_id=build_id)
+        print(f"✅ FAISS veritabanı '{INDEX_FILE}' olarak kaydedildi (parametreler: '{params_path(INDEX_FILE)}').")
+        write_lexical_index()
+        write_table_router(args)
+        print("\n🎉 Tebrikler! RAG veritabanınız başarıyla oluşturuldu! 🎉")
+        return
+
+    # Kontrol noktası kayıt kayıt okunur; bellekte yalnızca metinler tutulur
+    texts_to_embed = [chunk['text'] for chunk in checkpoint.iter_chunks()]
     print(f"\n{len(texts_to_embed)} adet metin parçası vektörlere dönüştürülüyor...")
-    embeddings = model.encode(texts_to_embed, show_progress_bar=True)
-    embeddings = np.array(embeddings).astype('float32')
-    
-    embedding_dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(embedding_dimension)
-    index.add(embeddings)
-    faiss.write_index(index, 'tuik_faiss.index')
-    print(f"✅ FAISS veritabanı 'tuik_faiss.index' olarak kaydedildi.")
-
-    with open('tuik_chunks.pkl', 'wb') as f:
-        pickle.dump(all_chunks, f)
-    print("✅ Metin parçaları kalıcı olarak 'tuik_chunks.pkl' dosyasına kaydedildi.")
+    embedding_cache = embedding_cache_from_args(args)
+    embeddings = embedding_cache.encode(texts_to_embed, encoder_from_args(args))
+
+    print(f"\nFAISS indeksi oluşturuluyor (tür: {index_params['index_type']})...")
+    index = build_index(embeddings, index_params)
+    if needs_rescore(index_params):
+        write_vectors(embeddings, VECTORS_FILE, build_id=build_id)
+        print(f"✅ Tam hassasiyetli vektörler yeniden puanlama için '{VECTORS_FILE}' dosyasına kaydedildi.")
+    else:
+        delete_vectors_file(VECTORS_FILE)
+    write_chunk_store(checkpoint.iter_chunks(), CHUNK_STORE_DIR, source_categories, build_id)
+    print(f"✅ Metin parçaları bellek eşlemeli '{CHUNK_STORE_DIR}/' deposuna kaydedildi.")
+    write_index(index, index_params, INDEX_FILE, chunk_count=total_chunks, build_id=build_id)
+    print(f"✅ FAISS veritabanı '{INDEX_FILE}' olarak kaydedildi (parametreler: '{params_path(INDEX_FILE)}').")
+    write_lexical_index()
+    write_table_router(args)
     print("\n🎉 Tebrikler! RAG veritabanınız başarıyla oluşturuldu! 🎉")
 
 # ==============================================================================
@@ -1,13 +1,100 @@
 import os
+import json
 import requests
 from bs4 import BeautifulSoup
 import time
 import re
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import threading
+from urllib.parse import urljoin
+from utils.downloader import Downloader, DownloadJob
+
+DOWNLOAD_LINK_MARKER = 'DownloadIstatistikselTablo'
+# Sayfa betiklerinde sekme içeriğini yükleyen istek adreslerini yakalar (örn. ajax: "/Kategori/...")
+LISTING_URL_PATTERN = re.compile(r'''["']((?:https?://[^"']+)?/[^"'\s]*(?:Istatistiksel|Tablo)[^"'\s]*)["']''', re.IGNORECASE)
+# Sayfalı JSON listelerinde toplam kayıt sayısını taşıyan alanlar (DataTables ve yaygın API biçimleri)
+LISTING_TOTAL_FIELDS = ("recordsFiltered", "recordsTotal", "totalCount", "TotalCount", "total", "Total")
+
+
+def _safe_title(title_text):
+    """Tablo başlığını dosya adı olarak kullanılabilir hale getirir."""
+    title_text = title_text.strip() or "Bilinmeyen_Tablo"
+    return re.sub(r'[<>:"/\\|?*]', "", title_text).replace(" ", "_")
+
+
+def get_kategoriler(session, base_url="https://data.tuik.gov.tr/"):
+    """
+    TÜİK'teki tüm veri kategorilerini (ad, kimlik) ikilileri olarak döndürür.
+    `session` bir `requests.Session` veya (istek sunucu başına sınıra tabi olsun diye) `Downloader` olabilir.
+    """
+    response = session.get(base_url, timeout=60)
+    soup = BeautifulSoup(response.text, "html.parser")
+    themes = soup.find_all("div", class_="text-center")
+    theme_names = [a.text.strip() for t in themes for a in t.find_all("a")]
+    theme_ids = [a["href"].split("=")[-1] for t in themes for a in t.find_all("a")]
+    return list(zip(theme_names, theme_ids))
+
+
+def parse_tablo_links(html, base_url="https://data.tuik.gov.tr/"):
+    """
+    Kategori sayfasının (veya sekmenin yüklediği HTML parçasının) içindeki tablo satırlarından
+    {güvenli başlık: indirme bağlantısı} sözlüğü çıkarır. Ağ erişimi gerektirmez; kaydedilmiş
+    HTML dosyalarıyla test edilebilir.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    tablo_linkleri = {}
+    for row in soup.find_all("tr"):
+        link = row.find("a", href=lambda href: href and DOWNLOAD_LINK_MARKER in href)
+        if link is None:
+            continue
+        cell = row.find("td")
+        title_text = cell.get_text(" ", strip=True) if cell else ""
+        tablo_linkleri[_safe_title(title_text)] = urljoin(base_url, link["href"])
+    return tablo_linkleri
+
+
+def parse_tablo_links_json(data, base_url="https://data.tuik.gov.tr/"):
+    """
+    Sekmenin JSON ile yüklendiği durumda, yanıttaki her kaydı dolaşıp indirme bağlantısını ve
+    başlığını bulur. Kayıtlar sözlük veya (DataTables'taki gibi) HTML hücre listesi olabilir.
+    """
+    tablo_linkleri = {}
+
+    def visit(node):
+        if isinstance(node, dict):
+            values = list(node.values())
+        elif isinstance(node, list):
+            values = node
+        else:
+            return
+        strings = [v for v in values if isinstance(v, str)]
+        link = next((v for v in strings if DOWNLOAD_LINK_MARKER in v), None)
+        if link is not None:
+            if '<' in link:
+                # Bağlantı bir HTML parçası içinde geliyor
+                anchor = BeautifulSoup(link, "html.parser").find("a", href=True)
+                link = anchor["href"] if anchor else link
+            title = next((BeautifulSoup(v, "html.parser").get_text(" ", strip=True) for v in strings if DOWNLOAD_LINK_MARKER not in v), "")
+            tablo_linkleri[_safe_title(title)] = urljoin(base_url, link)
+            return
+        for value in values:
+            visit(value)
+
+    visit(data)
+    return tablo_linkleri
+
+
+def listing_page_info(data):
+    """
+    Sayfalı bir JSON listesinin bu sayfadaki kayıt sayısını ve (varsa) toplam kayıt sayısını
+    döndürür. Toplam bildirilmiyorsa liste tek sayfa kabul edilir (toplam None).
+    """
+    if isinstance(data, list):
+        return len(data), None
+    if not isinstance(data, dict):
+        return 0, None
+    rows = next((len(value) for value in data.values() if isinstance(value, list)), 0)
+    total = next((data[field] for field in LISTING_TOTAL_FIELDS if isinstance(data.get(field), int)), None)
+    return rows, total
 
 class TuikScraper:
     """
@@ -15,8 +102,18 @@ class TuikScraper:
     İndirme klasörünü dinamik olarak ayarlayabilir.
     """
     # __init__ metodunu, indirme klasörünü dışarıdan bir parametre olarak alacak şekilde güncelliyoruz.
-    def __init__(self, download_folder_path=None):
+    # `downloader` verilmezse varsayılan ayarlarla eşzamanlı bir indirici oluşturulur.
+    # `kategoriler` verilirse ana sayfa tekrar okunmaz.
+    # Tek bir örnek birden fazla iş parçacığından kullanılabilir (bkz. `indir`); Selenium yedeği
+    # tek bir tarayıcıyı bir kilit altında sırayla kullanır.
+    def __init__(self, download_folder_path=None, downloader=None, kategoriler=None):
         self.base_url = "https://data.tuik.gov.tr/"
+        self.downloader = downloader or Downloader()
+        # Sayfa istekleri de indiricinin bağlantı havuzunu ve sunucu başına sınırını kullanır
+        self.session = self.downloader.session
+        # Selenium yalnızca yedek yöntem olarak, ilk ihtiyaç duyulduğunda başlatılır ve tekrar kullanılır
+        self._driver = None
+        self._driver_lock = threading.Lock()
         
         # Eğer bir indirme klasörü belirtilmişse, onu kullan.
         # Belirtilmemişse, betiğin çalıştığı mevcut klasörü kullan.
@@ -28,19 +125,20 @@ class TuikScraper:
         # Hedef klasörün var olduğundan emin oluyoruz.
         os.makedirs(self.download_folder, exist_ok=True)
         print(f"📂 Dosyalar şu klasöre indirilecek: {self.download_folder}")
-        self.kategoriler = self._get_kategoriler()
+        self.kategoriler = kategoriler if kategoriler is not None else self._get_kategoriler()
 
     def _get_kategoriler(self):
         """ TÜİK'teki tüm veri kategorilerini döndürür. """
-        response = requests.get(self.base_url)
-        soup = BeautifulSoup(response.text, "html.parser")
-        themes = soup.find_all("div", class_="text-center")
-        theme_names = [a.text.strip() for t in themes for a in t.find_all("a")]
-        theme_ids = [a["href"].split("=")[-1] for t in themes for a in t.find_all("a")]
-        return list(zip(theme_names, theme_ids))
+        return get_kategoriler(self.downloader, self.base_url)
 
     def _get_driver(self):
         """ Selenium WebDriver başlatır. """
+        # Selenium yalnızca yedek yöntemde gerekir; modül (ve ayrıştırıcılar) onsuz da içe aktarılabilir
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+
         options = Options()
         options.add_argument("--headless")
         options.add_argument("--disable-gpu")
@@ -49,8 +147,99 @@ class TuikScraper:
         return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
 
     def _get_tablo_links(self, kategori_id):
-        """ Bir kategorideki tüm tablo başlıklarını ve bağlantıları döndürür. """
-        driver = self._get_driver()
+        """
+        Bir kategorideki tüm tablo başlıklarını ve bağlantıları döndürür. Önce sayfa HTML'i ve
+        sekmenin yüklediği liste adresleri doğrudan okunur; bağlantı bulunamazsa veya liste
+        eksik okunduysa (toplam kayıt sayısına ulaşılamadıysa) Selenium'a dönülür.
+        """
+        try:
+            tablo_linkleri, complete = self._get_tablo_links_http(kategori_id)
+        except (requests.RequestException, ValueError) as e:
+            print(f"⚠️ Tablo listesi doğrudan okunamadı ({e}), tarayıcı ile denenecek.")
+            tablo_linkleri, complete = {}, False
+        if tablo_linkleri and complete:
+            return tablo_linkleri
+        if tablo_linkleri:
+            print(f"⚠️ Kategori {kategori_id} için tablo listesi eksik okundu ({len(tablo_linkleri)} tablo), tarayıcı ile denenecek.")
+        try:
+            selenium_linkleri = self._get_tablo_links_selenium(kategori_id)
+        except Exception as e:
+            if not tablo_linkleri:
+                raise
+            print(f"⚠️ Tarayıcı ile okunamadı ({e}); doğrudan okunan {len(tablo_linkleri)} tablo kullanılacak.")
+            return tablo_linkleri
+        return selenium_linkleri if len(selenium_linkleri) >= len(tablo_linkleri) else tablo_linkleri
+
+    def _get_tablo_links_http(self, kategori_id):
+        """
+        "İstatistiksel Tablolar" sekmesini tarayıcı kullanmadan, requests ve BeautifulSoup ile okur.
+
+        Returns:
+            (tablo bağlantıları, liste eksiksiz okunduysa True) ikilisi.
+        """
+        url = urljoin(self.base_url, f"Kategori/GetKategori?p={kategori_id}")
+        response = self.downloader.get(url, timeout=60)
+        response.raise_for_status()
+        tablo_linkleri = parse_tablo_links(response.text, url)
+        if tablo_linkleri:
+            # Sayfa içine gömülü tabloda (istemci tarafı sayfalama) tüm satırlar HTML'dedir
+            return tablo_linkleri, True
+        # Sekme içeriği ayrı bir istekle yükleniyorsa, sayfa betiklerindeki adresleri dene
+        complete = True
+        for listing_url in dict.fromkeys(LISTING_URL_PATTERN.findall(response.text)):
+            if DOWNLOAD_LINK_MARKER in listing_url:
+                continue
+            listing_url = urljoin(url, listing_url)
+            params = {} if "p=" in listing_url else {"p": kategori_id}
+            listing = self.downloader.get(listing_url, params=params or None, timeout=60)
+            if not listing.ok:
+                continue
+            if 'json' in listing.headers.get('Content-Type', ''):
+                links, listing_complete = self._read_json_listing(listing_url, params, json.loads(listing.text))
+                tablo_linkleri.update(links)
+                complete = complete and listing_complete
+            else:
+                tablo_linkleri.update(parse_tablo_links(listing.text, listing_url))
+        return tablo_linkleri, complete
+
+    def _read_json_listing(self, listing_url, params, first_page):
+        """
+        Sunucu tarafında sayfalanan JSON listesinin (DataTables `start`/`length`) kalan sayfalarını
+        okur. Toplam kayıt sayısına ulaşılamazsa liste eksik sayılır.
+
+        Returns:
+            (tablo bağlantıları, eksiksizse True) ikilisi.
+        """
+        tablo_linkleri = parse_tablo_links_json(first_page, listing_url)
+        fetched, total = listing_page_info(first_page)
+        if total is None or fetched >= total:
+            return tablo_linkleri, True
+        page_size = fetched
+        while page_size and fetched < total:
+            page = self.downloader.get(listing_url, params=dict(params, start=fetched, length=page_size), timeout=60)
+            if not page.ok:
+                break
+            data = json.loads(page.text)
+            rows, _ = listing_page_info(data)
+            if not rows:
+                break
+            tablo_linkleri.update(parse_tablo_links_json(data, listing_url))
+            fetched += rows
+        return tablo_linkleri, fetched >= total
+
+    def _get_tablo_links_selenium(self, kategori_id):
+        """
+        Yedek yöntem: sekmeyi headless Chrome ile açıp sayfaları tek tek gezer. Tüm kategoriler
+        aynı tarayıcıyı kullanır; tarayıcı aynı anda tek sayfa gezebildiğinden erişim sıralanır.
+        """
+        with self._driver_lock:
+            if self._driver is None:
+                self._driver = self._get_driver()
+            return self._read_tablo_links_selenium(self._driver, kategori_id)
+
+    def _read_tablo_links_selenium(self, driver, kategori_id):
+        from selenium.webdriver.common.by import By
+
         url = f"https://data.tuik.gov.tr/Kategori/GetKategori?p={kategori_id}#nav-db"
         driver.get(url)
         time.sleep(3)
@@ -61,7 +250,6 @@ class TuikScraper:
             time.sleep(3)
         except:
             print("❌ İstatistiksel Tablolar sekmesi bulunamadı!")
-            driver.quit()
             return {}
 
         tablo_linkleri = {}
@@ -72,9 +260,8 @@ class TuikScraper:
                 excel_links = row.find_elements(By.XPATH, ".//a[contains(@href, 'DownloadIstatistikselTablo')]")
                 if excel_links:
                     title_cells = row.find_elements(By.XPATH, ".//td")
-                    title_text = title_cells[0].text.strip() if title_cells and title_cells[0].text.strip() else "Bilinmeyen_Tablo"
-                    safe_title = re.sub(r'[<>:"/\\|?*]', "", title_text).replace(" ", "_")
-                    tablo_linkleri[safe_title] = excel_links[0].get_attribute("href")
+                    title_text = title_cells[0].text if title_cells else ""
+                    tablo_linkleri[_safe_title(title_text)] = excel_links[0].get_attribute("href")
             try:
                 next_button = driver.find_element(By.ID, "istatistikselTable_next")
                 if "disabled" in next_button.get_attribute("class"):
@@ -84,36 +271,49 @@ class TuikScraper:
                     time.sleep(3)
             except:
                 break
-        driver.quit()
         return tablo_linkleri
 
-    def indir(self, kategori_adi):
-        """ Bir kategorideki tüm tabloları, __init__ sırasında belirtilen klasöre indirir. """
+    def close(self):
+        """ Yedek yöntem için açılmış tarayıcıyı kapatır. """
+        with self._driver_lock:
+            if self._driver is not None:
+                self._driver.quit()
+                self._driver = None
+
+    def indir(self, kategori_adi, download_folder=None):
+        """
+        Bir kategorideki tüm tabloları `download_folder` klasörüne (verilmezse __init__ sırasında
+        belirtilen klasöre) indirir. Farklı klasörlerle aynı anda birden fazla kategori indirilebilir.
+        """
+        download_folder = download_folder or self.download_folder
+        os.makedirs(download_folder, exist_ok=True)
         kategori = [k[1] for k in self.kategoriler if k[0] == kategori_adi]
         if not kategori:
             print(f"❌ '{kategori_adi}' kategorisinde indirilecek tablo bulunamadı!")
-            return
+            return []
 
+        jobs = []
         for theme in kategori:
             tablo_linkleri = self._get_tablo_links(theme)
             for tablo_adi, file_url in tablo_linkleri.items():
                 # Dosya adını temizleyip .xls uzantısı ekliyoruz
                 safe_filename = f"{tablo_adi}.xls"
-                file_path = os.path.join(self.download_folder, safe_filename)
-
-                # Eğer dosya zaten varsa, tekrar indirmemek için atla
-                if os.path.exists(file_path):
-                    print(f"🟡 '{safe_filename}' zaten mevcut, atlanıyor.")
-                    continue
-                
-                print(f"📥 {safe_filename} indiriliyor...")
-                try:
-                    response = requests.get(file_url, stream=True)
-                    response.raise_for_status() # Hatalı isteklerde (404, 500 vb.) hata fırlat
-                    with open(file_path, "wb") as file:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            file.write(chunk)
-                    print(f"✅ {safe_filename} başarıyla indirildi.")
-                except requests.exceptions.RequestException as e:
-                    print(f"❌ '{safe_filename}' indirilirken bir ağ hatası oluştu: {e}")
+                jobs.append(DownloadJob(file_url, os.path.join(download_folder, safe_filename)))
+
+        # Dosyalar eşzamanlı indirilir; yalnızca tamamlanan dosyalar asıl adıyla yazıldığından
+        # var olan bir dosya atlanır, yarım kalan `.part` dosyaları ise kaldığı yerden devam eder.
+        print(f"📥 {len(jobs)} tablo {self.downloader.max_workers} eşzamanlı bağlantıyla indiriliyor...")
+        return self.downloader.download_all(jobs, self._report)
+
+    @staticmethod
+    def _report(result):
+        safe_filename = os.path.basename(result.path)
+        if result.status == 'skipped':
+            print(f"🟡 '{safe_filename}' zaten mevcut, atlanıyor.")
+        elif result.status == 'unchanged':
+            print(f"🟡 '{safe_filename}' değişmemiş, atlanıyor.")
+        elif result.status == 'downloaded':
+            print(f"✅ {safe_filename} başarıyla indirildi.")
+        else:
+            print(f"❌ '{safe_filename}' indirilirken bir ağ hatası oluştu: {result.error}")
 
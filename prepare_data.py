@@ -1,8 +1,13 @@
 import os
 import json
 import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 # Kendi özel scraper dosyamızdan TuikScraper sınıfını import ediyoruz
-from custom_tuik_scraper import TuikScraper 
+from custom_tuik_scraper import TuikScraper, get_kategoriler
+from utils.downloader import Downloader
+from utils.download_manifest import DownloadManifest, MANIFEST_PATH, PROJECT_DIR
 
 # Kategori listesini tüm TÜİK kategorilerini içerecek şekilde güncelliyoruz.
 KATEGORILER = [
@@ -25,40 +30,74 @@ KATEGORILER = [
     ('Ulusal Hesaplar', 'ulusal')
 ]
 
-def download_all_categories():
+def download_category(kategori_adi, kategori_klasor_adi, tuik, base_path):
+    """
+    Tek bir kategorinin tablo bağlantılarını bulup dosyalarını kendi klasörüne indirir.
+    İndirme sonuçlarını ve geçen süreyi döndürür.
+    """
+    started = time.perf_counter()
+    # Her kategori için hedef indirme yolunu belirliyoruz.
+    download_path = os.path.join(base_path, "data", kategori_klasor_adi)
+    results = tuik.indir(kategori_adi, download_path) or []
+    return results, time.perf_counter() - started
+
+def download_all_categories(refresh=False, category_workers=4):
     """
     Tüm TÜİK kategorilerindeki verileri, her birini kendi klasörüne olacak şekilde indirir.
+    Kategoriler `category_workers` kadar paralel işlenir; TÜİK'e açılan eşzamanlı bağlantı
+    sayısı ise paylaşılan indiricinin sunucu başına sınırıyla toplamda sınırlı kalır.
+    Her kategori bittiğinde 'data.json' güncellenir.
+
+    `refresh` verilirse mevcut dosyalar da koşullu istekle yoklanır; yalnızca değişenler
+    yeniden indirilir ve manifestte "kirli" olarak işaretlenir.
     """
     print("TÜM KATEGORİLER İÇİN VERİ İNDİRME İŞLEMİ BAŞLATILIYOR...")
     print("="*60)
     
-    base_path = os.path.dirname(os.path.abspath(__file__))
+    base_path = PROJECT_DIR
+    manifest = DownloadManifest(MANIFEST_PATH)
+    downloader = Downloader(manifest=manifest, refresh=refresh)
+    # Kategori listesi (ana sayfa) yalnızca bir kez okunur. Tek scraper tüm kategorilerce
+    # paylaşılır: keşif istekleri indirmelerle aynı sunucu başına sınıra tabidir ve Selenium
+    # yedeği gerekirse tek bir tarayıcı açılır.
+    kategoriler = get_kategoriler(downloader)
+    tuik = TuikScraper(download_folder_path=os.path.join(base_path, "data"), downloader=downloader, kategoriler=kategoriler)
+    data_json_lock = threading.Lock()
+    timings = {}
 
-    for kategori_adi, kategori_klasor_adi in KATEGORILER:
-        # Her kategori için hedef indirme yolunu belirliyoruz.
-        download_path = os.path.join(base_path, "data", kategori_klasor_adi)
-        
-        print(f"\n'{kategori_adi}' kategorisi için hazırlanılıyor...")
-        
-        try:
-            # TuikScraper'ı başlatırken, dosyaları indirmesini istediğimiz klasörün yolunu veriyoruz.
-            # Bu, güncellediğimiz custom_tuik_scraper.py'nin özelliğidir.
-            tuik = TuikScraper(download_folder_path=download_path)
-            tuik.indir(kategori_adi)
-            
-            print(f"'{kategori_adi}' kategorisi için indirme komutu tamamlandı.")
-        except Exception as e:
-            print(f"'{kategori_adi}' kategorisi indirilirken bir hata oluştu: {e}")
-            
+    with ThreadPoolExecutor(max_workers=category_workers) as executor:
+        futures = {
+            executor.submit(download_category, kategori_adi, kategori_klasor_adi, tuik, base_path): kategori_adi
+            for kategori_adi, kategori_klasor_adi in KATEGORILER
+        }
+        for future in as_completed(futures):
+            kategori_adi = futures[future]
+            try:
+                results, elapsed = future.result()
+                downloaded = sum(1 for r in results if r.status == 'downloaded')
+                failed = sum(1 for r in results if r.status == 'failed')
+                timings[kategori_adi] = elapsed
+                print(f"'{kategori_adi}' kategorisi {elapsed:.1f} sn'de tamamlandı: {len(results)} tablo, {downloaded} indirildi, {failed} başarısız.")
+            except Exception as e:
+                print(f"'{kategori_adi}' kategorisi indirilirken bir hata oluştu: {e}")
+            with data_json_lock:
+                create_data_json(verbose=False)
+
+    tuik.close()
+    manifest.save()
     print("="*60)
-    print("Tüm indirme işlemleri tamamlandı.")
+    for kategori_adi, elapsed in sorted(timings.items(), key=lambda item: -item[1]):
+        print(f"  {elapsed:8.1f} sn  {kategori_adi}")
+    print(f"Tüm indirme işlemleri tamamlandı. Yeniden chunk'lanacak (değişmiş/yeni) dosya sayısı: {len(manifest.dirty_sources())}")
 
-def create_data_json():
+def create_data_json(verbose=True):
     """
     'data' klasörünü tarar ve indirilen dosyaları listeleyen 'data.json' dosyasını oluşturur.
+    Dosya önce geçici adla yazılıp yerine taşınır; indirme sürerken de güvenle güncellenebilir.
     """
-    print("\n'data.json' dosyası oluşturuluyor (veri haritası)...")
-    print("="*60)
+    if verbose:
+        print("\n'data.json' dosyası oluşturuluyor (veri haritası)...")
+        print("="*60)
     
     base_path = os.path.dirname(os.path.abspath(__file__))
     data_dir = os.path.join(base_path, "data")
@@ -72,7 +111,8 @@ def create_data_json():
             files = [f for f in os.listdir(kategori_yolu) if f.endswith(('.xls', '.xlsx'))]
             
             if files:
-                print(f"-> '{kategori_adi}' kategorisinde {len(files)} dosya bulundu ve listeye eklendi.")
+                if verbose:
+                    print(f"-> '{kategori_adi}' kategorisinde {len(files)} dosya bulundu ve listeye eklendi.")
                 kategori_data = {
                     "name": kategori_adi,
                     "kategori": kategori_klasor_adi,
@@ -81,12 +121,18 @@ def create_data_json():
                 all_data.append(kategori_data)
 
     output_path = os.path.join(base_path, 'data.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
+    with open(f"{output_path}.tmp", 'w', encoding='utf-8') as f:
         json.dump(all_data, f, ensure_ascii=False, indent=4)
+    os.replace(f"{output_path}.tmp", output_path)
     
-    print("="*60)
-    print(f"Veri haritası başarıyla oluşturuldu: {output_path}")
+    if verbose:
+        print("="*60)
+        print(f"Veri haritası başarıyla oluşturuldu: {output_path}")
 
 if __name__ == "__main__":
-    download_all_categories()
+    parser = argparse.ArgumentParser(description="TÜİK tablolarını indirip data.json veri haritasını oluşturur.")
+    parser.add_argument('--category-workers', type=int, default=4, help="Aynı anda işlenecek kategori sayısı.")
+    parser.add_argument('--refresh', action='store_true', help="Mevcut dosyaları da koşullu istekle yoklayıp yalnızca değişenleri yeniden indirir.")
+    args = parser.parse_args()
+    download_all_categories(refresh=args.refresh, category_workers=args.category_workers)
     create_data_json()
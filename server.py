@@ -1,33 +1,33 @@
 import os
 import json
-import pickle
-import faiss
 import numpy as np
 import asyncio
+import time
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 import jwt
 import click
 from collections import namedtuple
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional
 
 from mcp.server.fastmcp import FastMCP
-from sentence_transformers import SentenceTransformer
 # Orijinal kodunuzda olan ama bizim RAG sunucusunda olmayan bazı importları geri ekledik
 from utils.logging import setup_logger
+from utils.batch_encoder import BatchingEncoder
+from utils.embedding_backend import EMBEDDING_BACKENDS, load_embedding_model
+from utils.index_reloader import IndexReloader, load_generation
+from utils.lexical_index import reciprocal_rank_fusion
+from utils.faiss_index import filtered_search, rescore
+from utils.table_router import routed_rows, search_each
+from utils.result_cache import ResultCache
+from utils.reranker import DEFAULT_RERANK_MODEL, Reranker
+from utils.startup import StagedLoader
+from utils.worker_pool import WorkerPool, default_threads, worker_call
 
 # --- YENİ EKLENEN RAG BİLEŞENLERİ ---
-# Modelleri ve veritabanını sunucu başlamadan önce bir kez yükle
-try:
-    print("Embedding modeli yükleniyor...")
-    MODEL = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
-    print("✅ Embedding modeli yüklendi.")
-    print("FAISS veritabanı ve metin chunk'ları yükleniyor...")
-    FAISS_INDEX = faiss.read_index('tuik_faiss.index')
-    with open('tuik_chunks.pkl', 'rb') as f:
-        CHUNKS = pickle.load(f)
-    print(f"✅ Veritabanı ve {len(CHUNKS)} adet chunk başarıyla yüklendi.")
-except Exception as e:
-    print(f"❌ HATA: Model veya veritabanı dosyaları yüklenirken bir sorun oluştu: {e}")
-    MODEL, FAISS_INDEX, CHUNKS = None, None, None
+# Model ve veritabanı içe aktarma sırasında değil, sunucu başlatılırken arka planda
+# paralel yüklenir (bkz. utils/startup.py); hazır olana kadar istekler bekletilir.
+MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
 
 # --- ORİJİNAL KODUNUZDAN KORUNAN YAPILAR ---
 # --- GÜVENLİK AYARLARI ---
@@ -35,7 +35,13 @@ PUBLIC_KEY_FILE = "public_key.pem"
 ISSUER_URL = "http://127.0.0.1:8070" 
 AUDIENCE = "tuik-mcp-server"
 
+# Hibrit aramada her iki yöntemden de top_k'nin bu katı kadar aday alınıp birleştirilir
+HYBRID_CANDIDATE_FACTOR = 4
+
 AuthInfo = namedtuple("AuthInfo", ["claims", "expires_at", "scopes", "client_id"])
+# `chunks`: her soru için bulunan chunk'lar; `complete`: sonuç tam mı (yeniden sıralama bütçesi
+# aşılıp ilk aşama sıralamasına düşülen sonuçlar False'tur ve önbelleğe alınmaz)
+SearchResults = namedtuple("SearchResults", ["chunks", "complete"])
 
 class SimpleBearerAuthProvider:
     def __init__(self, public_key: bytes, issuer: str, audience: str):
@@ -59,14 +65,168 @@ class SimpleBearerAuthProvider:
 class ConfigurationError(Exception):
     pass
 
+def _build_rag_result(user_question: str, retrieved_chunks: list) -> Dict[str, Any]:
+    """Bulunan chunk'lardan bağlamı, kaynakları ve LLM'e verilecek nihai prompt'u oluşturur."""
+    context = "\n\n---\n\n".join([chunk['text'] for chunk in retrieved_chunks])
+    sources = list(set([chunk['metadata']['source'] for chunk in retrieved_chunks]))
+    final_prompt = f"""## GÖREV ##\nSen, Türkiye İstatistik Kurumu (TÜİK) verileri konusunda uzman bir veri analistisin...\n\n## BAĞLAM ##\n{context}\n\n## KAYNAKLAR ##\n{', '.join(sources)}\n\n## KULLANICI SORUSU ##\n{user_question}\n\n## CEVAP ##"""
+    return {"user_question": user_question, "retrieved_context": context, "retrieved_sources": sources, "final_prompt_for_llm": final_prompt}
+
 class PaymentMCPServer: # Orijinal sınıf adınızı koruyoruz
-    def __init__(self, host: str, port: int, transport: str, auth_token: Optional[str] = None):
+    def __init__(self, host: str, port: int, transport: str, auth_token: Optional[str] = None,
+                 encode_batch_size: int = 32, encode_max_wait_ms: float = 5.0,
+                 search_overrides: Optional[Dict[str, Any]] = None, watch_interval: float = 30.0,
+                 hybrid: bool = True, rrf_k: int = 60, route_tables: int = 0,
+                 result_cache: Optional[ResultCache] = None, loaders: Optional[Dict[str, Callable[[], Any]]] = None,
+                 ready_timeout: float = 30.0, mmap_index: bool = True, workers: Optional[WorkerPool] = None,
+                 rerank_settings: Optional[Dict[str, Any]] = None):
         self.logger = setup_logger(__name__)
         self.mcp = None
         self.host = host
         self.port = port
         self.transport = transport
         self.auth_token = auth_token
+        # Eşzamanlı SSE isteklerinin sorgularını gruplayarak olay döngüsü dışında kodlar
+        # Çalışan süreç havuzu verilirse kodlama ve arama bu süreçlerde yapılır; bu süreç
+        # yalnızca SSE oturumlarını, filtre doğrulamasını ve sonuç önbelleğini yönetir
+        self.workers = workers
+        if workers is not None:
+            self.encoder = BatchingEncoder(
+                partial(worker_call, '_encode_texts'), max_batch_size=encode_batch_size, max_wait_ms=encode_max_wait_ms,
+                executor=workers, max_concurrent_batches=workers.workers,
+            )
+        else:
+            self.encoder = BatchingEncoder(
+                self._encode_texts, max_batch_size=encode_batch_size, max_wait_ms=encode_max_wait_ms
+            )
+        # İndeks ve chunk deposu değiştiğinde sunucuyu yeniden başlatmadan yeni nesle geçer.
+        # İndeks bellek eşlemeli açılırsa süreçler ve art arda yüklenen nesiller aynı sayfaları paylaşır
+        self.reloader = IndexReloader(
+            None, overrides=search_overrides, logger=self.logger, loader=partial(load_generation, mmap_index=mmap_index),
+            on_load=self._on_rag_loaded,
+        )
+        self.watch_interval = watch_interval
+        # BM25 ve vektör sıralamaları karşılıklı sıra birleştirmesi (RRF) ile birleştirilir
+        self.hybrid = hybrid
+        self.rrf_k = rrf_k
+        # 0'dan büyükse her soru önce en yakın `route_tables` tabloya yönlendirilir
+        self.route_tables = route_tables
+        # Yeniden sıralayıcı ayarları ({'model', 'candidates', 'budget_ms'}; kapalıysa None). Çalışan
+        # süreç modunda model bu süreçte yüklenmez; önbellek anahtarı ve durum çıktısı bu ayarlardan oluşur
+        self.rerank_settings = rerank_settings
+        # Tekrarlanan / çok benzer soruların sonuçları; nesil değişince boşaltılır
+        self.result_cache = result_cache or ResultCache(max_entries=0)
+        # Model, RAG veritabanı ve (varsa) yeniden sıralayıcı arka planda paralel yüklenir;
+        # istekler en fazla `ready_timeout` saniye hazır olmalarını bekler
+        loaders = dict(loaders or {}, rag=self._load_rag)
+        if workers is not None:
+            loaders['workers'] = workers.start
+        self.startup = StagedLoader(loaders, logger=self.logger)
+        self.ready_timeout = ready_timeout
+
+    @property
+    def reranker(self) -> Optional[Reranker]:
+        """Verilirse adaylar cross-encoder ile yeniden sıralanıp ilk top_k tanesi kullanılır."""
+        return self.startup.get('reranker')
+
+    def _encode_texts(self, texts):
+        """Bir grup metni tek bir `model.encode` çağrısıyla vektörlere dönüştürür."""
+        return self.startup.get('model').encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+    def _load_rag(self):
+        """
+        İndeks ve chunk deposunu ilk nesil olarak yükler; sunucu çalışırken yenisiyle değiştirilebilir.
+        Sütun formatlı depo bellek eşlemeli açılır; yoksa eski tuik_chunks.pkl yüklenir.
+        """
+        print("FAISS veritabanı ve metin chunk'ları yükleniyor...")
+        rag = self.reloader.load_initial()
+        print(f"✅ FAISS indeksi yüklendi (tür: {rag.params['index_type']}, nprobe={rag.params.get('nprobe')}, ef_search={rag.params.get('ef_search')}).")
+        print(f"✅ Veritabanı ve {len(rag.chunks)} adet chunk başarıyla yüklendi.")
+        if rag.lexical is None:
+            print("⚠️ Sözcüksel (BM25) indeks bulunamadı; yalnızca vektör araması yapılacak.")
+        if rag.vectors is not None:
+            print(f"✅ Sıkıştırılmış indeks için tam vektörler yeniden puanlamaya hazır ('{rag.params['index_type']}').")
+        if rag.router is not None:
+            print(f"✅ Tablo yönlendirme indeksi yüklendi ({len(rag.router)} tablo).")
+        return rag
+
+    def _on_rag_loaded(self, rag):
+        """
+        Her başarılı yeniden yüklemeden sonra çağrılır. Sunucu veritabanı oluşturulmadan
+        başlatıldıysa 'rag' bileşeni ilk başarılı yüklemede hazır işaretlenir; yeniden başlatma gerekmez.
+        """
+        self.startup.mark_ready('rag', rag)
+
+    async def _ensure_ready(self) -> Optional[str]:
+        """
+        Bileşenler yüklenene kadar bekler. Sunucu hazırsa None, değilse istemciye
+        döndürülecek hata JSON'ını döndürür (yükleme başarısızsa beklemeden).
+        """
+        state = await self.startup.wait_ready(self.ready_timeout)
+        if state == 'ready':
+            return None
+        return self._not_ready_error(state)
+
+    def _not_ready_error(self, state: str) -> str:
+        if state == 'failed':
+            message = "Sunucu başlangıcında RAG bileşenleri yüklenemedi."
+        else:
+            message = "Sunucu henüz hazır değil; RAG bileşenleri yükleniyor, lütfen tekrar deneyin."
+        return json.dumps({"error": message, "startup": self.startup.status()}, ensure_ascii=False)
+
+    async def _restart_workers(self, error: Exception) -> bool:
+        """
+        Bir süreç çöktüğü için bozulan çalışan süreç havuzunu yeniden başlatır. Havuz yeniden
+        başlatılamazsa bileşen başarısız işaretlenir; sonraki istekler havuza gönderilmeden
+        hata alır ve `/health` 503 döndürür.
+
+        Returns:
+            Havuz yeniden kullanılabilir durumdaysa True.
+        """
+        if self.startup.status()['components'].get('workers', {}).get('state') == 'failed':
+            return False
+        self.logger.warning(f"Worker pool is broken, restarting: {error}")
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.workers.restart)
+        except Exception as restart_error:
+            self.startup.mark_failed('workers', f"Worker pool is broken: {restart_error}")
+            return False
+        return True
+
+    async def _retrieve(self, questions: List[str], top_k: int, category: Optional[str], source: Optional[str]):
+        """`_retrieve_batch`; havuz bozulursa yeniden başlatılıp istek bir kez daha denenir."""
+        try:
+            return await self._retrieve_batch(questions, top_k, category, source)
+        except BrokenProcessPool as e:
+            if self.workers is None or not await self._restart_workers(e):
+                raise
+        return await self._retrieve_batch(questions, top_k, category, source)
+
+    async def _workers_failed(self, error: Exception) -> str:
+        """
+        İstek, havuz yeniden başlatıldıktan sonra da bir süreci çökerttiyse havuzu yeniden
+        başlatıp yalnızca bu isteğe hata döndürür; havuz başlatılamıyorsa sunucu başarısız sayılır.
+        """
+        if await self._restart_workers(error):
+            return json.dumps({"error": f"Çalışan süreç bu isteği işlerken çöktü; havuz yeniden başlatıldı: {error}"}, ensure_ascii=False)
+        return self._not_ready_error('failed')
+
+    def health(self) -> Dict[str, Any]:
+        rag = self.reloader.current
+        return dict(
+            self.startup.status(),
+            generation=rag.generation if rag else None,
+            chunk_count=len(rag.chunks) if rag else 0,
+            workers=self.workers.info() if self.workers else None,
+            reranker=self._rerank_info(),
+        )
+
+    def _rerank_info(self) -> Optional[Dict[str, Any]]:
+        """Yeniden sıralayıcı bu süreçte yüklüyse istatistikleriyle, değilse yalnızca ayarlarıyla."""
+        if self.reranker is not None:
+            return self.reranker.info()
+        return dict(self.rerank_settings) if self.rerank_settings else None
     
     async def initialize(self) -> FastMCP:
         self.logger.info(f"Initializing MCP server")
@@ -100,41 +260,314 @@ class PaymentMCPServer: # Orijinal sınıf adınızı koruyoruz
         )
         
         self._register_tools()
+        self._register_health_route()
+        # Yüklemeler arka planda başlar; taşıma katmanı bu sırada açılır
+        self.startup.start()
+        self.reloader.start_watching(self.watch_interval)
         
         self.logger.info("MCP server initialized successfully")
         return self.mcp
         
     # --- DEĞİŞTİRİLEN KISIM: Araçlar ---
+    @staticmethod
+    def _allowed_rows(rag, category: Optional[str], source: Optional[str]) -> Optional[np.ndarray]:
+        """
+        Kategori/kaynak filtresine uyan chunk satırlarını döndürür; filtre yoksa None.
+
+        Raises:
+            ValueError: Filtre uygulanamıyorsa veya hiçbir chunk filtreye uymuyorsa.
+        """
+        if category is None and source is None:
+            return None
+        if not hasattr(rag.chunks, 'row_filter'):
+            raise ValueError("Filtreli arama için sütun formatlı chunk deposu gerekli; veritabanını yeniden oluşturun.")
+        allowed = rag.chunks.row_filter(category=category, source=source)
+        if not len(allowed):
+            categories = ", ".join(name for name in rag.chunks.categories if name)
+            raise ValueError(f"Filtreye uyan chunk bulunamadı (kategori: {category}, kaynak: {source}). Geçerli kategoriler: {categories}")
+        return allowed
+
+    async def _retrieve_batch(
+        self,
+        user_questions: List[str],
+        top_k: int,
+        category: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Soruların sonuçlarını önce önbellekte arar: birebir aynı sorular hiç kodlanmaz,
+        anlamca çok yakın sorular kodlanır ama aranmaz. Kalan sorular tek seferde kodlanıp
+        `_search_chunks` ile aranır. Her soru için bulunan chunk'lardan nihai prompt paketini oluşturur.
+        """
+        # Sorgu boyunca aynı nesil kullanılır; bu sırada yeni bir nesil devreye alınsa bile
+        # bu sorgu eski indeks ve chunk deposuyla tamamlanır.
+        rag = self.reloader.current
+        allowed = self._allowed_rows(rag, category, source)
+        cache = self.result_cache
+        cache.sync(rag.generation)
+        # Sonucu etkileyen tüm ayarlar önbellek anahtarına girer
+        params = (
+            top_k, category, source, self.hybrid and rag.lexical is not None, self.rrf_k, self.route_tables,
+            (self.rerank_settings['model'], self.rerank_settings['candidates']) if self.rerank_settings else None,
+        )
+
+        retrieved: List[Optional[list]] = [cache.get_exact(question, params) for question in user_questions]
+        pending = [i for i, chunks in enumerate(retrieved) if chunks is None]
+        to_search = []
+        if pending:
+            embeddings = await self.encoder.encode_many([user_questions[i] for i in pending])
+            embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+            for i, embedding in zip(pending, embeddings):
+                retrieved[i] = cache.get_semantic(embedding, params)
+            to_search = [(i, embedding) for i, embedding in zip(pending, embeddings) if retrieved[i] is None]
+            if to_search:
+                questions = [user_questions[i] for i, _ in to_search]
+                search_embeddings = np.stack([embedding for _, embedding in to_search])
+                found = await self._search_chunks(rag, questions, search_embeddings, top_k, category, source, allowed)
+                for (i, embedding), chunks, complete in zip(to_search, found.chunks, found.complete):
+                    retrieved[i] = chunks
+                    # Süre bütçesi yüzünden yeniden sıralanamayan sonuçlar önbellekte kalıcı olmasın
+                    if complete:
+                        cache.put(user_questions[i], embedding, params, chunks)
+        cache_hits = len(user_questions) - len(to_search)
+        if cache_hits:
+            print(f"⚡ {len(user_questions)} sorudan {cache_hits} tanesi önbellekten yanıtlandı.")
+
+        results = [_build_rag_result(question, chunks) for question, chunks in zip(user_questions, retrieved)]
+        print("📚 İlgili metinler başarıyla bulundu.")
+        return results
+
+    async def _search_chunks(
+        self,
+        rag,
+        user_questions: List[str],
+        question_embeddings: np.ndarray,
+        top_k: int,
+        category: Optional[str],
+        source: Optional[str],
+        allowed: Optional[np.ndarray],
+    ) -> SearchResults:
+        """Aramayı olay döngüsü dışında yapar: çalışan süreç havuzu varsa boştaki bir süreçte, yoksa bir iş parçacığında."""
+        loop = asyncio.get_running_loop()
+        if self.workers is not None:
+            return await loop.run_in_executor(
+                self.workers, worker_call, 'search_in_worker', rag.signature, user_questions, question_embeddings, top_k, category, source
+            )
+        return await loop.run_in_executor(
+            None, self._search_chunks_sync, rag, user_questions, question_embeddings, top_k, category, source, allowed
+        )
+
+    def search_in_worker(
+        self,
+        signature: tuple,
+        user_questions: List[str],
+        question_embeddings: np.ndarray,
+        top_k: int,
+        category: Optional[str],
+        source: Optional[str],
+    ) -> SearchResults:
+        """
+        Çalışan süreçte çağrılır. Ana süreç veritabanının yeni bir nesline geçtiyse (imzalar
+        farklıysa) önce bu süreç de yeni nesli yükler; filtre satırları da bu süreçteki nesilden hesaplanır.
+        """
+        if self.reloader.current.signature != signature:
+            self.reloader.reload()
+        rag = self.reloader.current
+        allowed = self._allowed_rows(rag, category, source)
+        return self._search_chunks_sync(rag, user_questions, question_embeddings, top_k, category, source, allowed)
+
+    def _search_chunks_sync(
+        self,
+        rag,
+        user_questions: List[str],
+        question_embeddings: np.ndarray,
+        top_k: int,
+        category: Optional[str],
+        source: Optional[str],
+        allowed: Optional[np.ndarray],
+    ) -> SearchResults:
+        """
+        Kodlanmış soruların tamamı için FAISS'te tek bir matris araması yapar.
+        Sözcüksel indeks varsa her soru BM25 ile de aranır ve iki sıralama RRF ile birleştirilir.
+        Kategori veya kaynak dosya verilirse arama yalnızca o chunk'lar içinde yapılır (ön filtre).
+        Tablo yönlendirmesi açıksa ve kaynak dosya verilmediyse her soru önce tablo indeksinde
+        aranır ve chunk araması en yakın tabloların chunk'larıyla sınırlanır.
+        Yeniden sıralayıcı varsa önce daha fazla aday alınır, cross-encoder ile puanlanıp ilk
+        `top_k` tanesi tutulur.
+        """
+        use_lexical = self.hybrid and rag.lexical is not None
+        fetch_k = max(top_k, self.reranker.candidates) if self.reranker else top_k
+        search_k = fetch_k * HYBRID_CANDIDATE_FACTOR if use_lexical else fetch_k
+        # Sıkıştırılmış indekslerde daha fazla aday alınıp tam vektörlerle yeniden puanlanır
+        dense_k = search_k * int(rag.params.get('rescore_factor', 4)) if rag.vectors is not None else search_k
+
+        routed = bool(self.route_tables) and rag.router is not None and source is None and hasattr(rag.chunks, 'row_filter')
+        allowed_rows = [allowed] * len(user_questions)
+        if routed:
+            tables = rag.router.route(question_embeddings, self.route_tables, category)
+            allowed_rows = [routed_rows(rag.chunks, question_tables, category, allowed) for question_tables in tables]
+
+        print(f"🧠 FAISS veritabanında {len(user_questions)} soru için en yakın {top_k} sonuç aranıyor{' (hibrit: BM25 + vektör)' if use_lexical else ''}{f' (en yakın {self.route_tables} tabloda)' if routed else ''}...")
+        if routed:
+            # Her sorunun satır kümesi farklı olduğundan sorular ayrı ayrı aranır
+            indices = search_each(rag.index, rag.params, question_embeddings, dense_k, allowed_rows)
+        elif allowed is None:
+            distances, indices = rag.index.search(question_embeddings, dense_k)
+        else:
+            # Filtre, arama sonrasında değil FAISS içinde uygulanır: top_k sonucun hepsi filtreye uyar
+            distances, indices = filtered_search(rag.index, rag.params, question_embeddings, dense_k, allowed)
+        if rag.vectors is not None:
+            distances, indices = rescore(rag.vectors, question_embeddings, indices, search_k)
+        if use_lexical:
+            lexical_rows = [
+                rag.lexical.search(question, search_k, allowed=question_allowed)[1]
+                for question, question_allowed in zip(user_questions, allowed_rows)
+            ]
+            indices = [
+                reciprocal_rank_fusion([dense_row, lexical_row], fetch_k, self.rrf_k)
+                for dense_row, lexical_row in zip(indices, lexical_rows)
+            ]
+
+        # IVF/HNSW indeksleri yeterli aday bulamazsa -1 döndürebilir
+        candidates = [[rag.chunks[i] for i in row if i >= 0] for row in indices]
+        if self.reranker is None:
+            return SearchResults(candidates, [True] * len(candidates))
+        return self._rerank_all(user_questions, candidates, top_k)
+
+    def _rerank_all(self, user_questions: List[str], candidates: List[List[Dict[str, Any]]], top_k: int) -> SearchResults:
+        """Soruların adaylarını yeniden sıralar; bir isteğin tüm soruları aynı süre bütçesini paylaşır."""
+        started = time.perf_counter()
+        deadline = started + self.reranker.budget_ms / 1000.0
+        reranked = [
+            self.reranker.rerank(question, question_candidates, top_k, deadline)
+            for question, question_candidates in zip(user_questions, candidates)
+        ]
+        complete = [done for _, done in reranked]
+        print(f"🎯 {sum(len(c) for c in candidates)} aday cross-encoder ile {(time.perf_counter() - started) * 1000:.0f} ms'de yeniden sıralandı.")
+        if not all(complete):
+            print(f"⏱️ {complete.count(False)} soruda süre bütçesi aşıldı; vektör sıralaması kullanıldı, sonuçlar önbelleğe alınmayacak.")
+        return SearchResults([chunks for chunks, _ in reranked], complete)
+
+    def _register_health_route(self):
+        """SSE taşımasında orkestratörler için `/health` uç noktası: hazırsa 200, değilse 503."""
+        if self.transport != 'sse' or not hasattr(self.mcp, 'custom_route'):
+            return
+        from starlette.responses import JSONResponse
+
+        @self.mcp.custom_route("/health", methods=["GET"])
+        async def health(request) -> JSONResponse:
+            status = self.health()
+            return JSONResponse(status, status_code=200 if status['state'] == 'ready' else 503)
+
     def _register_tools(self):
         """Register MCP tools."""
         
         # Eski 'analyze_question_and_select_files' ve 'read_and_convert_files' araçları silindi.
         # Yerine tek ve güçlü RAG aracı geldi.
         @self.mcp.tool()
-        async def answer_question_with_rag(user_question: str, top_k: int = 5) -> str:
+        async def answer_question_with_rag(
+            user_question: str,
+            top_k: int = 5,
+            category: Optional[str] = None,
+            source: Optional[str] = None,
+        ) -> str:
             """
             Kullanıcının sorusunu alır, vektör veritabanında arar, en alakalı
             bilgileri bulur ve nihai bir cevap oluşturmak için bir prompt hazırlar.
+            `category` (data.json'daki kategori klasörü, örn. 'enflasyon') veya `source`
+            (Excel dosya adı) verilirse arama yalnızca o kategori/dosyanın chunk'larında yapılır.
             """
-            if not all([MODEL, FAISS_INDEX, CHUNKS]):
-                return json.dumps({"error": "Sunucu başlangıcında RAG modelleri yüklenemedi."})
+            error = await self._ensure_ready()
+            if error:
+                return error
 
             print(f"\n🔎 Gelen Soru: '{user_question}'")
-            question_embedding = MODEL.encode(user_question)
-            question_embedding = np.array([question_embedding]).astype('float32')
-            
-            print(f"🧠 FAISS veritabanında en yakın {top_k} sonuç aranıyor...")
-            distances, indices = FAISS_INDEX.search(question_embedding, top_k)
-            
-            retrieved_chunks = [CHUNKS[i] for i in indices[0]]
-            context = "\n\n---\n\n".join([chunk['text'] for chunk in retrieved_chunks])
-            sources = list(set([chunk['metadata']['source'] for chunk in retrieved_chunks]))
-            print("📚 İlgili metinler başarıyla bulundu.")
-            
-            final_prompt = f"""## GÖREV ##\nSen, Türkiye İstatistik Kurumu (TÜİK) verileri konusunda uzman bir veri analistisin...\n\n## BAĞLAM ##\n{context}\n\n## KAYNAKLAR ##\n{', '.join(sources)}\n\n## KULLANICI SORUSU ##\n{user_question}\n\n## CEVAP ##"""
-            
-            result = {"user_question": user_question, "retrieved_context": context, "retrieved_sources": sources, "final_prompt_for_llm": final_prompt}
-            return json.dumps(result, ensure_ascii=False, indent=2)
+            try:
+                results = await self._retrieve([user_question], top_k, category, source)
+            except ValueError as e:
+                return json.dumps({"error": str(e)}, ensure_ascii=False)
+            except BrokenProcessPool as e:
+                return await self._workers_failed(e)
+            return json.dumps(results[0], ensure_ascii=False, indent=2)
+
+        @self.mcp.tool()
+        async def answer_questions_with_rag(
+            user_questions: List[str],
+            top_k: int = 5,
+            category: Optional[str] = None,
+            source: Optional[str] = None,
+        ) -> str:
+            """
+            Birden fazla soruyu tek seferde işler. Tüm sorular birlikte kodlanır ve
+            vektör veritabanında tek bir toplu aramayla aranır. Her soru için
+            `answer_question_with_rag` ile aynı yapıda bir sonuç nesnesi döndürür.
+            Kategori/kaynak filtresi tüm sorulara uygulanır.
+            """
+            if not user_questions:
+                return json.dumps([])
+            error = await self._ensure_ready()
+            if error:
+                return error
+
+            print(f"\n🔎 Gelen Soru Sayısı: {len(user_questions)}")
+            try:
+                results = await self._retrieve(user_questions, top_k, category, source)
+            except ValueError as e:
+                return json.dumps({"error": str(e)}, ensure_ascii=False)
+            except BrokenProcessPool as e:
+                return await self._workers_failed(e)
+            return json.dumps(results, ensure_ascii=False, indent=2)
+
+        @self.mcp.tool()
+        async def server_health() -> str:
+            """
+            Sunucunun hazır olma durumunu döndürür: 'starting' (bileşenler yükleniyor),
+            'ready' veya 'failed'; her bileşenin (model, rag, reranker) durumu ve yükleme süresiyle.
+            """
+            return json.dumps(self.health(), ensure_ascii=False)
+
+        @self.mcp.tool()
+        async def reload_rag_index(force: bool = False) -> str:
+            """
+            Yönetici aracı: FAISS indeksini ve chunk deposunu sunucuyu yeniden başlatmadan
+            arka planda yeniden yükler ve yeni nesli atomik olarak devreye alır.
+            Dosyalar değişmediyse `force=True` verilmedikçe yükleme yapılmaz.
+            """
+            loop = asyncio.get_running_loop()
+            reloaded = await loop.run_in_executor(None, self.reloader.reload, force)
+            rag = self.reloader.current
+            return json.dumps({
+                "reloaded": reloaded,
+                "generation": rag.generation if rag else None,
+                "chunk_count": len(rag.chunks) if rag else 0,
+                "result_cache": self.result_cache.info(),
+                "reranker": self._rerank_info(),
+            }, ensure_ascii=False)
+
+def component_loaders(embedding_backend: str, embedding_threads: Optional[int], rerank: bool, rerank_model: str,
+                      rerank_candidates: int, rerank_budget_ms: float) -> Dict[str, Callable[[], Any]]:
+    """Embedding modelini ve (istenirse) yeniden sıralama modelini yükleyen fonksiyonlar."""
+    loaders = {
+        # Arka uç (torch, onnx, onnx-int8, openvino) veritabanını oluşturan arka uçla aynı olmalıdır
+        'model': lambda: load_embedding_model(MODEL_NAME, embedding_backend, embedding_threads or None),
+    }
+    if rerank:
+        loaders['reranker'] = lambda: Reranker(rerank_model, candidates=rerank_candidates, budget_ms=rerank_budget_ms)
+    return loaders
+
+def _create_worker(settings: Dict[str, Any]) -> PaymentMCPServer:
+    """
+    Çalışan süreçte arama yapacak sunucu nesnesini oluşturur: taşıma katmanı açılmaz, model
+    ve veritabanı bu süreçte yüklenir (veritabanı dosyaları bellek eşlemeli paylaşılır).
+    """
+    settings = dict(settings)
+    server = PaymentMCPServer(
+        host='', port=0, transport='worker', watch_interval=0, loaders=component_loaders(**settings.pop('components')), **settings
+    )
+    server.startup.start()
+    if server.startup.wait() != 'ready':
+        raise RuntimeError(f"Worker startup failed: {json.dumps(server.startup.status(), ensure_ascii=False)}")
+    return server
 
 # --- ORİJİNAL KODUNUZDAN KORUNAN BAŞLATMA YAPISI ---
 @click.command()
@@ -142,10 +575,36 @@ class PaymentMCPServer: # Orijinal sınıf adınızı koruyoruz
 @click.option('--port', default=8070, help='Server port (default: 8070)') # Portu orijinal haline (8070) geri getirdik
 @click.option('--transport', envvar='TRANSPORT', default='sse', help='Transport type (default: sse)')
 @click.option('--auth-token', envvar='AUTH_TOKEN', help='Bearer token for SSE transport.')
-def main(host, port, transport, auth_token):
+@click.option('--encode-batch-size', envvar='ENCODE_BATCH_SIZE', default=32, help='Max questions encoded together in one batch (default: 32)')
+@click.option('--encode-max-wait-ms', envvar='ENCODE_MAX_WAIT_MS', default=5.0, help='Time window for collecting a batch, in ms (default: 5)')
+@click.option('--nprobe', envvar='FAISS_NPROBE', type=int, help='Override IVF nprobe stored with the index.')
+@click.option('--ef-search', envvar='FAISS_EF_SEARCH', type=int, help='Override HNSW efSearch stored with the index.')
+@click.option('--watch-interval', envvar='INDEX_WATCH_INTERVAL', default=30.0, help='Seconds between checks for a rebuilt index; 0 disables (default: 30)')
+@click.option('--hybrid/--no-hybrid', envvar='HYBRID_SEARCH', default=True, help='Fuse BM25 and vector results when a lexical index exists (default: on)')
+@click.option('--rrf-k', envvar='RRF_K', default=60, help='Reciprocal rank fusion constant (default: 60)')
+@click.option('--route-tables', envvar='ROUTE_TABLES', default=0, help='Search only the chunks of the N tables closest to the question; 0 disables (default: 0)')
+@click.option('--cache-size', envvar='RESULT_CACHE_SIZE', default=1024, help='Max cached results per cache tier; 0 disables the result cache (default: 1024)')
+@click.option('--cache-ttl', envvar='RESULT_CACHE_TTL', default=3600.0, help='Seconds a cached result stays valid; 0 means no expiry (default: 3600)')
+@click.option('--semantic-cache-threshold', envvar='SEMANTIC_CACHE_THRESHOLD', default=0.97, help='Min cosine similarity to reuse the result of a similar question; 0 disables the semantic tier (default: 0.97)')
+@click.option('--rerank/--no-rerank', envvar='RERANK', default=False, help='Rerank retrieved candidates with a cross-encoder (default: off)')
+@click.option('--rerank-model', envvar='RERANK_MODEL', default=DEFAULT_RERANK_MODEL, help=f'Cross-encoder model for reranking (default: {DEFAULT_RERANK_MODEL})')
+@click.option('--rerank-candidates', envvar='RERANK_CANDIDATES', default=50, help='Candidates fetched per question for reranking (default: 50)')
+@click.option('--rerank-budget-ms', envvar='RERANK_BUDGET_MS', default=300.0, help='Per-request rerank time budget; vector order is kept when exceeded (default: 300)')
+@click.option('--embedding-backend', envvar='EMBEDDING_BACKEND', default='torch', type=click.Choice(EMBEDDING_BACKENDS), help='Inference backend for the embedding model; must match the one used to build the index (default: torch)')
+@click.option('--embedding-threads', envvar='EMBEDDING_THREADS', default=0, help='Threads for embedding inference; 0 uses the library default (default: 0)')
+@click.option('--ready-timeout', envvar='READY_TIMEOUT', default=30.0, help='Seconds a request waits for startup loading before failing; 0 fails immediately (default: 30)')
+@click.option('--workers', envvar='WORKERS', default=1, help='Worker processes that encode and search; the server process keeps the SSE sessions and the cache (default: 1, in-process)')
+@click.option('--worker-threads', envvar='WORKER_THREADS', default=0, help='Torch/FAISS threads per worker process; 0 splits the CPU cores evenly (default: 0)')
+@click.option('--mmap-index/--no-mmap-index', envvar='MMAP_INDEX', default=True, help='Memory-map the FAISS index so processes and reloads share its pages (default: on)')
+def main(host, port, transport, auth_token, encode_batch_size, encode_max_wait_ms, nprobe, ef_search, watch_interval, hybrid, rrf_k, route_tables,
+         cache_size, cache_ttl, semantic_cache_threshold, rerank, rerank_model, rerank_candidates, rerank_budget_ms,
+         embedding_backend, embedding_threads, ready_timeout, workers, worker_threads, mmap_index):
     """Start the TUIK RAG MCP server."""
     
     logger = setup_logger(__name__)
+
+    # Geri çağırma/hız ayarı: indeksle kaydedilen arama parametrelerinin üzerine yaz
+    search_overrides = {'nprobe': nprobe, 'ef_search': ef_search}
     
     try:
         valid_transports = ['stdio', 'sse']
@@ -155,9 +614,37 @@ def main(host, port, transport, auth_token):
         logger.info(f"Starting TUIK RAG MCP server")
         logger.info(f"Transport: {transport}")
         logger.info(f"Server will run on {host}:{port}")
-        
+
+        if rerank:
+            logger.info(f"Rerank model {rerank_model} (candidates={rerank_candidates}, budget={rerank_budget_ms:g} ms)")
+        rerank_settings = dict(model=rerank_model, candidates=rerank_candidates, budget_ms=rerank_budget_ms) if rerank else None
+        search_settings = dict(
+            search_overrides=search_overrides, hybrid=hybrid, rrf_k=rrf_k, route_tables=route_tables, mmap_index=mmap_index,
+            rerank_settings=rerank_settings,
+        )
+        components = dict(
+            embedding_backend=embedding_backend, embedding_threads=embedding_threads, rerank=rerank,
+            rerank_model=rerank_model, rerank_candidates=rerank_candidates, rerank_budget_ms=rerank_budget_ms,
+        )
+        # Bileşenler burada yüklenmez; sunucu başlatılınca arka planda paralel yüklenir
+        pool, loaders = None, component_loaders(**components)
+        if workers > 1:
+            # Model ve yeniden sıralayıcı yalnızca çalışan süreçlerde yüklenir
+            threads = worker_threads or default_threads(workers)
+            logger.info(f"Serving with {workers} worker processes, {threads} threads each")
+            pool = WorkerPool(
+                workers, _create_worker, (dict(search_settings, components=dict(components, embedding_threads=embedding_threads or threads)),),
+                threads=threads, logger=logger,
+            )
+            loaders = {}
+
         async def _run():
-            server = PaymentMCPServer(host=host, port=port, transport=transport, auth_token=auth_token)
+            server = PaymentMCPServer(
+                host=host, port=port, transport=transport, auth_token=auth_token,
+                encode_batch_size=encode_batch_size, encode_max_wait_ms=encode_max_wait_ms,
+                watch_interval=watch_interval, result_cache=ResultCache(cache_size, cache_ttl, semantic_cache_threshold),
+                loaders=loaders, ready_timeout=ready_timeout, workers=pool, **search_settings,
+            )
             mcp = await server.initialize()
             logger.info("MCP server started successfully")
             return mcp
@@ -0,0 +1,85 @@
+import os
+import sys
+
+# Testler depo kökündeki modülleri (utils, build_vector_db, ...) doğrudan içe aktarır
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubFileServer:
+    """
+    TÜİK dosya sunucusunun yerine geçen yerel HTTP sunucusu. `files` içindeki içerikleri
+    ETag, If-None-Match, Range ve If-Range desteğiyle sunar; gelen istekleri `requests` listesine yazar.
+    `etags=False` ile doğrulayıcı göndermeyen bir sunucu taklit edilir. Yollar sorgu
+    dizgesiyle birlikte eşleştirilir; `content_types` ile yol başına Content-Type verilebilir.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        self.etags = True
+        self.fail_next = {}
+        self.content_types = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.requests.append((self.path, dict(self.headers)))
+                if stub.fail_next.get(self.path):
+                    stub.fail_next[self.path] -= 1
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = stub.files.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                etag = stub.etag(body)
+                if stub.etags and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                start = 0
+                # If-Range doğrulayıcısı tutmazsa (dosya değişmişse) tam dosya gönderilir
+                if self.headers.get('Range') and self.headers.get('If-Range', etag) == etag:
+                    start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+                else:
+                    self.send_response(200)
+                if stub.etags:
+                    self.send_header('ETag', etag)
+                if self.path in stub.content_types:
+                    self.send_header('Content-Type', stub.content_types[self.path])
+                self.send_header('Content-Length', str(len(body) - start))
+                self.end_headers()
+                self.wfile.write(body[start:])
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def etag(body):
+        return f'"{hash(body) & 0xffffffff:x}"'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def file_server():
+    server = StubFileServer()
+    yield server
+    server.close()
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from utils.batch_encoder import BatchingEncoder
+
+
+class RecordingEncoder:
+    """Her metni uzunluğuna eşit tek boyutlu vektöre kodlar ve gelen grupları kaydeder."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model çöktü")
+        return np.array([[len(text)] for text in texts], dtype='float32')
+
+
+def test_concurrent_requests_are_batched_and_results_keep_their_order():
+    encode_fn = RecordingEncoder()
+    encoder = BatchingEncoder(encode_fn, max_batch_size=8, max_wait_ms=50)
+    texts = ['a' * i for i in range(1, 21)]
+
+    async def _run():
+        return await asyncio.gather(*(encoder.encode(text) for text in texts))
+
+    vectors = asyncio.run(_run())
+
+    assert [float(vector[0]) for vector in vectors] == list(range(1, 21))
+    assert sorted(len(batch) for batch in encode_fn.batches) == [4, 8, 8]
+    assert [text for batch in encode_fn.batches for text in batch] == texts
+
+
+def test_encode_many_returns_rows_in_input_order():
+    encode_fn = RecordingEncoder()
+    encoder = BatchingEncoder(encode_fn, max_batch_size=3, max_wait_ms=10)
+
+    vectors = asyncio.run(encoder.encode_many(['aaaa', 'b', 'ccc', 'dd', 'eeeee']))
+
+    assert vectors.shape == (5, 1)
+    np.testing.assert_array_equal(vectors[:, 0], [4, 1, 3, 2, 5])
+    assert all(len(batch) <= 3 for batch in encode_fn.batches)
+
+
+def test_errors_reach_every_waiter_of_the_batch():
+    encoder = BatchingEncoder(RecordingEncoder(fail=True), max_batch_size=8, max_wait_ms=20)
+
+    async def _run():
+        return await asyncio.gather(*(encoder.encode(f'soru {i}') for i in range(5)), return_exceptions=True)
+
+    results = asyncio.run(_run())
+
+    assert len(results) == 5
+    assert all(isinstance(result, RuntimeError) and "model çöktü" in str(result) for result in results)
+
+
+def test_encoder_keeps_working_after_a_failed_batch():
+    encode_fn = RecordingEncoder(fail=True)
+    encoder = BatchingEncoder(encode_fn, max_batch_size=4, max_wait_ms=5)
+
+    async def _run():
+        with pytest.raises(RuntimeError):
+            await encoder.encode('ilk')
+        encode_fn.fail = False
+        return await encoder.encode('ikinci')
+
+    assert float(asyncio.run(_run())[0]) == len('ikinci')
@@ -0,0 +1,82 @@
+from utils.chunk_checkpoint import ChunkCheckpoint
+
+
+def chunks(source, count):
+    return [{'text': f'{source} satır {i}', 'metadata': {'source': source}} for i in range(count)]
+
+
+def test_empty_record_supersedes_previous_chunks(tmp_path):
+    path = str(tmp_path / 'all_chunks.ckpt')
+    checkpoint = ChunkCheckpoint(path)
+    checkpoint.append('a.xls', chunks('a.xls', 3))
+    # Yeniden işlenen dosya artık chunk üretmiyor: dosya işlenmiş sayılır, eski chunk'ları atılır
+    checkpoint.append('a.xls', [])
+
+    reopened = ChunkCheckpoint(path)
+    assert 'a.xls' in reopened
+    assert reopened.read('a.xls') == []
+    assert reopened.chunk_count() == 0
+
+
+def test_later_record_supersedes_earlier_one(tmp_path):
+    path = str(tmp_path / 'all_chunks.ckpt')
+    checkpoint = ChunkCheckpoint(path)
+    checkpoint.append('a.xls', chunks('a.xls', 3))
+    checkpoint.append('b.xls', chunks('b.xls', 2))
+    checkpoint.append('a.xls', chunks('a.xls', 5))
+
+    reopened = ChunkCheckpoint(path)
+    assert len(reopened) == 2
+    assert reopened.chunk_count() == 7
+    assert len(reopened.read('a.xls')) == 5
+    # Kayıtlar dosya sırasıyla okunur: b.xls'ten sonra yazılan a.xls kaydı sonda gelir
+    assert [source for source, _ in reopened.iter_records()] == ['b.xls', 'a.xls']
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    path = tmp_path / 'all_chunks.ckpt'
+    checkpoint = ChunkCheckpoint(str(path))
+    checkpoint.append('a.xls', chunks('a.xls', 3))
+    checkpoint.append('b.xls', chunks('b.xls', 2))
+    intact = path.stat().st_size
+    # Yazma sırasında çöken bir kayıt: yarım başlık + veri, yan indekste de yok
+    with open(path, 'ab') as f:
+        f.write(b'TCK1\x05\x00' + b'x' * 10)
+
+    reopened = ChunkCheckpoint(str(path))
+    assert path.stat().st_size == intact
+    assert reopened.sources() == {'a.xls', 'b.xls'}
+    reopened.append('c.xls', chunks('c.xls', 1))
+    assert ChunkCheckpoint(str(path)).chunk_count() == 6
+
+
+def test_records_missing_from_the_index_are_recovered(tmp_path):
+    path = tmp_path / 'all_chunks.ckpt'
+    checkpoint = ChunkCheckpoint(str(path))
+    checkpoint.append('a.xls', chunks('a.xls', 3))
+    checkpoint.append('b.xls', chunks('b.xls', 2))
+    # Yan indeksin son satırı yazılamadan çökme: kayıt veri dosyasından taranarak bulunur
+    index = tmp_path / 'all_chunks.ckpt.idx'
+    index.write_text(index.read_text(encoding='utf-8').splitlines()[0] + "\n", encoding='utf-8')
+
+    reopened = ChunkCheckpoint(str(path))
+    assert reopened.read('b.xls') == chunks('b.xls', 2)
+    assert len(index.read_text(encoding='utf-8').splitlines()) == 2
+
+
+def test_compact_drops_superseded_records(tmp_path):
+    path = tmp_path / 'all_chunks.ckpt'
+    checkpoint = ChunkCheckpoint(str(path))
+    for count in (3, 4, 5):
+        checkpoint.append('a.xls', chunks('a.xls', count))
+    checkpoint.append('b.xls', chunks('b.xls', 2))
+    before = path.stat().st_size
+
+    checkpoint.compact()
+
+    assert path.stat().st_size < before
+    assert not (tmp_path / 'all_chunks.ckpt.compact').exists()
+    reopened = ChunkCheckpoint(str(path))
+    assert reopened.chunk_count() == 7
+    assert reopened.read('a.xls') == chunks('a.xls', 5)
+    assert list(reopened.iter_chunks()) == chunks('a.xls', 5) + chunks('b.xls', 2)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from utils.chunk_store import ChunkStore, write_chunk_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    chunks = [
+        {'text': f'tablo{t} satır {i}', 'metadata': {'source': f'tablo{t}.xls', 'type': 'data_point'}}
+        for t in range(6) for i in range(5)
+    ]
+    categories = {f'tablo{t}.xls': 'enflasyon' if t % 2 else 'istihdam' for t in range(6)}
+    write_chunk_store(chunks, str(tmp_path), categories)
+    return ChunkStore(str(tmp_path))
+
+
+def test_row_filter_matches_metadata(store):
+    rows = store.row_filter(category='enflasyon')
+    assert len(rows) == 15
+    assert all(store[int(i)]['metadata']['source'] in ('tablo1.xls', 'tablo3.xls', 'tablo5.xls') for i in rows)
+    np.testing.assert_array_equal(store.row_filter(category='enflasyon', source='tablo3.xls'), np.arange(15, 20))
+    assert len(store.row_filter(category='istihdam', source='tablo3.xls')) == 0
+
+
+def test_unknown_names_are_not_cached(store):
+    for i in range(100):
+        assert len(store.row_filter(source=f'yok{i}.xls')) == 0
+        assert len(store.row_filter(category=f'yok{i}')) == 0
+    assert len(store._filters) == 0
+
+
+def test_filter_cache_is_bounded(store, monkeypatch):
+    monkeypatch.setattr(ChunkStore, 'MAX_CACHED_FILTERS', 3)
+    for t in range(6):
+        store.row_filter(source=f'tablo{t}.xls')
+    assert list(store._filters) == [(None, 'tablo3.xls'), (None, 'tablo4.xls'), (None, 'tablo5.xls')]
+    # Son kullanılan en sona taşınır
+    store.row_filter(source='tablo3.xls')
+    store.row_filter(source='tablo0.xls')
+    assert list(store._filters) == [(None, 'tablo5.xls'), (None, 'tablo3.xls'), (None, 'tablo0.xls')]
@@ -0,0 +1,11 @@
+import os
+
+from utils.download_manifest import MANIFEST_FILE, MANIFEST_PATH, PROJECT_DIR
+
+
+def test_manifest_path_is_next_to_the_scripts(tmp_path, monkeypatch):
+    # Betikler farklı bir çalışma dizininden çalıştırılsa da aynı manifesti kullanmalı
+    monkeypatch.chdir(tmp_path)
+    assert MANIFEST_PATH == os.path.join(PROJECT_DIR, MANIFEST_FILE)
+    for script in ('build_vector_db.py', 'prepare_data.py'):
+        assert os.path.isfile(os.path.join(PROJECT_DIR, script))
@@ -0,0 +1,157 @@
+import json
+
+from utils.download_manifest import DownloadManifest
+from utils.downloader import Downloader
+
+
+def make_downloader(tmp_path, refresh=True, **kwargs):
+    manifest = DownloadManifest(str(tmp_path / 'download_manifest.json'))
+    return Downloader(max_workers=2, backoff=0.01, manifest=manifest, refresh=refresh, **kwargs), manifest
+
+
+def test_first_refresh_of_existing_corpus_marks_nothing_dirty(tmp_path, file_server):
+    # Manifestten önce indirilmiş dosyalar: içerik aynıysa yeniden chunk'lanmamalı
+    file_server.etags = False
+    file_server.files['/a.xls'] = b'a' * 1000
+    (tmp_path / 'a.xls').write_bytes(b'a' * 1000)
+    downloader, manifest = make_downloader(tmp_path)
+
+    result = downloader.download(f'{file_server.url}/a.xls', str(tmp_path / 'a.xls'))
+
+    assert result.status == 'unchanged'
+    assert manifest.get(str(tmp_path / 'a.xls'))['sha256']
+    assert manifest.dirty_sources() == set()
+
+
+def test_changed_and_new_files_are_dirty(tmp_path, file_server):
+    file_server.etags = False
+    file_server.files['/a.xls'] = b'new content'
+    file_server.files['/b.xls'] = b'brand new'
+    (tmp_path / 'a.xls').write_bytes(b'old content')
+    downloader, manifest = make_downloader(tmp_path)
+
+    statuses = {
+        name: downloader.download(f'{file_server.url}/{name}', str(tmp_path / name)).status
+        for name in ('a.xls', 'b.xls')
+    }
+
+    assert statuses == {'a.xls': 'downloaded', 'b.xls': 'downloaded'}
+    assert (tmp_path / 'a.xls').read_bytes() == b'new content'
+    assert manifest.dirty_sources() == {'a.xls', 'b.xls'}
+
+
+def test_unchanged_bytes_keep_dirty_flag_until_cleared(tmp_path, file_server):
+    file_server.etags = False
+    file_server.files['/a.xls'] = b'content'
+    downloader, manifest = make_downloader(tmp_path)
+    path = str(tmp_path / 'a.xls')
+    downloader.download(f'{file_server.url}/a.xls', path)
+
+    # Henüz chunk'lanmamış kirli dosya, içeriği aynı gelse de kirli kalır
+    assert downloader.download(f'{file_server.url}/a.xls', path).status == 'unchanged'
+    assert manifest.dirty_sources() == {'a.xls'}
+    manifest.clear_dirty('a.xls')
+    assert downloader.download(f'{file_server.url}/a.xls', path).status == 'unchanged'
+    assert manifest.dirty_sources() == set()
+
+
+def test_conditional_request_returns_304(tmp_path, file_server):
+    file_server.files['/a.xls'] = b'content'
+    downloader, manifest = make_downloader(tmp_path)
+    path = str(tmp_path / 'a.xls')
+    downloader.download(f'{file_server.url}/a.xls', path)
+    manifest.clear_dirty('a.xls')
+
+    result = downloader.download(f'{file_server.url}/a.xls', path)
+
+    assert result.status == 'unchanged'
+    assert 'If-None-Match' in file_server.requests[-1][1]
+    assert manifest.get(path)['checked_at']
+    assert manifest.dirty_sources() == set()
+
+
+def test_manifest_is_saved_after_download_all(tmp_path, file_server):
+    from utils.downloader import DownloadJob
+    file_server.files['/a.xls'] = b'content'
+    downloader, _ = make_downloader(tmp_path)
+
+    downloader.download_all([DownloadJob(f'{file_server.url}/a.xls', str(tmp_path / 'a.xls'))])
+
+    with open(tmp_path / 'download_manifest.json', encoding='utf-8') as f:
+        assert json.load(f)['a.xls']['dirty'] is True
+
+
+def interrupted_download(tmp_path, data, etag=None):
+    # Önceki çalıştırmada yarıda kesilmiş indirme
+    (tmp_path / 'a.xls.part').write_bytes(data)
+    if etag is not None:
+        (tmp_path / 'a.xls.part.json').write_text(json.dumps({'etag': etag, 'last_modified': None}))
+
+
+def test_partial_download_resumes_with_range(tmp_path, file_server):
+    body = bytes(range(256)) * 8
+    file_server.files['/a.xls'] = body
+    path = tmp_path / 'a.xls'
+    interrupted_download(tmp_path, body[:700], file_server.etag(body))
+    downloader, manifest = make_downloader(tmp_path)
+
+    result = downloader.download(f'{file_server.url}/a.xls', str(path))
+
+    assert result.status == 'downloaded'
+    headers = file_server.requests[-1][1]
+    assert headers['Range'] == 'bytes=700-' and headers['If-Range'] == file_server.etag(body)
+    assert path.read_bytes() == body
+    assert not (tmp_path / 'a.xls.part').exists() and not (tmp_path / 'a.xls.part.json').exists()
+    assert manifest.get(str(path))['size'] == len(body)
+
+
+def test_partial_download_restarts_when_file_changed(tmp_path, file_server):
+    old, new = b'x' * 2048, bytes(range(256)) * 8
+    file_server.files['/a.xls'] = new
+    interrupted_download(tmp_path, old[:700], file_server.etag(old))
+    downloader, _ = make_downloader(tmp_path)
+
+    result = downloader.download(f'{file_server.url}/a.xls', str(tmp_path / 'a.xls'))
+
+    # Sunucu If-Range tutmadığı için tam dosyayı gönderir; eski baytlar kullanılmaz
+    assert result.status == 'downloaded'
+    assert (tmp_path / 'a.xls').read_bytes() == new
+
+
+def test_partial_download_without_validator_restarts_from_zero(tmp_path, file_server):
+    body = bytes(range(256)) * 8
+    file_server.files['/a.xls'] = body
+    interrupted_download(tmp_path, b'y' * 700)
+    downloader, _ = make_downloader(tmp_path)
+
+    result = downloader.download(f'{file_server.url}/a.xls', str(tmp_path / 'a.xls'))
+
+    assert result.status == 'downloaded'
+    assert 'Range' not in file_server.requests[-1][1]
+    assert (tmp_path / 'a.xls').read_bytes() == body
+
+
+def test_transient_errors_are_retried(tmp_path, file_server):
+    file_server.files['/a.xls'] = b'content'
+    file_server.fail_next['/a.xls'] = 2
+    downloader, _ = make_downloader(tmp_path)
+
+    result = downloader.download(f'{file_server.url}/a.xls', str(tmp_path / 'a.xls'))
+
+    assert result.status == 'downloaded'
+    assert len(file_server.requests) == 3
+
+
+def test_retries_are_bounded_and_permanent_errors_are_not_retried(tmp_path, file_server):
+    file_server.files['/a.xls'] = b'content'
+    file_server.fail_next['/a.xls'] = 10
+    downloader, _ = make_downloader(tmp_path, max_retries=2)
+
+    result = downloader.download(f'{file_server.url}/a.xls', str(tmp_path / 'a.xls'))
+    assert result.status == 'failed' and '503' in str(result.error)
+    assert len(file_server.requests) == 3
+
+    result = downloader.download(f'{file_server.url}/yok.xls', str(tmp_path / 'yok.xls'))
+    assert result.status == 'failed'
+    assert len(file_server.requests) == 4
+    assert not (tmp_path / 'yok.xls').exists()
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from utils.embedding_cache import KEY_SIZE, EmbeddingCache
+
+DIMENSION = 4
+
+
+class CountingEncoder:
+    def __init__(self, offset=0.0):
+        self.offset = offset
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(text) + self.offset] * DIMENSION for text in texts], dtype='float32')
+
+
+def test_only_new_texts_are_encoded_and_order_is_kept(tmp_path):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache('model', str(tmp_path))
+    cache.encode(['a', 'bb'], encoder, verbose=False)
+
+    vectors = EmbeddingCache('model', str(tmp_path)).encode(['ccc', 'a', 'bb', 'ccc'], encoder, verbose=False)
+
+    assert encoder.encoded == ['a', 'bb', 'ccc']
+    np.testing.assert_array_equal(vectors[:, 0], [3, 1, 2, 3])
+
+
+def test_truncated_files_are_repaired_and_resumed(tmp_path):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache('model', str(tmp_path))
+    cache.encode(['a', 'bb', 'ccc'], encoder, batch_size=1, verbose=False)
+    # Yazma sırasında kesilme: son vektörün yarısı ve anahtarın bir kısmı diske yazılmış
+    with open(cache.vectors_path, 'r+b') as f:
+        f.truncate(2 * 4 * DIMENSION + 6)
+    with open(cache.keys_path, 'ab') as f:
+        f.write(b'\x01' * (KEY_SIZE // 2))
+
+    resumed = EmbeddingCache('model', str(tmp_path))
+    assert len(resumed) == 2
+    vectors = resumed.encode(['a', 'bb', 'ccc'], encoder, verbose=False)
+
+    # Yalnızca tamamlanmamış satır yeniden kodlanır
+    assert encoder.encoded == ['a', 'bb', 'ccc', 'ccc']
+    np.testing.assert_array_equal(vectors[:, 0], [1, 2, 3])
+    assert len(EmbeddingCache('model', str(tmp_path))) == 3
+
+
+def test_vectors_are_keyed_by_model_and_backend(tmp_path):
+    torch_encoder, onnx_encoder = CountingEncoder(), CountingEncoder(offset=0.5)
+    torch_cache = EmbeddingCache('model', str(tmp_path))
+    onnx_cache = EmbeddingCache('model@onnx', str(tmp_path))
+    torch_cache.encode(['a'], torch_encoder, verbose=False)
+
+    vectors = onnx_cache.encode(['a'], onnx_encoder, verbose=False)
+
+    # Aynı metin başka bir arka uçta önbellekten gelmez; vektörler karışmaz
+    assert onnx_encoder.encoded == ['a']
+    assert torch_cache.path != onnx_cache.path and torch_cache.key('a') != onnx_cache.key('a')
+    assert vectors[0, 0] == 1.5
+    assert EmbeddingCache('model', str(tmp_path)).encode(['a'], torch_encoder, verbose=False)[0, 0] == 1.0
+
+
+def test_cache_key_separates_backends():
+    pytest.importorskip('sentence_transformers')
+    from utils.embedding_backend import cache_key
+
+    assert cache_key('model', 'torch') == 'model'
+    assert len({cache_key('model', backend) for backend in ('torch', 'onnx', 'openvino')}) == 3
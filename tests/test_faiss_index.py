@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from utils.faiss_index import (
+    DEFAULT_INDEX_PARAMS, append_vectors, build_index, filtered_search, read_vectors_build_id, write_vectors,
+)
+
+
+@pytest.fixture(scope='module')
+def vectors():
+    return np.random.default_rng(0).random((3600, 32)).astype('float32')
+
+
+@pytest.mark.parametrize('index_type', ['flat', 'ivf_flat', 'ivf_pq', 'hnsw', 'sq_fp16', 'sq8'])
+def test_filtered_search_returns_only_allowed_ids(vectors, index_type):
+    params = dict(DEFAULT_INDEX_PARAMS, index_type=index_type, nlist=32, nprobe=32, pq_m=8)
+    index = build_index(vectors, params)
+    allowed = np.sort(np.random.default_rng(1).choice(3000, 50, replace=False))
+
+    _, ids = filtered_search(index, params, vectors[:20], 10, allowed)
+
+    found = ids[ids >= 0]
+    assert len(found)
+    assert np.isin(found, allowed).all()
+
+
+def test_filtered_search_finds_the_allowed_neighbour(vectors):
+    params = dict(DEFAULT_INDEX_PARAMS, index_type='flat')
+    index = build_index(vectors, params)
+    allowed = np.array([7, 1234, 3599])
+
+    _, ids = filtered_search(index, params, vectors[[1234]], 1, allowed)
+
+    assert ids[0, 0] == 1234
+
+
+def test_vectors_carry_the_build_id(tmp_path, vectors):
+    path = str(tmp_path / 'vectors.npy')
+    write_vectors(vectors[:10], path, build_id='ilk')
+    assert read_vectors_build_id(path) == 'ilk'
+    assert append_vectors(vectors[10:15], 10, path, build_id='ikinci')
+    assert read_vectors_build_id(path) == 'ikinci'
+    assert np.load(path).shape == (15, vectors.shape[1])
+    # Satır sayısı uyuşmayan dosya kimliğiyle birlikte silinir
+    assert not append_vectors(vectors[:5], 3, path, build_id='üçüncü')
+    assert read_vectors_build_id(path) is None
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.gemini_pipeline import AdaptiveConcurrency, ChunkingPipeline, GeminiClient, RateLimiter
+
+
+class StubGemini:
+    """`generateContent` taklidi: sıradaki cevapları `script`ten, sonra başarılı cevap döndürür."""
+
+    def __init__(self):
+        self.script = []
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub.requests += 1
+                status, headers = (stub.script.pop(0) if stub.script else (200, {}))
+                if status == 200:
+                    body = json.dumps({
+                        'candidates': [{'content': {'parts': [{'text': json.dumps(["a", "b"])}]}}],
+                        'usageMetadata': {'totalTokenCount': 10},
+                    }).encode()
+                else:
+                    body = b'{"error": "stub"}'
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def gemini():
+    stub = StubGemini()
+    yield stub
+    stub.close()
+
+
+def run_pipeline(stub, files, on_success=None, **kwargs):
+    successes, failures = {}, {}
+
+    def default_success(info, chunks):
+        successes[info['path']] = chunks
+
+    async def _run():
+        client = GeminiClient("test-key", endpoint=stub.endpoint)
+        pipeline = ChunkingPipeline(
+            client, RateLimiter(None, None), AdaptiveConcurrency(initial=2, maximum=2, cooldown=0.0),
+            base_backoff=0.01, **kwargs,
+        )
+        try:
+            await asyncio.wait_for(
+                pipeline.run(
+                    [{'path': f"data/{name}.xls", 'category': 'test'} for name in files],
+                    lambda path: "a,b\n1,2",
+                    on_success or default_success,
+                    lambda info, error: failures.__setitem__(info['path'], error),
+                ),
+                timeout=10,
+            )
+        finally:
+            await client.aclose()
+
+    asyncio.run(_run())
+    return successes, failures
+
+
+def test_rate_limit_does_not_use_up_retries(gemini):
+    gemini.script = [(429, {'Retry-After': '0.01'})] * 4
+    successes, failures = run_pipeline(gemini, ["t1"], max_retries=2)
+    assert not failures
+    assert [c['text'] for c in successes["data/t1.xls"]] == ["a", "b"]
+    assert gemini.requests == 5
+
+
+def test_persistent_rate_limit_fails_after_max_quota_wait(gemini):
+    gemini.script = [(429, {'Retry-After': '0.05'})] * 100
+    successes, failures = run_pipeline(gemini, ["t1"], max_quota_wait=0.22)
+    assert not successes
+    assert "Kota" in str(failures["data/t1.xls"])
+    assert gemini.requests == 5
+
+
+def test_server_errors_are_retried_then_fail(gemini):
+    gemini.script = [(500, {})]
+    successes, failures = run_pipeline(gemini, ["t1"], max_retries=3)
+    assert "data/t1.xls" in successes and not failures
+
+    gemini.requests = 0
+    gemini.script = [(500, {})] * 10
+    successes, failures = run_pipeline(gemini, ["t1"], max_retries=3)
+    assert "HTTP 500" in str(failures["data/t1.xls"])
+    assert gemini.requests == 3
+
+
+def test_callback_error_is_recorded_and_does_not_stop_workers(gemini):
+    successes = {}
+
+    def on_success(info, chunks):
+        if info['path'].endswith("bad.xls"):
+            raise OSError("disk dolu")
+        successes[info['path']] = chunks
+
+    # Tek işçi de takılsa tüm dosyalar bitmeli; aksi halde wait_for zaman aşımına uğrar
+    _, failures = run_pipeline(gemini, ["bad", "t1", "t2", "t3"], on_success=on_success)
+    assert isinstance(failures["data/bad.xls"], OSError)
+    assert set(successes) == {"data/t1.xls", "data/t2.xls", "data/t3.xls"}
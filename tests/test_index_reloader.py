@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from utils.chunk_store import write_chunk_store
+from utils.faiss_index import DEFAULT_INDEX_PARAMS, build_index, write_index
+from utils.index_reloader import IndexReloader, files_signature, load_generation
+
+DIMENSION = 8
+
+
+def write_database(path, count, write_store=True, write_idx=True, build_id=None):
+    build_id = build_id or f'derleme-{count}'
+    chunks = [{'text': f'satır {i}', 'metadata': {'source': 'tablo.xls', 'type': 'data_point'}} for i in range(count)]
+    if write_store:
+        write_chunk_store(chunks, f'{path}/chunks', build_id=build_id)
+    if write_idx:
+        embeddings = np.random.default_rng(count).normal(size=(count, DIMENSION)).astype('float32')
+        params = dict(DEFAULT_INDEX_PARAMS, index_type='flat')
+        write_index(build_index(embeddings, params), params, f'{path}/index.faiss', chunk_count=count, build_id=build_id)
+
+
+def loader(path):
+    def load(generation=1, overrides=None):
+        return load_generation(
+            generation, overrides, index_path=f'{path}/index.faiss', store_path=f'{path}/chunks',
+            lexical_path=f'{path}/lexical', router_path=f'{path}/tables', vectors_path=f'{path}/vectors.npy',
+        )
+    return load
+
+
+def test_load_generation_matches_index_and_store(tmp_path):
+    write_database(tmp_path, 20)
+    rag = loader(tmp_path)()
+    assert rag.index.ntotal == len(rag.chunks) == 20
+    assert rag.params['chunk_count'] == 20
+
+
+def test_new_index_with_old_store_is_rejected(tmp_path):
+    write_database(tmp_path, 20)
+    # Derleme betiği yeni indeksi yazdı, depo henüz eski
+    write_database(tmp_path, 30, write_store=False)
+    with pytest.raises(ValueError):
+        loader(tmp_path)()
+
+
+def test_new_store_with_old_index_is_rejected(tmp_path):
+    write_database(tmp_path, 20)
+    # Depo indeksten önce yazılır; bu arada okunan eski indeks de reddedilmeli
+    write_database(tmp_path, 10, write_idx=False)
+    with pytest.raises(ValueError):
+        loader(tmp_path)()
+
+
+def test_same_count_from_another_build_is_rejected(tmp_path):
+    write_database(tmp_path, 20, build_id='eski')
+    # Sayılar aynı kalsa da yeni depo başka chunk'lar içerebilir
+    write_database(tmp_path, 20, write_idx=False, build_id='yeni')
+    with pytest.raises(ValueError):
+        loader(tmp_path)()
+    write_database(tmp_path, 20, write_store=False, build_id='yeni')
+    assert loader(tmp_path)().params['build_id'] == 'yeni'
+
+
+def test_reload_keeps_current_generation_on_mismatch(tmp_path):
+    write_database(tmp_path, 20)
+    signature = lambda: files_signature(f'{tmp_path}/index.faiss', f'{tmp_path}/chunks')
+    reloader = IndexReloader(None, loader=loader(tmp_path), signature_fn=signature)
+    first = reloader.load_initial()
+
+    write_database(tmp_path, 30, write_store=False)
+    assert not reloader.reload()
+    assert reloader.current is first
+
+    write_database(tmp_path, 30)
+    assert reloader.reload()
+    assert reloader.current.generation == 2 and len(reloader.current.chunks) == 30
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from utils.chunk_store import ChunkStore, append_chunks, write_chunk_store
+from utils.lexical_index import LexicalIndex, append_from_store, build_from_store, build_lexical_index, tokenize, turkish_casefold
+
+
+def chunk(source, text):
+    return {'text': text, 'metadata': {'source': source, 'type': 'data_point'}}
+
+
+def test_turkish_casefold_maps_dotted_and_dotless_i():
+    assert turkish_casefold("IĞDIR İZMİR") == "ığdır izmir"
+    # Python'un kendi lower()'ı 'İ'yi 'i̇' (iki karakter) yapar
+    assert "İstanbul".lower() != "istanbul" and turkish_casefold("İstanbul") == "istanbul"
+
+
+def test_tokenize_stems_words_and_keeps_years():
+    assert tokenize("İSTANBUL'da 2023 Hanehalkı") == ['istan', 'da', '2023', 'haneh']
+    assert tokenize("Isparta ılık") == tokenize("ISPARTA ILIK") == ['ıspar', 'ılık']
+    # Çekim ekleri ilk 5 harfte kaybolur
+    assert tokenize("hanehalkının")[0] == tokenize("Hanehalkı")[0]
+
+
+def test_bm25_scores_match_the_formula(tmp_path):
+    texts = ["İstanbul nüfus 2023", "Ankara nüfus 2023", "Ankara Ankara işsizlik", "İzmir ihracat"]
+    build_lexical_index(enumerate(texts), len(texts), str(tmp_path / 'lexical'))
+    index = LexicalIndex(str(tmp_path / 'lexical'))
+
+    scores, rows = index.search("ANKARA", 10)
+
+    k1, b, avgdl = 1.2, 0.75, 11 / 4
+    idf = np.log(1 + (4 - 2 + 0.5) / (2 + 0.5))
+    expected = {
+        1: idf * 1 * (k1 + 1) / (1 + k1 * (1 - b + b * 3 / avgdl)),
+        2: idf * 2 * (k1 + 1) / (2 + k1 * (1 - b + b * 3 / avgdl)),
+    }
+    assert rows.tolist() == [2, 1]
+    np.testing.assert_allclose(scores, [expected[2], expected[1]], rtol=1e-5)
+
+
+def test_bm25_prefers_rare_terms_and_respects_allowed_rows(tmp_path):
+    texts = ["İstanbul nüfus 2023", "Ankara nüfus 2023", "Ankara Ankara işsizlik", "İzmir ihracat"]
+    build_lexical_index(enumerate(texts), len(texts), str(tmp_path / 'lexical'))
+    index = LexicalIndex(str(tmp_path / 'lexical'))
+
+    # 'istanbul' tek belgede geçtiğinden ortak 'nüfus' teriminden ağır basar
+    assert index.search("istanbul'un nüfusu", 1)[1].tolist() == [0]
+    assert index.search("ankara", 10, allowed=np.array([1, 3]))[1].tolist() == [1]
+    assert len(index.search("Eskişehir", 10)[1]) == 0
+
+
+@pytest.fixture
+def database(tmp_path):
+    chunks = [chunk(f'tablo{t}.xls', f'{2020 + t} yılı İstanbul hane halkı tablo{t} satır {i}') for t in range(4) for i in range(5)]
+    write_chunk_store(chunks, f'{tmp_path}/chunks')
+    build_from_store(ChunkStore(f'{tmp_path}/chunks'), f'{tmp_path}/lexical')
+    return tmp_path
+
+
+def append(path, chunks, remove_sources):
+    start_row = len(ChunkStore(f'{path}/chunks'))
+    removed, _ = append_chunks(f'{path}/chunks', chunks, remove_sources)
+    return append_from_store(ChunkStore(f'{path}/chunks'), removed, start_row, f'{path}/lexical')
+
+
+def test_append_matches_full_rebuild(database):
+    append(database, [chunk('tablo1.xls', f'2021 yılı Ankara nüfus satır {i}') for i in range(3)], ['tablo1.xls'])
+    store = ChunkStore(f'{database}/chunks')
+    build_from_store(store, f'{database}/rebuilt')
+    appended, rebuilt = LexicalIndex(f'{database}/lexical'), LexicalIndex(f'{database}/rebuilt')
+    assert appended.meta['build_id'] == store.build_id
+    assert len(appended) == len(rebuilt) == 18
+    for query in ['2021 Ankara nüfus', '2023 İstanbul hane halkı', 'tablo1 satır']:
+        scores, rows = appended.search(query, 10)
+        expected_scores, expected_rows = rebuilt.search(query, 10)
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+
+def test_removed_rows_are_never_returned(database):
+    # Yalnızca silme yapan bir güncelleme sonrası eski satırlar sonuçlarda görünmemeli
+    indexed = append(database, [], ['tablo2.xls'])
+    assert indexed == 15
+    _, rows = LexicalIndex(f'{database}/lexical').search('2022 tablo2 satır', 20)
+    assert len(rows) and not set(rows.tolist()) & set(range(10, 15))
+
+
+def test_search_skips_tombstoned_rows(database):
+    index = LexicalIndex(f'{database}/lexical')
+    deleted = np.zeros(index.meta['count'], dtype=np.uint8)
+    deleted[:5] = 1
+    np.save(f'{database}/lexical/deleted.npy', deleted)
+    _, rows = LexicalIndex(f'{database}/lexical').search('2020 tablo0', 20)
+    assert not set(rows.tolist()) & set(range(5))
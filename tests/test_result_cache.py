@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from utils import result_cache
+from utils.result_cache import ResultCache, normalize_question
+
+PARAMS = ('top_k', 5, None, None)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache.time, 'time', clock)
+    return clock
+
+
+def vector(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def chunks(name):
+    return [{'text': name, 'metadata': {'source': f'{name}.xls'}}]
+
+
+def test_normalize_question_ignores_case_spacing_and_punctuation():
+    assert normalize_question("  İSTANBUL'un   nüfusu? ") == normalize_question("istanbul'un nüfusu")
+    assert normalize_question("IĞDIR nüfusu.") == "ığdır nüfusu"
+
+
+def test_exact_hit_requires_same_question_and_params():
+    cache = ResultCache(max_entries=4)
+    cache.put("Ankara nüfusu", vector(1, 0), PARAMS, chunks('a'))
+
+    assert cache.get_exact("ANKARA  nüfusu?", PARAMS) == chunks('a')
+    assert cache.get_exact("Ankara nüfusu", ('top_k', 10, None, None)) is None
+    assert cache.stats['exact_hits'] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResultCache(max_entries=4, ttl=60, semantic_threshold=0.9)
+    cache.put("Ankara nüfusu", vector(1, 0), PARAMS, chunks('a'))
+
+    clock.now += 59
+    assert cache.get_exact("Ankara nüfusu", PARAMS) == chunks('a')
+    assert cache.get_semantic(vector(1, 0), PARAMS) == chunks('a')
+    clock.now += 2
+    assert cache.get_exact("Ankara nüfusu", PARAMS) is None
+    assert cache.get_semantic(vector(1, 0), PARAMS) is None
+    assert cache.info()['exact_entries'] == cache.info()['semantic_entries'] == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResultCache(max_entries=2, semantic_threshold=0.99)
+    cache.put("soru a", vector(1, 0, 0), PARAMS, chunks('a'))
+    cache.put("soru b", vector(0, 1, 0), PARAMS, chunks('b'))
+    # 'a' kullanıldı: dolu önbellekte en eski kullanılan 'b' atılır
+    assert cache.get_exact("soru a", PARAMS) == chunks('a')
+    assert cache.get_semantic(vector(1, 0, 0), PARAMS) == chunks('a')
+    cache.put("soru c", vector(0, 0, 1), PARAMS, chunks('c'))
+
+    assert cache.get_exact("soru b", PARAMS) is None
+    assert cache.get_semantic(vector(0, 1, 0), PARAMS) is None
+    assert cache.get_exact("soru a", PARAMS) == chunks('a')
+    assert cache.get_semantic(vector(0, 0, 1), PARAMS) == chunks('c')
+
+
+def test_semantic_hit_needs_the_threshold_and_same_params():
+    cache = ResultCache(max_entries=4, semantic_threshold=0.95)
+    cache.put("Ankara nüfusu", vector(1, 0), PARAMS, chunks('a'))
+
+    # cos = 0.98 eşiğin üzerinde, cos = 0.8 altında
+    assert cache.get_semantic(vector(0.98, np.sqrt(1 - 0.98 ** 2)), PARAMS) == chunks('a')
+    assert cache.get_semantic(vector(0.8, 0.6), PARAMS) is None
+    assert cache.get_semantic(vector(1, 0), ('top_k', 3, None, None)) is None
+    assert cache.stats['semantic_hits'] == 1 and cache.stats['misses'] == 2
+
+
+def test_semantic_layer_can_be_disabled():
+    cache = ResultCache(max_entries=4, semantic_threshold=0)
+    cache.put("Ankara nüfusu", vector(1, 0), PARAMS, chunks('a'))
+    assert cache.get_semantic(vector(1, 0), PARAMS) is None
+    assert cache.get_exact("Ankara nüfusu", PARAMS) == chunks('a')
+
+
+def test_sync_clears_entries_when_generation_changes():
+    cache = ResultCache(max_entries=4)
+    cache.sync(1)
+    cache.put("Ankara nüfusu", vector(1, 0), PARAMS, chunks('a'))
+    cache.sync(1)
+    assert cache.get_exact("Ankara nüfusu", PARAMS) == chunks('a')
+
+    cache.sync(2)
+    assert cache.get_exact("Ankara nüfusu", PARAMS) is None
+    assert cache.get_semantic(vector(1, 0), PARAMS) is None
+    assert cache.info()['generation'] == 2
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResultCache(max_entries=0)
+    cache.put("Ankara nüfusu", vector(1, 0), PARAMS, chunks('a'))
+    assert cache.get_exact("Ankara nüfusu", PARAMS) is None
+    assert cache.get_semantic(vector(1, 0), PARAMS) is None
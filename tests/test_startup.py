@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from utils.startup import StagedLoader
+from utils.worker_pool import WorkerPool
+
+
+def failing_factory():
+    raise RuntimeError("model yüklenemedi")
+
+
+def working_factory():
+    return 'arama'
+
+
+def test_wait_ready_wakes_when_loading_finishes():
+    release = threading.Event()
+    loader = StagedLoader({'model': lambda: release.wait(5) and 'model', 'rag': lambda: 'rag'})
+    loader.start()
+
+    async def _run():
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        started = time.perf_counter()
+        # Bekleyenler varsayılan executor'daki iş parçacıklarını tutmaz
+        states = await asyncio.gather(*(loader.wait_ready(5) for _ in range(100)))
+        return states, time.perf_counter() - started
+
+    states, elapsed = asyncio.run(_run())
+    assert set(states) == {'ready'}
+    assert elapsed < 2
+    assert loader.get('model') == 'model'
+
+
+def test_wait_ready_times_out_while_starting():
+    release = threading.Event()
+    loader = StagedLoader({'model': lambda: release.wait(5)})
+    loader.start()
+    try:
+        assert asyncio.run(loader.wait_ready(0.05)) == 'starting'
+        assert not loader._waiters
+    finally:
+        release.set()
+
+
+def test_mark_failed_wakes_waiters_and_reports_failure():
+    loader = StagedLoader({'workers': lambda: 'pool'})
+    loader.start()
+    assert loader.wait(5) == 'ready'
+    loader.mark_failed('workers', "Worker pool is broken")
+    assert asyncio.run(loader.wait_ready(5)) == 'failed'
+    assert loader.get('workers') is None
+    assert loader.status()['components']['workers']['error'] == "Worker pool is broken"
+
+
+def test_worker_pool_start_fails_when_factory_fails():
+    pool = WorkerPool(2, failing_factory, threads=1)
+    loader = StagedLoader({'workers': pool.start})
+    loader.start()
+    assert loader.wait(60) == 'failed'
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(time.time)
+
+
+def test_worker_pool_restarts_after_a_worker_crashes():
+    pool = WorkerPool(2, working_factory, threads=1).start()
+    try:
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result(60)
+        assert pool.is_broken()
+        pool.restart(backoff=0.01)
+        assert not pool.is_broken()
+        assert pool.submit(os.getpid).result(60) in pool.pids
+        assert pool.info()['restarts'] == 1
+        # Havuz zaten sağlamsa yeniden başlatılmaz
+        pool.restart()
+        assert pool.info()['restarts'] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_worker_pool_restart_gives_up_after_max_attempts():
+    pool = WorkerPool(1, failing_factory, threads=1)
+    with pytest.raises(BrokenProcessPool, match="2 attempts"):
+        pool.restart(max_attempts=2, backoff=0.01)
+
+
+def test_rag_recovers_when_database_appears_after_failed_start(tmp_path):
+    from test_index_reloader import loader as database_loader, write_database
+    from utils.index_reloader import IndexReloader, files_signature
+
+    loader = None
+    reloader = IndexReloader(
+        None, loader=database_loader(tmp_path),
+        signature_fn=lambda: files_signature(f'{tmp_path}/index.faiss', f'{tmp_path}/chunks'),
+        on_load=lambda rag: loader.mark_ready('rag', rag),
+    )
+    # Sunucu veritabanı henüz oluşturulmadan başlatıldı
+    loader = StagedLoader({'rag': reloader.load_initial, 'model': lambda: 'model'})
+    loader.start()
+    assert loader.wait(5) == 'failed'
+    assert asyncio.run(loader.wait_ready(1)) == 'failed'
+
+    # Veritabanı oluşturuldu; izleyici (veya reload_rag_index aracı) yeniden yükler
+    write_database(tmp_path, 20)
+    assert reloader.reload()
+    assert asyncio.run(loader.wait_ready(1)) == 'ready'
+    assert len(loader.get('rag').chunks) == 20
@@ -0,0 +1,29 @@
+import os
+
+import pandas as pd
+
+from utils.table_cache import TableCache
+
+
+def test_put_replaces_the_entry_of_a_changed_file(tmp_path):
+    source = tmp_path / 'tablo.xls'
+    source.write_bytes(b'eski')
+    cache = TableCache(str(tmp_path / 'cache'))
+    cache.put(str(source), pd.DataFrame({'a': [1]}))
+
+    # Dosya yeniden indirildi: eski kayıt artık hiçbir anahtarla okunamaz ve silinmeli
+    source.write_bytes('yeni içerik'.encode())
+    os.utime(source, ns=(1, 1))
+    assert str(source) not in cache
+    cache.put(str(source), pd.DataFrame({'a': [2]}))
+
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+    assert cache.get(str(source))['a'].tolist() == [2]
+
+
+def test_entries_of_other_files_are_kept(tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    for name in ('a.xls', 'b.xls'):
+        (tmp_path / name).write_bytes(name.encode())
+        cache.put(str(tmp_path / name), pd.DataFrame({'a': [name]}))
+    assert len(os.listdir(tmp_path / 'cache')) == 2
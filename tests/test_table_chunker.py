@@ -0,0 +1,74 @@
+import pandas as pd
+
+from utils.table_chunker import DEFAULT_REGULARITY_THRESHOLD, analyze_table, structural_chunks
+
+
+def regular_table():
+    return pd.DataFrame([
+        ["İllere göre işsizlik oranı", None, None, None],
+        ["(%)", None, None, None],
+        [None, 2021, 2022, 2023],
+        ["Erkek", None, None, None],
+        ["Ankara", 9.1, 8.4, 7.9],
+        ["İzmir", "12,3", "11,0", "10,2"],
+        ["Kadın", None, None, None],
+        ["Ankara", 14.2, 13.0, "-"],
+        ["Kaynak: TÜİK, İşgücü İstatistikleri", None, None, None],
+    ])
+
+
+def test_regular_table_is_detected():
+    layout = analyze_table(regular_table())
+
+    assert layout.score >= DEFAULT_REGULARITY_THRESHOLD
+    assert layout.title == "İllere göre işsizlik oranı"
+    assert layout.unit == "(%)"
+    assert layout.column_labels == {1: '2021', 2: '2022', 3: '2023'}
+    assert layout.label_columns == [0]
+    assert layout.data_rows == [4, 5, 7]
+    assert layout.section_of_row == {4: 'Erkek', 5: 'Erkek', 7: 'Kadın'}
+
+
+def test_structural_chunks_carry_the_full_context():
+    chunks = structural_chunks(regular_table(), 'issizlik.xls')
+
+    # Eksik değer işaretli hücre ('-') chunk üretmez
+    assert len(chunks) == 8
+    assert chunks[3]['text'] == "İllere göre işsizlik oranı (%): Erkek, İzmir için 2021 değeri 12.3."
+    assert chunks[-1]['text'] == "İllere göre işsizlik oranı (%): Kadın, Ankara için 2022 değeri 13."
+    assert {chunk['metadata']['type'] for chunk in chunks} == {'table_cell'}
+
+
+def test_irregular_tables_are_not_detected_as_regular():
+    # Değer sütunlarında çoğunlukla metin olan tablo: yapısı bulunamaz
+    assert analyze_table(pd.DataFrame([
+        ["Gösterge", "Açıklama"],
+        ["Enflasyon", "Tüketici fiyatlarındaki artış"],
+        ["İşsizlik", "İşgücüne katılıp iş bulamayanlar"],
+    ])) is None
+    # Değer hücrelerinin bir kısmı metin (dipnotlu / gizli değerler): yapı bulunsa da skor eşiğin altında
+    layout = analyze_table(pd.DataFrame([
+        [None, 2022, 2023],
+        ["Ankara", 1.5, 2.5],
+        ["İzmir", 3.5, "gizli (1)"],
+        ["Bursa", 5.5, 6.5],
+        ["Konya", 7.5, 8.5],
+    ]))
+    assert layout is not None
+    assert layout.score < DEFAULT_REGULARITY_THRESHOLD
+
+
+def test_year_labelled_rows_are_regular():
+    df = pd.DataFrame(
+        [["Yıllara göre nüfus (milyon)", None, None], ["Yıl", "Erkek", "Kadın"]]
+        + [[2014 + i, 38.9 + i / 2, 38.8 + i / 2] for i in range(10)]
+    )
+
+    layout = analyze_table(df)
+
+    assert layout is not None and layout.score >= DEFAULT_REGULARITY_THRESHOLD
+    assert layout.label_columns == [0]
+    assert layout.column_labels == {1: 'Erkek', 2: 'Kadın'}
+    chunks = structural_chunks(df, 'nufus.xls', layout)
+    assert len(chunks) == 20
+    assert chunks[0]['text'] == "Yıllara göre nüfus (milyon): 2014 için Erkek değeri 38.9."
@@ -0,0 +1,98 @@
+import re
+
+import numpy as np
+import pytest
+
+from utils.chunk_store import ChunkStore, append_chunks, write_chunk_store
+from utils.faiss_index import DEFAULT_INDEX_PARAMS, build_index
+from utils.table_router import TableRouter, append_table_router, build_table_router, routed_rows, search_each
+
+TABLES = 12
+DIMENSION = 16
+CENTERS = np.random.default_rng(0).normal(size=(TABLES, DIMENSION)).astype('float32')
+
+
+def encode(texts):
+    # Her metin, içinde geçen tablonun merkezine yakın bir vektöre kodlanır
+    rng = np.random.default_rng(len(texts))
+    tables = [int(re.search(r'tablo(\d+)', text).group(1)) for text in texts]
+    return CENTERS[tables] + 0.05 * rng.normal(size=(len(texts), DIMENSION)).astype('float32')
+
+
+@pytest.fixture(scope='module')
+def database(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('db'))
+    chunks = [
+        {'text': f'tablo{t} satır {i}', 'metadata': {'source': f'tablo{t}.xls', 'type': 'data_point'}}
+        for t in range(TABLES) for i in range(40)
+    ]
+    categories = {f'tablo{t}.xls': 'enflasyon' if t % 2 else 'istihdam' for t in range(TABLES)}
+    write_chunk_store(chunks, f'{path}/chunks', categories)
+    store = ChunkStore(f'{path}/chunks')
+    build_table_router(store, encode, f'{path}/tables')
+    embeddings = encode([chunk['text'] for chunk in chunks])
+    params = dict(DEFAULT_INDEX_PARAMS, index_type='flat')
+    return store, TableRouter(f'{path}/tables'), build_index(embeddings, params), params
+
+
+def test_route_picks_closest_tables(database):
+    _, router, _, _ = database
+    tables = router.route(encode(['tablo3 soru', 'tablo8 soru']), 2)
+    assert tables[0][0] == 'tablo3.xls'
+    assert tables[1][0] == 'tablo8.xls'
+
+
+def test_route_respects_category(database):
+    store, router, _, _ = database
+    tables = router.route(encode(['tablo4 soru']), 3, category='enflasyon')[0]
+    assert len(tables) == 3
+    assert all(int(re.search(r'\d+', table).group()) % 2 for table in tables)
+
+
+def test_routed_search_stays_inside_routed_tables(database):
+    store, router, index, params = database
+    queries = encode(['tablo5 soru', 'tablo10 soru'])
+    tables = router.route(queries, 2)
+    allowed_rows = [routed_rows(store, question_tables) for question_tables in tables]
+
+    indices = search_each(index, params, queries, 30, allowed_rows)
+
+    for question_tables, row in zip(tables, indices):
+        assert len(row[row >= 0]) == 30
+        assert {store.source(i) for i in row if i >= 0} <= set(question_tables)
+
+
+def test_routed_rows_without_tables_falls_back(database):
+    store, _, _, _ = database
+    fallback = np.array([1, 2, 3])
+    assert routed_rows(store, [], fallback=fallback) is fallback
+
+
+def test_routed_search_excludes_closer_tables_outside_the_route(database):
+    store, router, index, params = database
+    # En yakın chunk'lar son tabloda (en büyük satır numaraları); kategori filtresi onu dışarıda bırakır
+    queries = encode([f'tablo{TABLES - 1} soru'])
+    tables = router.route(queries, 2, category='istihdam')
+    allowed_rows = [routed_rows(store, question_tables, 'istihdam') for question_tables in tables]
+
+    row = search_each(index, params, queries, 20, allowed_rows)[0]
+
+    assert f'tablo{TABLES - 1}.xls' not in tables[0]
+    assert set(row[row >= 0]) <= set(allowed_rows[0])
+
+
+def test_append_encodes_only_changed_tables(tmp_path):
+    chunks = [{'text': f'tablo{t} satır {i}', 'metadata': {'source': f'tablo{t}.xls', 'type': 'data_point'}} for t in range(4) for i in range(3)]
+    write_chunk_store(chunks, f'{tmp_path}/chunks')
+    build_table_router(ChunkStore(f'{tmp_path}/chunks'), encode, f'{tmp_path}/tables')
+    new = [{'text': f'tablo5 satır {i}', 'metadata': {'source': 'tablo5.xls', 'type': 'data_point'}} for i in range(3)]
+    append_chunks(f'{tmp_path}/chunks', new, ['tablo1.xls'])
+
+    encoded = []
+    store = ChunkStore(f'{tmp_path}/chunks')
+    assert append_table_router(store, lambda texts: encoded.extend(texts) or encode(texts), ['tablo1.xls', 'tablo5.xls'], f'{tmp_path}/tables') == 4
+    assert len(encoded) == 1 and 'tablo5' in encoded[0]
+    router = TableRouter(f'{tmp_path}/tables')
+    assert router.meta['build_id'] == store.build_id
+    assert sorted(table['source'] for table in router.tables) == ['tablo0.xls', 'tablo2.xls', 'tablo3.xls', 'tablo5.xls']
+    assert router.route(encode(['tablo5 soru']), 1) == [['tablo5.xls']]
@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+
+import pytest
+
+from custom_tuik_scraper import TuikScraper, listing_page_info, parse_tablo_links, parse_tablo_links_json
+from utils.downloader import Downloader
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def scraper(tmp_path, file_server):
+    tuik = TuikScraper(str(tmp_path), downloader=Downloader(max_workers=2, backoff=0.01), kategoriler=[])
+    tuik.base_url = f'{file_server.url}/'
+    yield tuik
+    tuik.downloader.close()
+
+
+def test_parse_tablo_links_from_category_page():
+    links = parse_tablo_links(read_fixture('kategori_sayfasi.html'), "https://data.tuik.gov.tr/Kategori/GetKategori?p=2")
+
+    assert links == {
+        "Tüketici_fiyat_endeksi_(2003=100),_genel_endeks": "https://data.tuik.gov.tr/Kategori/DownloadIstatistikselTablo?p=AbC123",
+        "Yurt_içi_üretici_fiyat_endeksi_Aylık__Yıllık_değişim": "https://data.tuik.gov.tr/Kategori/DownloadIstatistikselTablo?p=Xyz789",
+        "Bilinmeyen_Tablo": "https://data.tuik.gov.tr/Kategori/DownloadIstatistikselTablo?p=Bos1",
+    }
+
+
+def test_parse_tablo_links_ignores_pages_without_download_links():
+    assert parse_tablo_links(read_fixture('kategori_sayfasi_ajax.html')) == {}
+
+
+def test_parse_tablo_links_json_handles_rows_dicts_and_nesting():
+    links = parse_tablo_links_json(json.loads(read_fixture('tablo_listesi.json')), "https://data.tuik.gov.tr/Kategori/GetIstatistikselTablolar")
+
+    assert links == {
+        "İl_ve_cinsiyete_göre_nüfus": "https://data.tuik.gov.tr/Kategori/DownloadIstatistikselTablo?p=Nfs001",
+        "Yaş_grubu_ve_cinsiyete_göre_nüfus": "https://data.tuik.gov.tr/Kategori/DownloadIstatistikselTablo?p=Nfs002",
+        "Doğum_istatistikleri": "https://data.tuik.gov.tr/Kategori/DownloadIstatistikselTablo?p=Dgm003",
+    }
+
+
+def test_http_discovery_reads_the_listing_request_of_the_page(scraper, file_server):
+    file_server.files['/Kategori/GetKategori?p=7'] = read_fixture('kategori_sayfasi_ajax.html').encode('utf-8')
+    file_server.files['/Kategori/GetIstatistikselTablolar?p=7'] = read_fixture('tablo_listesi.json').encode('utf-8')
+    file_server.content_types['/Kategori/GetIstatistikselTablolar?p=7'] = 'application/json; charset=utf-8'
+
+    links = scraper._get_tablo_links(7)
+
+    assert len(links) == 3
+    assert links["Doğum_istatistikleri"].endswith("DownloadIstatistikselTablo?p=Dgm003")
+
+
+def serve_paged_listing(file_server, pages):
+    file_server.files['/Kategori/GetKategori?p=7'] = read_fixture('kategori_sayfasi_ajax.html').encode('utf-8')
+    paths = ['/Kategori/GetIstatistikselTablolar?p=7', '/Kategori/GetIstatistikselTablolar?p=7&start=2&length=2',
+             '/Kategori/GetIstatistikselTablolar?p=7&start=4&length=2'][:pages]
+    for number, path in enumerate(paths, 1):
+        file_server.files[path] = read_fixture(f'tablo_listesi_sayfa{number}.json').encode('utf-8')
+        file_server.content_types[path] = 'application/json'
+
+
+def test_listing_page_info_reads_datatables_totals():
+    assert listing_page_info(json.loads(read_fixture('tablo_listesi_sayfa1.json'))) == (2, 5)
+    assert listing_page_info(json.loads(read_fixture('tablo_listesi.json'))) == (3, 3)
+    assert listing_page_info([1, 2]) == (2, None)
+
+
+def test_http_discovery_follows_listing_pages(scraper, file_server, monkeypatch):
+    serve_paged_listing(file_server, pages=3)
+    monkeypatch.setattr(scraper, '_get_tablo_links_selenium', lambda kategori_id: pytest.fail("Selenium kullanılmamalı"))
+
+    links = scraper._get_tablo_links(7)
+
+    # Selenium'un sayfaları gezerek bulacağı 5 tablonun hepsi
+    assert len(links) == 5
+    assert links["Konut_sahipliği"].endswith("DownloadIstatistikselTablo?p=Hhb005")
+
+
+def test_incomplete_listing_falls_back_to_selenium(scraper, file_server, monkeypatch):
+    # Son sayfa okunamıyor: HTTP sonucu eksik işaretlenir ve tarayıcıyla tamamlanır
+    serve_paged_listing(file_server, pages=2)
+    selenium_links = {f"Tablo_{i}": f"https://data.tuik.gov.tr/Kategori/DownloadIstatistikselTablo?p=S{i}" for i in range(5)}
+    monkeypatch.setattr(scraper, '_get_tablo_links_selenium', lambda kategori_id: selenium_links)
+
+    assert scraper._get_tablo_links(7) == selenium_links
+
+
+def test_incomplete_listing_is_kept_when_selenium_is_unavailable(scraper, file_server, monkeypatch):
+    serve_paged_listing(file_server, pages=2)
+
+    def no_browser(kategori_id):
+        raise ImportError("selenium yok")
+
+    monkeypatch.setattr(scraper, '_get_tablo_links_selenium', no_browser)
+
+    assert len(scraper._get_tablo_links(7)) == 4
+
+
+def test_selenium_fallback_reuses_one_driver(scraper, file_server, monkeypatch):
+    file_server.files['/Kategori/GetKategori?p=7'] = b'<html><body>Tablo yok</body></html>'
+    drivers, read = [], []
+    monkeypatch.setattr(scraper, '_get_driver', lambda: drivers.append(object()) or drivers[-1])
+    monkeypatch.setattr(scraper, '_read_tablo_links_selenium', lambda driver, kategori_id: read.append(driver) or {})
+
+    threads = [threading.Thread(target=scraper._get_tablo_links, args=(7,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(drivers) == 1
+    assert read == drivers * 4
@@ -0,0 +1,140 @@
+"""
+Eşzamanlı gelen sorguları küçük gruplar (micro-batch) halinde kodlayan yardımcı sınıf.
+"""
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+class BatchingEncoder:
+    """
+    Kısa bir zaman penceresi içinde biriken kodlama (encode) isteklerini tek bir
+    çağrıda toplayan ve bu çağrıyı olay döngüsü (event loop) dışında çalıştıran sınıf.
+
+    Her bekleyen coroutine kendi vektörünü ayrı bir `Future` üzerinden geri alır.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+        max_concurrent_batches: int = 1,
+    ):
+        """
+        Args:
+            encode_fn: Metin listesini alıp (N, D) boyutlu bir dizi döndüren fonksiyon.
+            max_batch_size: Tek bir `encode` çağrısında toplanacak en fazla metin sayısı.
+            max_wait_ms: İlk istekten sonra diğer isteklerin beklendiği süre (milisaniye).
+            executor: Kodlamanın çalıştırılacağı executor (varsayılan: tek iş parçacıklı havuz).
+            max_concurrent_batches: Aynı anda kodlanabilecek grup sayısı; executor birden fazla
+                süreç/iş parçacığı barındırıyorsa (örn. çalışan süreç havuzu) bu sayıya eşitlenir.
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self._executor = executor or ThreadPoolExecutor(max_workers=self.max_concurrent_batches, thread_name_prefix="encoder")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: set = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def encode(self, text: str) -> np.ndarray:
+        """
+        Tek bir metni kuyruğa ekler ve ait olduğu grup kodlandığında vektörünü döndürür.
+
+        Args:
+            text: Kodlanacak metin.
+
+        Returns:
+            Metnin embedding vektörü (1 boyutlu float32 dizi).
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def encode_many(self, texts: List[str]) -> np.ndarray:
+        """
+        Birden fazla metni aynı kuyruğa ekler; metinler diğer isteklerle birlikte gruplanır.
+
+        Args:
+            texts: Kodlanacak metinlerin listesi.
+
+        Returns:
+            (len(texts), D) boyutlu float32 dizi.
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            await self._queue.put((text, future))
+            futures.append(future)
+        return np.stack(await asyncio.gather(*futures))
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop):
+        # Sunucu, başlatma ve çalışma için farklı olay döngüleri kullandığından
+        # kuyruk ve işçi görevi ilk kullanımda, o anki döngüye bağlanarak oluşturulur.
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = loop.create_task(self._run())
+
+    async def _collect_batch(self) -> list:
+        """Kuyruktan, zaman penceresi veya grup boyutu dolana kadar istek toplar."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Pencere kapanırken kuyrukta hazır bekleyenleri de aynı gruba al
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Boş bir yuva olana kadar yeni grup toplanmaz; bu sırada gelen istekler
+            # kuyrukta birikip bir sonraki gruba girer
+            await self._slots.acquire()
+            batch = await self._collect_batch()
+            # İptal edilmiş (örn. bağlantısı kopmuş) istekleri kodlamaya gerek yok
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            task = loop.create_task(self._encode_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _encode_batch(self, batch: list):
+        loop = asyncio.get_running_loop()
+        texts = [text for text, _ in batch]
+        try:
+            vectors = await loop.run_in_executor(self._executor, self.encode_fn, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        vectors = np.asarray(vectors, dtype='float32')
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
@@ -0,0 +1,199 @@
+"""
+Gemini ile üretilen chunk'lar için yalnızca sona ekleme yapılan (append-only) kontrol noktası dosyası.
+
+Kayıt formatı (`all_chunks.ckpt`), dosya başına bir kayıt:
+    başlık   -> struct '<4sHII': sihirli değer (b'TCK1'), kaynak adı uzunluğu,
+                veri uzunluğu, CRC32 (kaynak adı + veri)
+    kaynak   -> UTF-8 kaynak dosya adı
+    veri     -> UTF-8 JSON chunk listesi
+
+Yan indeks (`all_chunks.ckpt.idx`) her kayıt için bir JSON satırı tutar
+(`source`, `offset`, `size`, `count`). Aynı kaynak için sonradan yazılan kayıt öncekini
+geçersiz kılar; böylece bir dosyanın yeniden işlenmesi yalnızca yeni bir kayıt eklemektir.
+
+Açılışta, yan indeksin kapsamadığı dosya sonu taranır; CRC'si tutmayan veya yarım kalmış
+kayıtlar (yazma sırasında çökme) kesilip atılır. İşlenmiş dosyaların listesi de yan
+indeksten okunduğundan ayrı bir günlük dosyasına gerek kalmaz.
+"""
+import json
+import os
+import pickle
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+CHUNKS_CHECKPOINT_FILE = 'all_chunks.ckpt'
+LEGACY_CHECKPOINT_FILE = 'all_chunks.pkl'
+
+MAGIC = b'TCK1'
+HEADER = struct.Struct('<4sHII')
+
+
+class ChunkCheckpoint:
+    """Kaynak dosya adıyla etiketlenmiş chunk kayıtlarını saklayan kontrol noktası."""
+
+    def __init__(self, path: str = CHUNKS_CHECKPOINT_FILE):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        # kaynak adı -> (ofset, boyut, chunk sayısı); en son yazılan kayıt geçerlidir
+        self.records: Dict[str, Tuple[int, int, int]] = {}
+        if not os.path.exists(self.path):
+            open(self.path, 'wb').close()
+        self._open()
+
+    # --- Açılış ve kurtarma ---
+    def _read_index(self) -> Tuple[int, bool]:
+        indexed_end, clean = 0, True
+        if not os.path.exists(self.index_path):
+            return 0, False
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    record = (entry['offset'], entry['size'], entry['count'])
+                except (ValueError, KeyError):
+                    clean = False
+                    break
+                self.records[entry['source']] = record
+                indexed_end = max(indexed_end, record[0] + record[1])
+        return indexed_end, clean
+
+    def _open(self):
+        file_size = os.path.getsize(self.path)
+        indexed_end, clean = self._read_index()
+        if indexed_end > file_size:
+            # Veri dosyası yan indeksten kısa: indeks güvenilmez, baştan tara
+            self.records, indexed_end, clean = {}, 0, False
+        scanned_end = self._scan(indexed_end)
+        if scanned_end < file_size:
+            print(f"⚠️ '{self.path}' sonundaki {file_size - scanned_end} baytlık yarım kayıt atıldı.")
+            with open(self.path, 'r+b') as f:
+                f.truncate(scanned_end)
+        if not clean or scanned_end != indexed_end:
+            self._rewrite_index()
+
+    def _scan(self, offset: int) -> int:
+        """`offset`ten itibaren geçerli kayıtları okuyup indekse ekler, son geçerli konumu döndürür."""
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return offset
+                magic, source_len, payload_len, crc = HEADER.unpack(header)
+                if magic != MAGIC:
+                    return offset
+                body = f.read(source_len + payload_len)
+                if len(body) < source_len + payload_len or zlib.crc32(body) != crc:
+                    return offset
+                source = body[:source_len].decode('utf-8')
+                count = len(json.loads(body[source_len:].decode('utf-8')))
+                size = HEADER.size + source_len + payload_len
+                self.records[source] = (offset, size, count)
+                offset += size
+
+    def _rewrite_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for source, (offset, size, count) in sorted(self.records.items(), key=lambda item: item[1][0]):
+                f.write(json.dumps({'source': source, 'offset': offset, 'size': size, 'count': count}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.index_path)
+
+    # --- Yazma ---
+    def append(self, source: str, chunks: List[Dict[str, Any]]):
+        """Bir kaynak dosyanın chunk'larını yeni bir kayıt olarak ekler (varsa eskisini geçersiz kılar)."""
+        source_bytes = source.encode('utf-8')
+        payload = json.dumps(chunks, ensure_ascii=False).encode('utf-8')
+        body = source_bytes + payload
+        record = HEADER.pack(MAGIC, len(source_bytes), len(payload), zlib.crc32(body)) + body
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[source] = (offset, len(record), len(chunks))
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'source': source, 'offset': offset, 'size': len(record), 'count': len(chunks)}, ensure_ascii=False) + "\n")
+
+    # --- Okuma ---
+    def __contains__(self, source: str) -> bool:
+        return source in self.records
+
+    def __len__(self):
+        return len(self.records)
+
+    def sources(self) -> set:
+        return set(self.records)
+
+    def chunk_count(self) -> int:
+        return sum(count for _, _, count in self.records.values())
+
+    def _read_record(self, f, offset: int, size: int) -> List[Dict[str, Any]]:
+        f.seek(offset)
+        data = f.read(size)
+        _, source_len, _, _ = HEADER.unpack(data[:HEADER.size])
+        return json.loads(data[HEADER.size + source_len:].decode('utf-8'))
+
+    def read(self, source: str) -> Optional[List[Dict[str, Any]]]:
+        """Bir kaynak dosyanın en güncel chunk listesini döndürür."""
+        if source not in self.records:
+            return None
+        offset, size, _ = self.records[source]
+        with open(self.path, 'rb') as f:
+            return self._read_record(f, offset, size)
+
+    def iter_records(self) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Geçerli kayıtları dosya sırasıyla, her seferinde tek kayıt okuyarak döndürür."""
+        with open(self.path, 'rb') as f:
+            for source, (offset, size, _) in sorted(self.records.items(), key=lambda item: item[1][0]):
+                yield source, self._read_record(f, offset, size)
+
+    def iter_chunks(self) -> Iterator[Dict[str, Any]]:
+        for _, chunks in self.iter_records():
+            yield from chunks
+
+    def iter_batches(self, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """Chunk'ları dosya sırasıyla, en fazla `batch_size` elemanlı listeler halinde döndürür."""
+        batch = []
+        for chunk in self.iter_chunks():
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # --- Bakım ---
+    def compact(self):
+        """Geçersiz kılınmış eski kayıtları atarak dosyayı yeniden yazar."""
+        for stale in (f"{self.path}.compact", f"{self.path}.compact.idx"):
+            if os.path.exists(stale):
+                os.remove(stale)
+        tmp = ChunkCheckpoint(f"{self.path}.compact")
+        for source, chunks in self.iter_records():
+            tmp.append(source, chunks)
+        os.replace(tmp.path, self.path)
+        os.replace(tmp.index_path, self.index_path)
+        self.records = tmp.records
+
+    def migrate_legacy(self, legacy_path: str = LEGACY_CHECKPOINT_FILE) -> int:
+        """
+        Eski, art arda pickle'lanmış `all_chunks.pkl` dosyasını kaynak dosyaya göre gruplayıp
+        bu formata aktarır. Aktarılan kaynak sayısını döndürür.
+        """
+        by_source: Dict[str, List[Dict[str, Any]]] = {}
+        with open(legacy_path, 'rb') as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    break
+                except Exception as e:
+                    print(f"Eski checkpoint dosyası okunurken hata (okunan kısım aktarılacak): {e}")
+                    break
+                # Aynı dosya birden fazla kez işlendiyse son sonuç geçerlidir
+                if batch:
+                    by_source[batch[0]['metadata']['source']] = batch
+        for source, chunks in by_source.items():
+            self.append(source, chunks)
+        return len(by_source)
@@ -0,0 +1,339 @@
+"""
+Metin parçalarını (chunk) sütun tabanlı ve bellek eşlemeli (memory-mapped) bir formatta saklayan yardımcılar.
+
+Dizin yapısı (`tuik_chunks/`):
+    text.bin     -> Tüm chunk metinleri art arda UTF-8 olarak
+    offsets.npy  -> int64, (N + 1) uzunluğunda; i. chunk = text[offsets[i]:offsets[i + 1]]
+    source.npy   -> int32, her chunk için kaynak dosya kodu
+    type.npy     -> int16, her chunk için tür kodu
+    category.npy -> int16, her chunk'ın kaynak dosyasının kategori kodu (data.json'daki klasör adı)
+    deleted.npy  -> uint8, silinmiş (yeniden işlenen dosyalara ait eski) chunk'ların işareti
+    meta.json    -> Sürüm, derleme kimliği, chunk sayısı ve kodların karşılık geldiği metin tabloları
+
+Satır numaraları kalıcıdır: yeni chunk'lar sona eklenir, silinen chunk'lar yalnızca
+işaretlenir. FAISS indeksindeki vektör kimlikleri bu satır numaralarıyla aynıdır.
+
+Depo her yazıldığında veya güncellendiğinde yeni bir derleme kimliği (`build_id`) alır.
+İndeks, sözcüksel indeks, tablo yönlendirme indeksi ve tam vektör dosyası eşlendikleri
+deponun kimliğini saklar; sunucu kimliği farklı olan dosyaları birlikte yüklemez.
+
+Sunucu bu dosyaları bellek eşlemeli açtığından yalnızca erişilen chunk'lar belleğe gelir ve
+aynı makinedeki işlemler işletim sisteminin sayfa önbelleğini paylaşır.
+
+Kategori ve kaynak dosya filtreleri (`row_filter`) kod sütunları üzerinden vektörel olarak
+hesaplanır; en son kullanılan `ChunkStore.MAX_CACHED_FILTERS` kadarı önbellekte tutulur.
+"""
+import json
+import mmap
+import os
+import pickle
+import shutil
+import threading
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+CHUNK_STORE_DIR = 'tuik_chunks'
+LEGACY_CHUNKS_FILE = 'tuik_chunks.pkl'
+STORE_VERSION = 1
+
+
+def new_build_id() -> str:
+    """Bir derlemenin (depo ve ona eşlenen dosyalar) benzersiz kimliği."""
+    return uuid.uuid4().hex
+
+
+class ChunkStoreWriter:
+    """
+    Chunk'ları akış halinde geçici bir dizine yazar; `close()` çağrıldığında dizini
+    hedef konuma taşır. Metinler diske hemen yazıldığından bellekte yalnızca
+    ofsetler ve kodlar tutulur.
+    """
+
+    def __init__(self, path: str = CHUNK_STORE_DIR, source_categories: Optional[Dict[str, str]] = None, build_id: Optional[str] = None):
+        self.path = path
+        self.build_id = build_id or new_build_id()
+        # kaynak dosya adı -> kategori (data.json'daki klasör adı, örn. 'enflasyon')
+        self.source_categories = source_categories or {}
+        self.tmp_path = f"{path}.tmp"
+        if os.path.exists(self.tmp_path):
+            shutil.rmtree(self.tmp_path)
+        os.makedirs(self.tmp_path)
+        self._text_file = open(os.path.join(self.tmp_path, 'text.bin'), 'wb')
+        self._offsets = array('q', [0])
+        self._source_codes = array('i')
+        self._type_codes = array('h')
+        self._category_codes = array('h')
+        self._sources: Dict[str, int] = {}
+        self._types: Dict[str, int] = {}
+        self._categories: Dict[str, int] = {}
+
+    @staticmethod
+    def _intern(table: Dict[str, int], value: str) -> int:
+        code = table.get(value)
+        if code is None:
+            code = table[value] = len(table)
+        return code
+
+    def add(self, chunk: Dict[str, Any]):
+        """Tek bir chunk'ı (`{'text': ..., 'metadata': {'source': ..., 'type': ...}}`) ekler."""
+        data = str(chunk['text']).encode('utf-8')
+        self._text_file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+        metadata = chunk.get('metadata', {})
+        source = metadata.get('source', '')
+        self._source_codes.append(self._intern(self._sources, source))
+        self._type_codes.append(self._intern(self._types, metadata.get('type', '')))
+        self._category_codes.append(self._intern(self._categories, self.source_categories.get(source, '')))
+
+    def extend(self, chunks: Iterable[Dict[str, Any]]):
+        for chunk in chunks:
+            self.add(chunk)
+
+    def __len__(self):
+        return len(self._source_codes)
+
+    def close(self):
+        """Sütunları ve meta veriyi yazar, ardından dizini hedef konuma taşır."""
+        self._text_file.close()
+        np.save(os.path.join(self.tmp_path, 'offsets.npy'), np.frombuffer(self._offsets, dtype=np.int64))
+        np.save(os.path.join(self.tmp_path, 'source.npy'), np.frombuffer(self._source_codes, dtype=np.int32))
+        np.save(os.path.join(self.tmp_path, 'type.npy'), np.frombuffer(self._type_codes, dtype=np.int16))
+        np.save(os.path.join(self.tmp_path, 'category.npy'), np.frombuffer(self._category_codes, dtype=np.int16))
+        np.save(os.path.join(self.tmp_path, 'deleted.npy'), np.zeros(len(self), dtype=np.uint8))
+        meta = {
+            'version': STORE_VERSION,
+            'build_id': self.build_id,
+            'count': len(self),
+            'sources': list(self._sources),
+            'types': list(self._types),
+            'categories': list(self._categories),
+        }
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        # Açık olan eski dosyalar, onları eşleyen işlemler kapatana kadar geçerli kalır
+        old_path = f"{self.path}.old"
+        if os.path.exists(self.path):
+            if os.path.exists(old_path):
+                shutil.rmtree(old_path)
+            os.rename(self.path, old_path)
+        os.rename(self.tmp_path, self.path)
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._text_file.close()
+            shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+def write_chunk_store(
+    chunks: Iterable[Dict[str, Any]],
+    path: str = CHUNK_STORE_DIR,
+    source_categories: Optional[Dict[str, str]] = None,
+    build_id: Optional[str] = None,
+) -> int:
+    """Chunk listesini sütun formatında yazar ve yazılan chunk sayısını döndürür."""
+    with ChunkStoreWriter(path, source_categories, build_id) as writer:
+        writer.extend(chunks)
+        return len(writer)
+
+
+class ChunkStore:
+    """
+    Bellek eşlemeli chunk deposu. `store[i]`, eski pickle listesindeki ile aynı yapıda
+    (`{'text': ..., 'metadata': {...}}`) bir sözlük döndürür.
+    """
+
+    # Önbellekte tutulacak en fazla (kategori, kaynak) filtresi; her biri en çok N adet int64
+    MAX_CACHED_FILTERS = 64
+
+    def __init__(self, path: str = CHUNK_STORE_DIR):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.count = int(self.meta['count'])
+        # Kimliksiz eski depolarda None
+        self.build_id: Optional[str] = self.meta.get('build_id')
+        self.sources: List[str] = self.meta['sources']
+        self.types: List[str] = self.meta['types']
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        self.source_codes = np.load(os.path.join(path, 'source.npy'), mmap_mode='r')
+        self.type_codes = np.load(os.path.join(path, 'type.npy'), mmap_mode='r')
+        deleted_path = os.path.join(path, 'deleted.npy')
+        self.deleted = np.load(deleted_path, mmap_mode='r') if os.path.exists(deleted_path) else np.zeros(self.count, dtype=np.uint8)
+        # Kategori sütunu olmayan eski depolarda kategori filtresi kullanılamaz
+        self.categories: List[str] = self.meta.get('categories', [])
+        category_path = os.path.join(path, 'category.npy')
+        self.category_codes = np.load(category_path, mmap_mode='r') if os.path.exists(category_path) else None
+        self._filters: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._filters_lock = threading.Lock()
+        with open(os.path.join(path, 'text.bin'), 'rb') as f:
+            # Boş dosyalar eşlenemez
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+
+    def __len__(self):
+        return self.count
+
+    def _check(self, i: int) -> int:
+        i = int(i)
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(f"Chunk indeksi aralık dışında: {i}")
+        return i
+
+    def text(self, i: int) -> str:
+        i = self._check(i)
+        return self._text[int(self.offsets[i]):int(self.offsets[i + 1])].decode('utf-8')
+
+    def source(self, i: int) -> str:
+        return self.sources[self.source_codes[self._check(i)]]
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        i = self._check(i)
+        metadata = {'source': self.sources[self.source_codes[i]], 'type': self.types[self.type_codes[i]]}
+        if self.category_codes is not None:
+            metadata['category'] = self.categories[self.category_codes[i]]
+        return {'text': self.text(i), 'metadata': metadata}
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def ids_for_sources(self, sources: Iterable[str]) -> np.ndarray:
+        """Verilen kaynak dosyalara ait, silinmemiş chunk'ların satır numaralarını döndürür."""
+        wanted = set(sources)
+        codes = [code for code, name in enumerate(self.sources) if name in wanted]
+        if not codes:
+            return np.empty(0, dtype=np.int64)
+        mask = np.isin(self.source_codes[:self.count], codes) & (self.deleted[:self.count] == 0)
+        return np.flatnonzero(mask).astype(np.int64)
+
+    def row_filter(self, category: Optional[str] = None, source: Optional[str] = None) -> np.ndarray:
+        """
+        Verilen kategoriye ve/veya kaynak dosyaya ait, silinmemiş chunk'ların satır numaralarını
+        döndürür. Sonuçlar LRU önbellekte tutulur; depoda olmayan adlar (hiçbir satırla
+        eşleşmeyenler) önbelleğe alınmaz, böylece istemciden gelen rastgele adlar önbelleği doldurmaz.
+
+        Raises:
+            ValueError: Kategori filtresi istenip depoda kategori sütunu yoksa.
+        """
+        if category is not None and self.category_codes is None:
+            raise ValueError("Chunk deposunda kategori bilgisi yok; kategori filtresi için veritabanını yeniden oluşturun.")
+        if (category is not None and category not in self.categories) or (source is not None and source not in self.sources):
+            return np.empty(0, dtype=np.int64)
+        key = (category, source)
+        with self._filters_lock:
+            rows = self._filters.get(key)
+            if rows is not None:
+                self._filters.move_to_end(key)
+                return rows
+        mask = self.deleted[:self.count] == 0
+        if category is not None:
+            mask &= self.category_codes[:self.count] == self.categories.index(category)
+        if source is not None:
+            mask &= self.source_codes[:self.count] == self.sources.index(source)
+        rows = np.flatnonzero(mask).astype(np.int64)
+        with self._filters_lock:
+            self._filters[key] = rows
+            while len(self._filters) > self.MAX_CACHED_FILTERS:
+                self._filters.popitem(last=False)
+        return rows
+
+
+def _replace_npy(path: str, name: str, values: np.ndarray):
+    tmp_file = os.path.join(path, f"{name}.tmp.npy")
+    np.save(tmp_file, values)
+    os.replace(tmp_file, os.path.join(path, f"{name}.npy"))
+
+
+def append_chunks(
+    path: str,
+    chunks: List[Dict[str, Any]],
+    remove_sources: Iterable[str] = (),
+    source_categories: Optional[Dict[str, str]] = None,
+    build_id: Optional[str] = None,
+):
+    """
+    Mevcut depoya yeni chunk'ları ekler ve verilen kaynak dosyalara ait eski chunk'ları
+    silinmiş olarak işaretler.
+
+    Metin dosyasına yalnızca sona ekleme yapılır; sütunlar geçici dosyalara yazılıp yerine
+    taşınır ve en son `meta.json` güncellenir. Okuyucular önce `meta.json`'u okuduğundan,
+    güncelleme sırasında açılan bir depo her zaman tutarlı bir görünüm sunar. Depo yeni bir
+    derleme kimliği (`build_id`, verilmezse üretilir) alır.
+
+    Returns:
+        (silinen satır numaraları, eklenen satır numaraları) ikilisi.
+    """
+    store = ChunkStore(path)
+    removed_ids = store.ids_for_sources(remove_sources)
+    count = store.count
+    sources = {name: code for code, name in enumerate(store.sources)}
+    types = {name: code for code, name in enumerate(store.types)}
+    categories = {name: code for code, name in enumerate(store.categories)}
+    source_categories = source_categories or {}
+
+    offsets = array('q', [int(store.offsets[count])])
+    source_codes, type_codes, category_codes = array('i'), array('h'), array('h')
+    with open(os.path.join(path, 'text.bin'), 'r+b') as f:
+        # Önceki yarım kalmış bir eklemeden kalan baytların üzerine yaz
+        f.seek(offsets[0])
+        f.truncate()
+        for chunk in chunks:
+            data = str(chunk['text']).encode('utf-8')
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+            metadata = chunk.get('metadata', {})
+            source = metadata.get('source', '')
+            source_codes.append(ChunkStoreWriter._intern(sources, source))
+            type_codes.append(ChunkStoreWriter._intern(types, metadata.get('type', '')))
+            category_codes.append(ChunkStoreWriter._intern(categories, source_categories.get(source, '')))
+
+    deleted = np.concatenate([np.asarray(store.deleted[:count]), np.zeros(len(chunks), dtype=np.uint8)])
+    deleted[removed_ids] = 1
+    _replace_npy(path, 'offsets', np.concatenate([np.asarray(store.offsets[:count + 1]), np.frombuffer(offsets, dtype=np.int64)[1:]]))
+    _replace_npy(path, 'source', np.concatenate([np.asarray(store.source_codes[:count]), np.frombuffer(source_codes, dtype=np.int32)]))
+    _replace_npy(path, 'type', np.concatenate([np.asarray(store.type_codes[:count]), np.frombuffer(type_codes, dtype=np.int16)]))
+    _replace_npy(path, 'deleted', deleted)
+    if store.category_codes is not None:
+        _replace_npy(path, 'category', np.concatenate([np.asarray(store.category_codes[:count]), np.frombuffer(category_codes, dtype=np.int16)]))
+
+    meta = dict(store.meta, build_id=build_id or new_build_id(), count=count + len(chunks), sources=list(sources), types=list(types))
+    if store.category_codes is not None:
+        meta['categories'] = list(categories)
+    with open(os.path.join(path, 'meta.json.tmp'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(os.path.join(path, 'meta.json.tmp'), os.path.join(path, 'meta.json'))
+    return removed_ids, np.arange(count, count + len(chunks), dtype=np.int64)
+
+
+def load_chunks(path: str = CHUNK_STORE_DIR, legacy_path: str = LEGACY_CHUNKS_FILE):
+    """
+    Chunk deposunu açar. Depo yoksa, önceden oluşturulmuş eski veritabanlarıyla uyum için
+    `tuik_chunks.pkl` dosyası belleğe yüklenir.
+    """
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return ChunkStore(path)
+    with open(legacy_path, 'rb') as f:
+        return pickle.load(f)
+
+
+if __name__ == "__main__":
+    # Eski `tuik_chunks.pkl` dosyasını yeni depo formatına dönüştürür:
+    #   python -m utils.chunk_store [tuik_chunks.pkl] [tuik_chunks]
+    import sys
+    source_path = sys.argv[1] if len(sys.argv) > 1 else LEGACY_CHUNKS_FILE
+    target_path = sys.argv[2] if len(sys.argv) > 2 else CHUNK_STORE_DIR
+    with open(source_path, 'rb') as f:
+        count = write_chunk_store(pickle.load(f), target_path)
+    print(f"✅ {count} adet chunk '{target_path}' deposuna yazıldı.")
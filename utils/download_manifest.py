@@ -0,0 +1,121 @@
+"""
+İndirilen TÜİK dosyalarının kaydını tutan manifest.
+
+Her dosya için URL, ETag, Last-Modified, SHA-256 özeti, boyut ve indirme zamanı saklanır.
+Yenileme sırasında bu bilgilerle koşullu istek (If-None-Match / If-Modified-Since) gönderilir;
+sunucu doğrulayıcı döndürmüyorsa yeni içerik özetle karşılaştırılır. İçeriği gerçekten
+değişen dosyalar "kirli" (dirty) olarak işaretlenir; `build_vector_db.py` yalnızca bu
+dosyaları yeniden chunk'layıp vektörlerini günceller ve işaretleri temizler.
+
+Dosya yolları manifestin bulunduğu dizine göre göreli tutulur.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+MANIFEST_FILE = 'download_manifest.json'
+# prepare_data.py ve build_vector_db.py manifesti çalışma dizininden bağımsız olarak
+# betiklerin bulunduğu proje kök dizininde açar
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST_PATH = os.path.join(PROJECT_DIR, MANIFEST_FILE)
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DownloadManifest:
+    """Dosya yolu -> indirme bilgileri eşlemesi; iş parçacıkları arasında güvenle paylaşılabilir."""
+
+    def __init__(self, path: str = MANIFEST_FILE, save_every: int = 50):
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.save_every = save_every
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def _key(self, file_path: str) -> str:
+        return os.path.relpath(os.path.abspath(file_path), self.root).replace('\\', '/')
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.entries.get(self._key(file_path))
+
+    def conditional_headers(self, file_path: str) -> Dict[str, str]:
+        """Kayıtlı doğrulayıcılardan koşullu istek başlıklarını oluşturur."""
+        entry = self.get(file_path) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def record(self, file_path: str, url: str, etag: Optional[str], last_modified: Optional[str], sha256: str, size: int, changed: bool):
+        """
+        İndirilen dosyanın bilgilerini kaydeder. `changed` yalnızca diske yeni veya farklı
+        içerik yazıldığında verilmelidir; dosya o zaman kirli olarak işaretlenir. Manifestte
+        kaydı olmayan ama içeriği diskteki dosyayla aynı olan (eski derlemelerden kalan)
+        dosyalar temiz kaydedilir, böylece ilk yenileme tüm derlemi yeniden chunk'latmaz.
+        """
+        key = self._key(file_path)
+        with self._lock:
+            previous = self.entries.get(key)
+            self.entries[key] = {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'sha256': sha256,
+                'size': size,
+                'downloaded_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'dirty': changed or bool(previous and previous.get('dirty')),
+            }
+            self._mark_pending()
+
+    def touch(self, file_path: str):
+        """Sunucu dosyanın değişmediğini bildirdi (304): yalnızca kontrol zamanını günceller."""
+        with self._lock:
+            entry = self.entries.get(self._key(file_path))
+            if entry is not None:
+                entry['checked_at'] = time.strftime("%Y-%m-%d %H:%M:%S")
+                self._mark_pending()
+
+    def _mark_pending(self):
+        self._pending += 1
+        if self._pending >= self.save_every:
+            self._save_locked()
+
+    def dirty_sources(self) -> Set[str]:
+        """Kirli dosyaların adlarını (chunk kaynak adlarıyla aynı biçimde, yalnızca dosya adı) döndürür."""
+        with self._lock:
+            return {os.path.basename(key) for key, entry in self.entries.items() if entry.get('dirty')}
+
+    def clear_dirty(self, source: str):
+        """Bir kaynak dosya yeniden chunk'landıktan sonra kirli işaretini kaldırır."""
+        with self._lock:
+            for key, entry in self.entries.items():
+                if entry.get('dirty') and os.path.basename(key) == source:
+                    entry['dirty'] = False
+                    self._mark_pending()
+
+    def _save_locked(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self._pending = 0
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
@@ -0,0 +1,223 @@
+"""
+TÜİK tablolarını eşzamanlı, kaldığı yerden devam edebilen şekilde indiren motor.
+
+    - Tek bir `requests.Session` üzerinden bağlantı havuzu (keep-alive) paylaşılır.
+    - Eşzamanlı indirme sayısı hem toplamda hem de sunucu (host) başına sınırlandırılır.
+    - Ağ hataları, 429 ve 5xx cevapları üstel bekleme ile tekrar denenir.
+    - Dosyalar önce `<ad>.part` olarak yazılır ve yalnızca tamamlanınca yerine taşınır;
+      yarım kalan bir `.part` dosyası sonraki denemede HTTP Range ile devam ettirilir.
+      İlk yanıtın doğrulayıcısı (ETag / Last-Modified) `<ad>.part.json`'a yazılır ve devam
+      isteğinde `If-Range` olarak gönderilir; sunucudaki dosya bu arada değiştiyse tam dosya
+      (200) gelir ve indirme baştan yapılır. Doğrulayıcısı olmayan yarım dosya devam
+      ettirilmez, çünkü farklı sürümlerin baytları birbirine eklenebilir.
+
+Hedef dosyanın var olması indirmenin tamamlandığı anlamına gelir. Bir `DownloadManifest`
+verilip `refresh` açıldığında var olan dosyalar da koşullu istekle yoklanır ve yalnızca
+içeriği değişenler yeniden yazılır (bkz. utils/download_manifest.py). URL'ler yerel bir test
+sunucusunu gösterecek şekilde verilerek motor ağ olmadan test edilebilir.
+"""
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.download_manifest import DownloadManifest, file_sha256
+
+DownloadJob = namedtuple("DownloadJob", ["url", "path"])
+# status: 'downloaded' (yeni veya değişmiş), 'unchanged' (yoklandı, değişmemiş), 'skipped' veya 'failed'
+DownloadResult = namedtuple("DownloadResult", ["url", "path", "status", "size", "error"])
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class DownloadError(Exception):
+    """Tekrar denenebilecek bir indirme hatası."""
+
+
+class Downloader:
+    """Bağlantı havuzlu, eşzamanlı ve devam ettirilebilir dosya indirici."""
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        per_host: int = 4,
+        max_retries: int = 4,
+        backoff: float = 1.0,
+        timeout: float = 60.0,
+        chunk_size: int = 64 * 1024,
+        session: Optional[requests.Session] = None,
+        manifest: Optional[DownloadManifest] = None,
+        refresh: bool = False,
+    ):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.session = session or requests.Session()
+        self.manifest = manifest
+        self.refresh = refresh
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._host_limits: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_limit(self, url: str) -> threading.Semaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(self.per_host)
+            return self._host_limits[host]
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sayfa / liste istekleri için `session.get`; indirmelerle aynı sunucu başına eşzamanlılık
+        sınırına tabidir. Yanıt gövdesi sınır içinde tamamen okunur.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        with self._host_limit(url):
+            return self.session.get(url, **kwargs)
+
+    @staticmethod
+    def _part_validator(part_path: str) -> Optional[str]:
+        """Yarım dosyanın `If-Range` doğrulayıcısı; kaydedilmemişse veya kullanılamıyorsa None."""
+        try:
+            with open(f"{part_path}.json", 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        etag = saved.get("etag")
+        # Zayıf ETag'ler If-Range'de kullanılamaz
+        if etag and not etag.startswith("W/"):
+            return etag
+        return saved.get("last_modified")
+
+    @staticmethod
+    def _save_part_validator(part_path: str, etag: Optional[str], last_modified: Optional[str]):
+        with open(f"{part_path}.json", 'w', encoding='utf-8') as f:
+            json.dump({"etag": etag, "last_modified": last_modified}, f)
+
+    @staticmethod
+    def _remove_part(part_path: str):
+        for leftover in (part_path, f"{part_path}.json"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    def _fetch(self, url: str, path: str, conditional: Dict[str, str]):
+        """
+        Tek bir indirme denemesi; `.part` dosyası ve doğrulayıcısı varsa kaldığı yerden devam eder.
+
+        Returns:
+            Sunucu 304 döndürdüyse None, aksi halde (tamamlanmış `.part` yolu, ETag, Last-Modified).
+        """
+        part_path = f"{path}.part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        validator = self._part_validator(part_path) if offset else None
+        headers = dict(conditional)
+        if validator:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304:
+                return None
+            if response.status_code == 416:
+                # Sunucu aralığı kabul etmedi: yarım dosya geçersiz, baştan indir
+                self._remove_part(part_path)
+                raise DownloadError("Range isteği reddedildi (416), baştan indirilecek.")
+            if response.status_code in RETRYABLE_STATUS:
+                raise DownloadError(f"HTTP {response.status_code}")
+            response.raise_for_status()
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            if response.status_code == 206 and validator:
+                mode, expected = 'ab', response.headers.get("Content-Range", "").rpartition("/")[2]
+            else:
+                # Tam dosya geldi (Range desteklenmiyor, dosya değişmiş veya doğrulayıcı yok):
+                # yeni yanıtın doğrulayıcısı yazılır, yoksa yarım dosya bir daha devam ettirilmez
+                mode, expected = 'wb', response.headers.get("Content-Length", "")
+                if etag or last_modified:
+                    self._save_part_validator(part_path, etag, last_modified)
+                elif os.path.exists(f"{part_path}.json"):
+                    os.remove(f"{part_path}.json")
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+        size = os.path.getsize(part_path)
+        if expected.isdigit() and size != int(expected):
+            raise DownloadError(f"Eksik indirme: {size}/{expected} bayt.")
+        return part_path, etag, last_modified
+
+    def _commit(self, url: str, path: str, fetched) -> DownloadResult:
+        """Tamamlanan `.part` dosyasını, içeriği değiştiyse yerine taşır ve manifeste kaydeder."""
+        part_path, etag, last_modified = fetched
+        size = os.path.getsize(part_path)
+        if os.path.exists(f"{part_path}.json"):
+            os.remove(f"{part_path}.json")
+        if self.manifest is None:
+            os.replace(part_path, path)
+            return DownloadResult(url, path, 'downloaded', size, None)
+        digest = file_sha256(part_path)
+        entry = self.manifest.get(path)
+        previous = entry['sha256'] if entry else (file_sha256(path) if os.path.exists(path) else None)
+        if previous == digest:
+            # Sunucu doğrulayıcı göndermese bile içerik aynıysa dosyaya dokunulmaz
+            os.remove(part_path)
+            status = 'unchanged'
+        else:
+            os.replace(part_path, path)
+            status = 'downloaded'
+        self.manifest.record(path, url, etag, last_modified, digest, size, changed=status == 'downloaded')
+        return DownloadResult(url, path, status, size, None)
+
+    def download(self, url: str, path: str) -> DownloadResult:
+        """Tek bir dosyayı, geçici hatalarda tekrar deneyerek indirir."""
+        exists = os.path.exists(path)
+        if exists and not (self.refresh and self.manifest is not None):
+            return DownloadResult(url, path, 'skipped', os.path.getsize(path), None)
+        conditional = self.manifest.conditional_headers(path) if exists else {}
+        last_error = None
+        with self._host_limit(url):
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    time.sleep(self.backoff * (2 ** (attempt - 1)))
+                try:
+                    fetched = self._fetch(url, path, conditional)
+                    if fetched is None:
+                        self.manifest.touch(path)
+                        return DownloadResult(url, path, 'unchanged', os.path.getsize(path), None)
+                    return self._commit(url, path, fetched)
+                except (DownloadError, requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                    last_error = e
+                except (requests.RequestException, OSError) as e:
+                    # 404 gibi kalıcı hatalar tekrar denenmez
+                    return DownloadResult(url, path, 'failed', 0, e)
+        return DownloadResult(url, path, 'failed', 0, last_error)
+
+    def download_all(
+        self,
+        jobs: Iterable[DownloadJob],
+        on_result: Optional[Callable[[DownloadResult], None]] = None,
+    ) -> List[DownloadResult]:
+        """İşleri eşzamanlı indirir; her sonuç tamamlandıkça `on_result` ile bildirilir."""
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.download, job.url, job.path) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_result:
+                    on_result(result)
+        if self.manifest is not None:
+            self.manifest.save()
+        return results
+
+    def close(self):
+        self.session.close()
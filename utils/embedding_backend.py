@@ -0,0 +1,116 @@
+"""
+Embedding modelini farklı CPU çıkarım arka uçlarıyla yükleyen yardımcılar.
+
+    torch      -> Varsayılan, tam hassasiyetli PyTorch modeli (~1.1 GB).
+    onnx       -> ONNX Runtime'a aktarılmış model.
+    onnx-int8  -> ONNX modelinin int8 dinamik nicemlenmiş (quantized) hali; CPU'da en hızlı
+                  ve en küçük seçenek, vektörleri PyTorch'tan çok az sapar.
+    openvino   -> Intel OpenVINO'ya aktarılmış model.
+
+ONNX ve OpenVINO arka uçları sentence-transformers (>= 3.2) ve `optimum[onnxruntime]` /
+`optimum[openvino]` paketlerini gerektirir. Aktarılan modeller bir kez oluşturulup
+`embedding_models/` altında saklanır; sonraki yüklemeler doğrudan bu dosyaları kullanır.
+
+Farklı arka uçların ürettiği vektörler birebir aynı olmadığından, indeksi oluşturan ve
+sorguları kodlayan tarafların aynı arka ucu kullanması önerilir. `parity_check` seçilen
+arka ucun PyTorch vektörlerinden sapmasını kosinüs benzerliğiyle ölçer.
+"""
+import glob
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+EMBEDDING_BACKENDS = ('torch', 'onnx', 'onnx-int8', 'openvino')
+EMBEDDING_EXPORT_DIR = 'embedding_models'
+# onnx-int8 için nicemleme profili: 'arm64', 'avx2', 'avx512' veya 'avx512_vnni'
+DEFAULT_QUANTIZATION = 'avx2'
+
+
+def export_path(model_name: str, backend: str, root: str = EMBEDDING_EXPORT_DIR) -> str:
+    """Aktarılmış modelin saklanacağı dizin (ONNX ve int8 aynı dizini paylaşır)."""
+    family = 'openvino' if backend == 'openvino' else 'onnx'
+    return os.path.join(root, f"{model_name.replace('/', '__')}-{family}")
+
+
+def cache_key(model_name: str, backend: str) -> str:
+    """Embedding önbelleği için model anahtarı; arka uçların vektörleri birbirine karışmaz."""
+    return model_name if backend == 'torch' else f"{model_name}@{backend}"
+
+
+def _backend_kwargs(backend: str, threads: Optional[int]) -> Dict:
+    """Arka uca göre iş parçacığı sayısını ayarlayan `model_kwargs` sözlüğünü oluşturur."""
+    if not threads:
+        return {}
+    if backend == 'openvino':
+        return {'ov_config': {'INFERENCE_NUM_THREADS': threads}}
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    return {'session_options': options, 'provider': 'CPUExecutionProvider'}
+
+
+def _quantized_file(path: str) -> Optional[str]:
+    matches = sorted(glob.glob(os.path.join(path, 'onnx', '*qint8*.onnx')))
+    return os.path.relpath(matches[0], path).replace('\\', '/') if matches else None
+
+
+def load_embedding_model(
+    model_name: str,
+    backend: str = 'torch',
+    threads: Optional[int] = None,
+    quantization: str = DEFAULT_QUANTIZATION,
+    export_root: str = EMBEDDING_EXPORT_DIR,
+) -> SentenceTransformer:
+    """
+    Modeli istenen arka uçla yükler; ONNX/OpenVINO modeli henüz aktarılmadıysa aktarır.
+
+    Args:
+        backend: `EMBEDDING_BACKENDS` değerlerinden biri.
+        threads: Çıkarımda kullanılacak iş parçacığı sayısı (None: kütüphane varsayılanı).
+        quantization: onnx-int8 için nicemleme profili.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Bilinmeyen embedding arka ucu: {backend} (seçenekler: {', '.join(EMBEDDING_BACKENDS)})")
+    if backend == 'torch':
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name)
+
+    st_backend = 'openvino' if backend == 'openvino' else 'onnx'
+    path = export_path(model_name, backend, export_root)
+    if not os.path.exists(os.path.join(path, 'modules.json')):
+        print(f"'{model_name}' modeli {st_backend} formatına aktarılıyor ('{path}')...")
+        SentenceTransformer(model_name, backend=st_backend).save_pretrained(path)
+
+    model_kwargs = _backend_kwargs(backend, threads)
+    if backend == 'onnx-int8':
+        if _quantized_file(path) is None:
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+            print(f"ONNX modeli int8 olarak nicemleniyor (profil: {quantization})...")
+            export_dynamic_quantized_onnx_model(
+                SentenceTransformer(path, backend='onnx'), quantization, path, file_suffix='qint8'
+            )
+        model_kwargs['file_name'] = _quantized_file(path)
+    return SentenceTransformer(path, backend=st_backend, model_kwargs=model_kwargs or None)
+
+
+def parity_check(reference: SentenceTransformer, candidate: SentenceTransformer, texts: List[str]) -> Dict[str, float]:
+    """
+    Aynı metinlerin iki modeldeki vektörleri arasındaki kosinüs benzerliğini ölçer.
+
+    Returns:
+        Ortalama ve en düşük kosinüs benzerliği ile en büyük sapma (1 - kosinüs).
+    """
+    a = np.asarray(reference.encode(texts, convert_to_numpy=True), dtype=np.float32)
+    b = np.asarray(candidate.encode(texts, convert_to_numpy=True), dtype=np.float32)
+    cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12)
+    return {
+        'texts': len(texts),
+        'mean_cosine': float(cosine.mean()),
+        'min_cosine': float(cosine.min()),
+        'max_drift': float(1.0 - cosine.min()),
+    }
@@ -0,0 +1,122 @@
+"""
+Chunk metinlerinin embedding vektörlerini diskte saklayan kalıcı önbellek.
+
+Her vektör, model adı ve metnin SHA-1 özetiyle anahtarlanır. Böylece veritabanı yeniden
+oluşturulurken yalnızca yeni veya değişmiş chunk'lar kodlanır.
+
+Dizin yapısı (`embedding_cache/<model özeti>/`):
+    keys.bin     -> Art arda 20 baytlık SHA-1 anahtarları (satır sırasıyla)
+    vectors.f32  -> Art arda float32 vektörler (satır sırasıyla)
+    meta.json    -> Model adı ve vektör boyutu
+"""
+import hashlib
+import json
+import os
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+EMBEDDING_CACHE_DIR = 'embedding_cache'
+KEY_SIZE = 20
+
+
+class EmbeddingCache:
+    """Metin özeti -> vektör satırı eşlemesini tutan, ekleme yapılabilen disk önbelleği."""
+
+    def __init__(self, model_name: str, path: str = EMBEDDING_CACHE_DIR):
+        self.model_name = model_name
+        self.path = os.path.join(path, hashlib.sha1(model_name.encode('utf-8')).hexdigest()[:16])
+        os.makedirs(self.path, exist_ok=True)
+        self.keys_path = os.path.join(self.path, 'keys.bin')
+        self.vectors_path = os.path.join(self.path, 'vectors.f32')
+        self.meta_path = os.path.join(self.path, 'meta.json')
+        self.dimension: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            self.dimension = json.load(f)['dimension']
+        raw = b''
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, 'rb') as f:
+                raw = f.read()
+        vector_rows = os.path.getsize(self.vectors_path) // (4 * self.dimension) if os.path.exists(self.vectors_path) else 0
+        # Yazma sırasında kesilen bir çalıştırmadan kalan yarım kayıtları at
+        count = min(len(raw) // KEY_SIZE, vector_rows)
+        self._truncate(count)
+        self._rows = {raw[i * KEY_SIZE:(i + 1) * KEY_SIZE]: i for i in range(count)}
+
+    def _truncate(self, count: int):
+        for file_path, row_size in ((self.keys_path, KEY_SIZE), (self.vectors_path, 4 * self.dimension)):
+            if os.path.exists(file_path) and os.path.getsize(file_path) != count * row_size:
+                with open(file_path, 'r+b') as f:
+                    f.truncate(count * row_size)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode('utf-8')).digest()
+
+    def _append(self, keys: List[bytes], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        if self.dimension is None:
+            self.dimension = int(vectors.shape[1])
+            with open(self.meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'model_name': self.model_name, 'dimension': self.dimension}, f, ensure_ascii=False)
+        # Önce vektörler, sonra anahtarlar: anahtarı yazılmış her satırın vektörü de diskte olur
+        with open(self.vectors_path, 'ab') as f:
+            f.write(vectors.tobytes())
+        with open(self.keys_path, 'ab') as f:
+            f.write(b''.join(keys))
+        start = len(self._rows)
+        for offset, key in enumerate(keys):
+            self._rows[key] = start + offset
+
+    def vectors(self) -> np.ndarray:
+        """Önbellekteki tüm vektörleri bellek eşlemeli (N, D) dizi olarak döndürür."""
+        if not self._rows:
+            return np.empty((0, self.dimension or 0), dtype='float32')
+        return np.memmap(self.vectors_path, dtype='float32', mode='r', shape=(len(self._rows), self.dimension))
+
+    def encode(
+        self,
+        texts: List[str],
+        encode_fn: Callable[[List[str]], np.ndarray],
+        batch_size: int = 4096,
+        verbose: bool = True,
+    ) -> np.ndarray:
+        """
+        Metinlerin vektörlerini döndürür; önbellekte olmayanları `encode_fn` ile kodlayıp ekler.
+
+        Args:
+            texts: Vektörü istenen metinler.
+            encode_fn: Metin listesini (N, D) boyutlu diziye dönüştüren fonksiyon.
+            batch_size: Kodlanıp diske yazılacak grup boyutu; kesinti olursa
+                tamamlanan gruplar korunur.
+            verbose: False ise ilerleme mesajları yazdırılmaz (akış modunda her grup için çağrılır).
+
+        Returns:
+            (len(texts), D) boyutlu float32 dizi.
+        """
+        keys = [self.key(text) for text in texts]
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in self._rows and key not in missing:
+                missing[key] = text
+        if verbose:
+            print(f"Embedding önbelleği: {len(texts)} metinden {len(missing)} tanesi yeni, yalnızca bunlar kodlanacak.")
+
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), batch_size):
+            batch_keys = missing_keys[start:start + batch_size]
+            vectors = encode_fn([missing[key] for key in batch_keys])
+            self._append(batch_keys, vectors)
+            if verbose:
+                print(f"     ... {min(start + batch_size, len(missing_keys))}/{len(missing_keys)} yeni metin kodlandı.")
+
+        rows = np.fromiter((self._rows[key] for key in keys), dtype=np.int64, count=len(keys))
+        return np.asarray(self.vectors()[rows], dtype='float32')
@@ -0,0 +1,354 @@
+"""
+FAISS indeksinin oluşturulması, kaydedilmesi ve arama parametreleriyle yüklenmesi için yardımcılar.
+
+Seçilen indeks türü ve parametreleri, indeks dosyasının yanına JSON olarak yazılır
+(`tuik_faiss.index.json`). Sunucu bu dosyayı okuyarak arama ayarlarını (nprobe, efSearch)
+yükleme sırasında uygular.
+
+İndekslerdeki vektör kimlikleri (ID), chunk deposundaki satır numaralarıyla aynıdır; bu
+sayede veritabanı baştan oluşturulmadan vektör eklenip silinebilir.
+
+Sıkıştırılmış indeks türleri (sq_fp16: 2x, sq8: 4x, ivf_pq: 16x ve üzeri) sunucu
+belleğini küçültür ancak mesafeleri yaklaşık hesaplar. Bu türlerde tam hassasiyetli
+vektörler ayrıca bellek eşlemeli bir yan dosyada (`tuik_vectors.npy`) saklanır; sunucu
+indeksten daha fazla aday alır ve son adayları bu vektörlerle tam mesafeyle yeniden
+puanlar (`rescore`). Yan dosyanın yalnızca okunan sayfaları belleğe alınır.
+
+Parametre dosyası ve vektör dosyasının yanındaki `tuik_vectors.npy.json`, eşlendikleri
+chunk deposunun derleme kimliğini (`build_id`) saklar. Bu dosyalar yazılmadan önce silinir
+ve en son yeniden yazılır; böylece yazma sırasında hiçbir okuyucu yeni bir indeksi veya
+vektör dosyasını eski bir kimlikle eşleştiremez.
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+INDEX_FILE = 'tuik_faiss.index'
+VECTORS_FILE = 'tuik_vectors.npy'
+INDEX_TYPES = ('flat', 'ivf_flat', 'ivf_pq', 'hnsw', 'sq_fp16', 'sq8')
+# Mesafeleri yaklaşık hesaplayan (vektörleri sıkıştırarak saklayan) indeks türleri
+LOSSY_INDEX_TYPES = ('ivf_pq', 'sq_fp16', 'sq8')
+
+DEFAULT_INDEX_PARAMS = {
+    'index_type': 'flat',
+    'nlist': None,          # IVF küme sayısı (None: ~4*sqrt(N) olarak otomatik seçilir)
+    'nprobe': 16,           # IVF aramasında taranacak küme sayısı
+    'pq_m': 64,             # IVF-PQ alt vektör sayısı (boyutu tam bölmeli)
+    'pq_nbits': 8,          # IVF-PQ alt vektör başına bit sayısı
+    'hnsw_m': 32,           # HNSW düğüm başına bağlantı sayısı
+    'ef_construction': 200, # HNSW oluşturma sırasındaki aday listesi boyutu
+    'ef_search': 64,        # HNSW aramasındaki aday listesi boyutu
+    'train_sample': 100000, # IVF/SQ/PQ eğitiminde kullanılacak en fazla vektör sayısı
+    'rescore': True,        # Sıkıştırılmış türlerde adayları tam vektörlerle yeniden puanla
+    'rescore_factor': 4,    # Yeniden puanlama için indeksten alınacak aday katsayısı
+}
+
+
+def params_path(index_path: str = INDEX_FILE) -> str:
+    """İndeks dosyasının yanındaki parametre dosyasının yolunu döndürür."""
+    return f"{index_path}.json"
+
+
+def vectors_meta_path(path: str = VECTORS_FILE) -> str:
+    """Tam vektör dosyasının yanındaki, derleme kimliğini tutan dosyanın yolunu döndürür."""
+    return f"{path}.json"
+
+
+def _remove_if_exists(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_vectors_meta(path: str, build_id: Optional[str]):
+    """Vektör dosyasını `build_id` derlemesine ait olarak işaretler."""
+    meta_path = vectors_meta_path(path)
+    with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump({'build_id': build_id}, f)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+def read_vectors_build_id(path: str = VECTORS_FILE) -> Optional[str]:
+    """Vektör dosyasının eşlendiği deponun derleme kimliği; yan dosya yoksa None."""
+    try:
+        with open(vectors_meta_path(path), 'r', encoding='utf-8') as f:
+            return json.load(f).get('build_id')
+    except FileNotFoundError:
+        return None
+
+
+def delete_vectors_file(path: str = VECTORS_FILE):
+    """Vektör dosyasını ve kimlik dosyasını (varsa) siler."""
+    _remove_if_exists(path)
+    _remove_if_exists(vectors_meta_path(path))
+
+
+def replace_vectors(source: str, path: str = VECTORS_FILE, build_id: Optional[str] = None):
+    """Tamamlanmış bir vektör dosyasını yerine taşır; kimlik en son yazılır."""
+    _remove_if_exists(vectors_meta_path(path))
+    os.replace(source, path)
+    write_vectors_meta(path, build_id)
+
+
+def _auto_nlist(n_vectors: int) -> int:
+    return max(1, min(int(4 * np.sqrt(max(n_vectors, 1))), n_vectors // 39 or 1))
+
+
+def create_index(dimension: int, params: Dict[str, Any], n_vectors: int) -> faiss.Index:
+    """
+    Parametrelere göre boş (henüz eğitilmemiş) bir FAISS indeksi oluşturur.
+
+    Args:
+        dimension: Vektör boyutu.
+        params: İndeks parametreleri (bkz. DEFAULT_INDEX_PARAMS).
+        n_vectors: İndekse eklenecek toplam vektör sayısı (nlist otomatik seçimi için).
+
+    Returns:
+        FAISS indeks nesnesi.
+    """
+    index_type = params['index_type']
+    # Düz ve HNSW indeksleri kimlikleri kendileri tutmadığından IndexIDMap2 ile sarmalanır
+    if index_type == 'flat':
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+    if index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dimension, params['hnsw_m'])
+        index.hnsw.efConstruction = params['ef_construction']
+        return faiss.IndexIDMap2(index)
+    if index_type in ('sq_fp16', 'sq8'):
+        qtype = faiss.ScalarQuantizer.QT_fp16 if index_type == 'sq_fp16' else faiss.ScalarQuantizer.QT_8bit
+        return faiss.IndexIDMap2(faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_L2))
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        if not params.get('nlist'):
+            params['nlist'] = _auto_nlist(n_vectors)
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == 'ivf_flat':
+            return faiss.IndexIVFFlat(quantizer, dimension, params['nlist'])
+        if dimension % params['pq_m'] != 0:
+            raise ValueError(f"pq_m ({params['pq_m']}) vektör boyutunu ({dimension}) tam bölmelidir.")
+        return faiss.IndexIVFPQ(quantizer, dimension, params['nlist'], params['pq_m'], params['pq_nbits'])
+    raise ValueError(f"Desteklenmeyen indeks türü '{index_type}'. Seçenekler: {', '.join(INDEX_TYPES)}")
+
+
+def train_index(index: faiss.Index, embeddings: np.ndarray, train_sample: int, seed: int = 42):
+    """Eğitim gerektiren indeksleri, vektörlerden rastgele seçilen bir örneklemle eğitir."""
+    if index.is_trained:
+        return
+    n_vectors = embeddings.shape[0]
+    if train_sample and n_vectors > train_sample:
+        rng = np.random.default_rng(seed)
+        sample = embeddings[np.sort(rng.choice(n_vectors, train_sample, replace=False))]
+    else:
+        sample = embeddings
+    print(f"İndeks {len(sample)} vektörlük örneklem ile eğitiliyor...")
+    index.train(np.ascontiguousarray(sample, dtype='float32'))
+
+
+def build_index(embeddings: np.ndarray, params: Dict[str, Any]) -> faiss.Index:
+    """
+    Vektörlerden, parametrelerde seçilen türde bir indeks oluşturur, eğitir ve doldurur.
+    i. vektörün kimliği i olur (chunk deposundaki satır numarası).
+    """
+    index = create_index(embeddings.shape[1], params, embeddings.shape[0])
+    train_index(index, embeddings, params.get('train_sample'))
+    add_vectors(index, embeddings)
+    apply_search_params(index, params)
+    return index
+
+
+def add_vectors(index: faiss.Index, embeddings: np.ndarray, start_id: int = 0, batch_size: int = 65536):
+    """
+    Vektörleri `start_id`den başlayan ardışık kimliklerle gruplar halinde ekler. Bellek
+    eşlemeli (np.memmap) diziler için her seferinde yalnızca bir grup belleğe okunur.
+    """
+    for start in range(0, embeddings.shape[0], batch_size):
+        batch = np.ascontiguousarray(embeddings[start:start + batch_size], dtype='float32')
+        index.add_with_ids(batch, np.arange(start_id + start, start_id + start + len(batch), dtype='int64'))
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """IndexIDMap sarmalayıcısının altındaki asıl indeksi döndürür."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def is_id_mapped(index: faiss.Index) -> bool:
+    """İndeksin harici kimliklerle (add_with_ids) çalışıp çalışmadığını döndürür."""
+    index = faiss.downcast_index(index)
+    return isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexIVF))
+
+
+def remove_vectors(index: faiss.Index, ids: np.ndarray) -> int:
+    """Verilen kimliklere sahip vektörleri indeksten siler ve silinen sayıyı döndürür."""
+    if len(ids) == 0:
+        return 0
+    try:
+        return index.remove_ids(np.asarray(ids, dtype='int64'))
+    except RuntimeError as e:
+        raise ValueError("Bu indeks türü vektör silmeyi desteklemiyor; veritabanını baştan oluşturun.") from e
+
+
+def apply_search_params(index: faiss.Index, params: Dict[str, Any]):
+    """Arama zamanı parametrelerini (nprobe, efSearch) indekse uygular."""
+    index_type = params.get('index_type', 'flat')
+    if index_type in ('ivf_flat', 'ivf_pq') and params.get('nprobe'):
+        faiss.extract_index_ivf(index).nprobe = int(params['nprobe'])
+    elif index_type == 'hnsw' and params.get('ef_search'):
+        base_index(index).hnsw.efSearch = int(params['ef_search'])
+
+
+def filtered_search(index: faiss.Index, params: Dict[str, Any], queries: np.ndarray, k: int, allowed_ids: np.ndarray):
+    """
+    Yalnızca `allowed_ids` kimlikli vektörler arasında arama yapar. Kimlikler, indeks
+    türünden bağımsız olarak IDSelectorBitmap ile seçilir; IVF ve HNSW indekslerinde
+    kayıtlı nprobe / efSearch ayarları korunur.
+
+    Returns:
+        `index.search` ile aynı biçimde (mesafeler, kimlikler) ikilisi.
+    """
+    allowed_ids = np.asarray(allowed_ids, dtype='int64')
+    size = int(allowed_ids.max()) + 1 if len(allowed_ids) else 1
+    mask = np.zeros(size, dtype=bool)
+    mask[allowed_ids] = True
+    # Bitmap ve seçici arama bitene kadar bu fonksiyonda referanslı kalmalı.
+    # IDSelectorBitmap uzunluğu bit değil bayt cinsinden bekler.
+    bitmap = np.packbits(mask, bitorder='little')
+    selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+    index_type = params.get('index_type', 'flat')
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        search_params = faiss.SearchParametersIVF(sel=selector, nprobe=int(faiss.extract_index_ivf(index).nprobe))
+    elif index_type == 'hnsw':
+        search_params = faiss.SearchParametersHNSW(sel=selector, efSearch=int(base_index(index).hnsw.efSearch))
+    else:
+        search_params = faiss.SearchParameters(sel=selector)
+    return index.search(np.ascontiguousarray(queries, dtype='float32'), k, params=search_params)
+
+
+def needs_rescore(params: Dict[str, Any]) -> bool:
+    """İndeks türü sıkıştırılmışsa ve yeniden puanlama açıksa True döndürür."""
+    return params.get('index_type') in LOSSY_INDEX_TYPES and bool(params.get('rescore', True))
+
+
+def write_vectors(embeddings: np.ndarray, path: str = VECTORS_FILE, build_id: Optional[str] = None, batch_size: int = 65536):
+    """Tam hassasiyetli vektörleri (i. satır = i. chunk) yan dosyaya atomik olarak yazar."""
+    out = np.lib.format.open_memmap(f"{path}.tmp", mode='w+', dtype='float32', shape=embeddings.shape)
+    for start in range(0, embeddings.shape[0], batch_size):
+        out[start:start + batch_size] = embeddings[start:start + batch_size]
+    out.flush()
+    del out
+    replace_vectors(f"{path}.tmp", path, build_id)
+
+
+def append_vectors(
+    embeddings: np.ndarray, start_id: int, path: str = VECTORS_FILE, build_id: Optional[str] = None, batch_size: int = 65536
+) -> bool:
+    """
+    Yeni chunk'ların vektörlerini yan dosyanın sonuna ekler. Dosyadaki satır sayısı
+    `start_id` ile uyuşmazsa (dosya eskimişse) dosya silinir ve False döndürülür; sunucu
+    bu durumda yeniden puanlama yapmaz.
+    """
+    existing = np.load(path, mmap_mode='r')
+    if existing.shape[0] != start_id or (len(embeddings) and existing.shape[1] != embeddings.shape[1]):
+        del existing
+        delete_vectors_file(path)
+        return False
+    out = np.lib.format.open_memmap(f"{path}.tmp", mode='w+', dtype='float32', shape=(start_id + len(embeddings), existing.shape[1]))
+    for start in range(0, start_id, batch_size):
+        end = min(start + batch_size, start_id)
+        out[start:end] = existing[start:end]
+    out[start_id:] = embeddings
+    out.flush()
+    del out, existing
+    replace_vectors(f"{path}.tmp", path, build_id)
+    return True
+
+
+def rescore(vectors: np.ndarray, queries: np.ndarray, candidates, k: int):
+    """
+    İndeksten gelen aday kimliklerini tam hassasiyetli vektörlerle L2 mesafesine göre
+    yeniden sıralar ve her sorgu için ilk `k` tanesini döndürür.
+
+    Args:
+        vectors: Yan dosyadaki (bellek eşlemeli) tam vektörler.
+        candidates: Sorgu başına aday kimlik dizileri (-1 değerleri yok sayılır).
+
+    Returns:
+        `index.search` ile aynı biçimde (mesafeler, kimlikler); eksik sonuçlar -1 ile doldurulur.
+    """
+    distances = np.full((len(queries), k), np.inf, dtype='float32')
+    ids = np.full((len(queries), k), -1, dtype='int64')
+    for i, (query, row) in enumerate(zip(queries, candidates)):
+        row = np.asarray(row, dtype='int64')
+        row = row[row >= 0]
+        if not len(row):
+            continue
+        # Bellek eşlemeli dosyadan sıralı okuma daha az sayfa dolaşır
+        order = np.argsort(row)
+        exact = np.empty(len(row), dtype='float32')
+        exact[order] = ((np.asarray(vectors[row[order]], dtype='float32') - query) ** 2).sum(axis=1)
+        best = np.argsort(exact, kind='stable')[:k]
+        distances[i, :len(best)] = exact[best]
+        ids[i, :len(best)] = row[best]
+    return distances, ids
+
+
+def write_index(
+    index: faiss.Index, params: Dict[str, Any], index_path: str = INDEX_FILE,
+    chunk_count: Optional[int] = None, build_id: Optional[str] = None,
+):
+    """
+    İndeksi ve kullanılan parametreleri yan yana kaydeder. Dosyalar önce geçici adla
+    yazılıp sonra yerine taşındığından okuyucular hiçbir zaman yarım dosya görmez.
+
+    `build_id`, indeksin eşlendiği chunk deposunun derleme kimliğidir (`chunk_count` ise
+    satır sayısı); sunucu indeksi yalnızca kimliği aynı olan depoyla yükler. Eski parametre
+    dosyası indeks değiştirilmeden önce silinir.
+    """
+    faiss.write_index(index, f"{index_path}.tmp")
+    _remove_if_exists(params_path(index_path))
+    os.replace(f"{index_path}.tmp", index_path)
+    stored = dict(params, dimension=index.d, ntotal=index.ntotal, build_id=build_id)
+    if chunk_count is not None:
+        stored['chunk_count'] = int(chunk_count)
+    with open(f"{params_path(index_path)}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(stored, f, ensure_ascii=False, indent=4)
+    os.replace(f"{params_path(index_path)}.tmp", params_path(index_path))
+
+
+def read_index_params(index_path: str = INDEX_FILE) -> Dict[str, Any]:
+    """
+    İndeksin yanındaki parametre dosyasını okur. Dosya yoksa (eski veritabanları)
+    düz (flat) indeks varsayılır.
+    """
+    path = params_path(index_path)
+    params = dict(DEFAULT_INDEX_PARAMS)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            params.update(json.load(f))
+    return params
+
+
+def load_index(index_path: str = INDEX_FILE, overrides: Optional[Dict[str, Any]] = None, mmap: bool = False):
+    """
+    İndeksi okur ve kayıtlı (veya dışarıdan verilen) arama parametrelerini uygular.
+
+    Args:
+        index_path: FAISS indeks dosyasının yolu.
+        overrides: Kayıtlı parametrelerin üzerine yazılacak arama ayarları (örn. {'nprobe': 32}).
+        mmap: True ise vektör kodları (ve HNSW bağlantıları / IVF listeleri) belleğe kopyalanmaz,
+            dosyadan salt okunur eşlenir. Aynı dosyayı açan süreçler işletim sisteminin sayfa
+            önbelleğini paylaşır; indeks bu durumda değiştirilemez (yalnızca sunucuda kullanılır).
+
+    Returns:
+        (indeks, parametreler) ikilisi.
+    """
+    index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if mmap else 0)
+    params = read_index_params(index_path)
+    params.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    apply_search_params(index, params)
+    return index, params
@@ -0,0 +1,342 @@
+"""
+Excel tablolarını Gemini ile chunk'lara dönüştüren asyncio tabanlı işlem hattı.
+
+Gemini çağrıları ağ beklemesi olduğundan işlemler (process) yerine tek bir olay döngüsünde
+eşzamanlı yürütülür:
+    - TokenBucket / RateLimiter: dakikalık istek (RPM) ve token (TPM) kotalarına uyar.
+    - AdaptiveConcurrency: 429 cevaplarında eşzamanlılığı yarıya indirir, başarılı
+      isteklerle kademeli olarak artırır (AIMD).
+    - Tekrar denemeler öncelikli kuyruğa yeni işlerden önce alınır.
+    - Kota (429) beklemeleri deneme hakkından düşülmez, ancak dosya başına toplam bekleme
+      süresi `max_quota_wait` ile sınırlıdır; aşılırsa dosya başarısız sayılır.
+
+Hazırlık fonksiyonu bir tabloyu yerel olarak chunk'lara dönüştürebildiyse (düzenli tablolar,
+bkz. utils/table_chunker.py) o dosya için Gemini'ye hiç istek gönderilmez.
+
+İstemci Gemini REST API'sini doğrudan kullanır; `endpoint` parametresiyle yerel bir
+sahte (stub) sunucuya yönlendirilerek test edilebilir.
+"""
+import asyncio
+import itertools
+import json
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com"
+GEMINI_MODEL = 'gemini-2.5-pro'
+
+
+class GeminiError(Exception):
+    """Gemini API'sinden tekrar denenebilecek bir hata döndü."""
+
+
+class RateLimitError(GeminiError):
+    """Gemini API'si kota aşımı (429) bildirdi."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def build_chunking_prompt(table_as_csv_string: str, file_name: str) -> str:
+    return f"""
+    Sen, karmaşık ve düzensiz TÜİK Excel tablolarını analiz etme konusunda uzman bir veri analistisin.
+    Görevin, sana CSV formatında verilen bir tabloyu inceleyip, içindeki her anlamlı veri noktasını,
+    kendi başına bir anlam ifade eden, bağlamı zenginleştirilmiş tam bir cümleye dönüştürmektir.
+    - Sadece gerçek veri içeren satırlara odaklan.
+    - Sonucu, her cümlenin bir eleman olduğu bir JSON Array (liste) olarak döndür.
+    - Sadece ve sadece JSON listesini döndür, başka hiçbir açıklama veya metin ekleme.
+    İşte analiz edilecek tablo. Dosya Adı: {file_name}\n\nTablo (CSV Formatı):\n{table_as_csv_string}
+    """
+
+
+def parse_llm_chunks(content: str, file_name: str) -> list:
+    """Modelin döndürdüğü JSON listesini chunk sözlüklerine dönüştürür."""
+    if content.strip().startswith("```json"):
+        content = content.strip()[7:-3].strip()
+    generated_chunks = json.loads(content)
+    final_chunks = []
+    if isinstance(generated_chunks, list):
+        for text in generated_chunks:
+            final_chunks.append({'text': str(text), 'metadata': {'source': file_name, 'type': 'llm_generated_data_point'}})
+    return final_chunks
+
+
+class TokenBucket:
+    """Dakikalık bir kotayı sürekli dolan bir kova olarak uygulayan sınırlayıcı."""
+
+    def __init__(self, per_minute: Optional[float]):
+        self.rate = (per_minute or 0) / 60.0
+        self.capacity = float(per_minute or 0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        if self.rate <= 0:
+            return
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta: float):
+        """Tahmin edilen ile gerçekleşen kullanım arasındaki farkı kovaya yansıtır."""
+        if self.rate > 0:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class RateLimiter:
+    """İstek/dakika ve token/dakika kotalarını birlikte uygular."""
+
+    def __init__(self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, estimated_tokens: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+
+
+class AdaptiveConcurrency:
+    """
+    Eşzamanlı istek sayısını AIMD ile ayarlayan semafor: her `limit` kadar başarılı
+    istekte sınır bir artar, kota aşımında yarıya iner.
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1, cooldown: float = 5.0):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.cooldown = cooldown
+        self.active = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.maximum:
+            self.limit += 1
+            self._successes = 0
+
+    def on_rate_limit(self):
+        # Aynı kota dalgasında gelen birden fazla 429 sınırı tekrar tekrar düşürmesin
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._last_decrease = now
+        self._successes = 0
+
+
+class GeminiClient:
+    """Gemini `generateContent` REST uç noktası için asenkron istemci."""
+
+    def __init__(self, api_key: str, model: str = GEMINI_MODEL, endpoint: str = GEMINI_API_BASE,
+                 timeout: float = 300.0, http_client: Optional[httpx.AsyncClient] = None):
+        self.api_key = api_key
+        self.model = model
+        self.url = f"{endpoint.rstrip('/')}/v1beta/models/{model}:generateContent"
+        self._client = http_client or httpx.AsyncClient(timeout=timeout)
+
+    async def generate(self, prompt: str, temperature: float = 0.0):
+        """
+        Prompt'u gönderir ve (metin, toplam token sayısı) ikilisini döndürür.
+
+        Raises:
+            RateLimitError: 429 cevabında.
+            GeminiError: Diğer hata durumlarında veya boş/engellenmiş cevapta.
+        """
+        body = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {"temperature": temperature},
+        }
+        try:
+            response = await self._client.post(self.url, json=body, headers={"x-goog-api-key": self.api_key})
+        except httpx.HTTPError as e:
+            raise GeminiError(f"Ağ hatası: {e}") from e
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.headers.get("retry-after", ""))
+            except ValueError:
+                retry_after = None
+            raise RateLimitError("Kota aşıldı (429).", retry_after)
+        if response.status_code >= 400:
+            raise GeminiError(f"HTTP {response.status_code}: {response.text[:200]}")
+        data = response.json()
+        candidates = data.get("candidates") or []
+        parts = candidates[0].get("content", {}).get("parts", []) if candidates else []
+        if not parts:
+            block_reason = data.get("promptFeedback", {}).get("blockReason")
+            if block_reason:
+                raise GeminiError(f"Cevap güvenlik nedeniyle engellendi (Sebep: {block_reason})")
+            raise GeminiError("Model boş bir cevap döndürdü.")
+        text = "".join(part.get("text", "") for part in parts)
+        return text, data.get("usageMetadata", {}).get("totalTokenCount")
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class ChunkingPipeline:
+    """
+    Dosyaları hazırlayıp (Excel -> CSV) Gemini'ye gönderen, kota ve eşzamanlılık
+    sınırlarına uyan işlem hattı.
+    """
+
+    RETRY_PRIORITY, NEW_PRIORITY = 0, 1
+
+    def __init__(
+        self,
+        client: Optional[GeminiClient],
+        limiter: RateLimiter,
+        concurrency: AdaptiveConcurrency,
+        max_retries: int = 5,
+        base_backoff: float = 2.0,
+        max_quota_wait: float = 900.0,
+    ):
+        self.client = client
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_quota_wait = max_quota_wait
+
+    async def run(
+        self,
+        file_infos: List[Dict[str, Any]],
+        prepare_fn: Callable[[str], Any],
+        on_success: Callable[[Dict[str, Any], list], None],
+        on_failure: Callable[[Dict[str, Any], Exception], None],
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Tüm dosyaları işler; her dosya için `on_success` veya `on_failure` tam bir kez çağrılır.
+        `on_success` hata yükseltirse dosya `on_failure` ile başarısız kaydedilir; geri çağırma
+        hataları işçileri durdurmaz.
+
+        Args:
+            file_infos: `{'path': ..., 'category': ...}` sözlükleri.
+            prepare_fn: Dosya yolunu alıp modele gönderilecek tablo metnini döndüren
+                (CPU yoğun, `executor` içinde çalıştırılan) fonksiyon. Metin yerine chunk
+                listesi döndürürse dosya Gemini'ye gönderilmeden başarılı sayılır.
+            on_success: (dosya bilgisi, chunk listesi) ile çağrılır.
+            on_failure: (dosya bilgisi, hata) ile çağrılır.
+            executor: Tablo hazırlığının çalıştırılacağı executor (örn. ProcessPoolExecutor).
+        """
+        if not file_infos:
+            return
+        loop = asyncio.get_running_loop()
+        queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        sequence = itertools.count()
+        remaining = len(file_infos)
+        finished = asyncio.Event()
+
+        for info in file_infos:
+            queue.put_nowait((self.NEW_PRIORITY, next(sequence), {'info': info, 'attempt': 0, 'quota_retries': 0, 'quota_waited': 0.0, 'prompt': None}))
+
+        def complete():
+            nonlocal remaining
+            remaining -= 1
+            if remaining == 0:
+                finished.set()
+
+        def succeed(info, chunks):
+            try:
+                on_success(info, chunks)
+            except Exception as e:
+                # Sonuç kaydedilemedi (örn. disk hatası): dosya başarısız sayılır, işçi devam eder
+                fail(info, e)
+                return
+            complete()
+
+        def fail(info, error):
+            try:
+                on_failure(info, error)
+            except Exception as e:
+                print(f"     ❌ {info['path']} için hata kaydedilemedi: {e} (asıl hata: {error})")
+            complete()
+
+        def retry_later(job, delay):
+            loop.call_later(delay, queue.put_nowait, (self.RETRY_PRIORITY, next(sequence), job))
+
+        async def worker():
+            while True:
+                _, _, job = await queue.get()
+                info = job['info']
+                file_name = info['path'].replace('\\', '/').rsplit('/', 1)[-1]
+                if job['prompt'] is None:
+                    try:
+                        table = await loop.run_in_executor(executor, prepare_fn, info['path'])
+                    except Exception as e:
+                        fail(info, e)
+                        continue
+                    if isinstance(table, list):
+                        succeed(info, table)
+                        continue
+                    if self.client is None:
+                        fail(info, GeminiError("Tablo düzensiz ve Gemini istemcisi yok (GOOGLE_API_KEY tanımlı değil)."))
+                        continue
+                    job['prompt'] = build_chunking_prompt(table, file_name)
+                estimated_tokens = len(job['prompt']) // 4
+                try:
+                    async with self.concurrency:
+                        await self.limiter.acquire(estimated_tokens)
+                        text, used_tokens = await self.client.generate(job['prompt'])
+                    if used_tokens:
+                        self.limiter.tokens.adjust(used_tokens - estimated_tokens)
+                    chunks = parse_llm_chunks(text, file_name)
+                except RateLimitError as e:
+                    self.concurrency.on_rate_limit()
+                    # Kota hataları deneme hakkından düşülmez; ayrı sayılır ve toplam bekleme sınırlıdır
+                    delay = e.retry_after or self.base_backoff * (2 ** min(job['quota_retries'], 5))
+                    if job['quota_waited'] + delay > self.max_quota_wait:
+                        fail(info, RateLimitError(f"Kota {job['quota_waited']:.0f} sn boyunca açılmadı ({job['quota_retries']} tekrar).", e.retry_after))
+                        continue
+                    job['quota_retries'] += 1
+                    job['quota_waited'] += delay
+                    print(f"     ⏳ Kota aşıldı, eşzamanlılık {self.concurrency.limit} oldu; {file_name} {delay:.1f} sn sonra öncelikli olarak tekrar denenecek.")
+                    retry_later(job, delay)
+                    continue
+                except Exception as e:
+                    job['attempt'] += 1
+                    if job['attempt'] < self.max_retries:
+                        delay = self.base_backoff * (2 ** (job['attempt'] - 1))
+                        print(f"     ⚠️ Hata (Deneme {job['attempt']}/{self.max_retries}), {file_name} {delay:.0f} saniye sonra tekrar denenecek: {e}")
+                        retry_later(job, delay)
+                    else:
+                        fail(info, e)
+                    continue
+                self.concurrency.on_success()
+                succeed(info, chunks)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency.maximum)]
+        try:
+            await finished.wait()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,203 @@
+"""
+RAG veritabanının (FAISS indeksi + chunk deposu + sözcüksel indeks + tablo yönlendirme indeksi) sunucu çalışırken yeniden yüklenmesi için yardımcılar.
+
+Her yükleme bir "nesil" (`RagGeneration`) üretir. Sorgular başlarken o anki nesli alıp
+sonuna kadar onu kullanır; yeni nesil arka planda yüklenir ve tek bir referans
+atamasıyla devreye alınır. Böylece süren sorgular eski nesil üzerinde tamamlanır.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from utils.chunk_store import CHUNK_STORE_DIR, LEGACY_CHUNKS_FILE, load_chunks
+from utils.faiss_index import INDEX_FILE, VECTORS_FILE, load_index, needs_rescore, params_path, read_vectors_build_id
+from utils.lexical_index import LEXICAL_INDEX_DIR, LexicalIndex
+from utils.table_router import TABLE_ROUTER_DIR, TableRouter
+
+# `lexical`: BM25 indeksi, `router`: tablo yönlendirme indeksi, `vectors`: sıkıştırılmış
+# indekslerde yeniden puanlama için bellek eşlemeli tam vektörler; eski veritabanlarında
+# veya chunk deposuyla uyumsuzlarsa None
+RagGeneration = namedtuple(
+    "RagGeneration", ["index", "chunks", "params", "signature", "generation", "loaded_at", "lexical", "router", "vectors"]
+)
+
+
+def files_signature(index_path: str = INDEX_FILE, store_path: str = CHUNK_STORE_DIR) -> tuple:
+    """Veritabanı dosyalarının (değişiklik zamanı, boyut) imzasını döndürür."""
+    paths = (
+        index_path,
+        params_path(index_path),
+        os.path.join(store_path, 'meta.json'),
+        LEGACY_CHUNKS_FILE,
+        os.path.join(LEXICAL_INDEX_DIR, 'meta.json'),
+        os.path.join(TABLE_ROUTER_DIR, 'meta.json'),
+        VECTORS_FILE,
+    )
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def _same_build(store_build: Optional[str], artifact_build: Optional[str]) -> bool:
+    """
+    Bir dosyanın chunk deposuyla aynı derlemeye ait olup olmadığını döndürür. Sayılar eşit
+    olsa da kimlikleri farklı dosyalar farklı chunk'lara işaret edebilir; yalnızca iki tarafta
+    da kimlik olmayan eski veritabanlarında karar sayı kontrollerine bırakılır.
+    """
+    if store_build is None and artifact_build is None:
+        return True
+    return store_build == artifact_build
+
+
+def load_generation(
+    generation: int = 1,
+    overrides: Optional[Dict[str, Any]] = None,
+    index_path: str = INDEX_FILE,
+    store_path: str = CHUNK_STORE_DIR,
+    lexical_path: str = LEXICAL_INDEX_DIR,
+    router_path: str = TABLE_ROUTER_DIR,
+    vectors_path: str = VECTORS_FILE,
+    mmap_index: bool = False,
+) -> RagGeneration:
+    """
+    İndeksi, chunk deposunu ve (varsa) sözcüksel ve tablo yönlendirme indekslerini yükleyip
+    yeni bir nesil oluşturur. `mmap_index` verilirse FAISS indeksi de (diğer dosyalar gibi)
+    bellek eşlemeli açılır.
+
+    Raises:
+        ValueError: İndeks, parametre dosyası ve chunk deposu aynı derlemeye (derleme kimliğine)
+            ait değilse (örn. derleme betiği dosyaları yazarken okunduysa).
+    """
+    signature = files_signature(index_path, store_path)
+    index, params = load_index(index_path, overrides, mmap=mmap_index)
+    chunks = load_chunks(store_path)
+    store_build = getattr(chunks, 'build_id', None)
+    # Uyumsuz bir indeks ve depo, sorgulara başka chunk'ların metnini döndürür
+    if not _same_build(store_build, params.get('build_id')):
+        raise ValueError(f"Index belongs to build {params.get('build_id')} but the chunk store to {store_build}")
+    if index.ntotal != params.get('ntotal', index.ntotal):
+        raise ValueError(f"Index has {index.ntotal} vectors but its params file records {params['ntotal']}")
+    expected_chunks = params.get('chunk_count')
+    if expected_chunks is not None and expected_chunks != len(chunks):
+        raise ValueError(f"Index was built for {expected_chunks} chunks but the chunk store has {len(chunks)}")
+    if index.ntotal > len(chunks):
+        raise ValueError(f"Index has {index.ntotal} vectors but the chunk store has only {len(chunks)} chunks")
+    lexical = None
+    if os.path.exists(os.path.join(lexical_path, 'meta.json')):
+        lexical = LexicalIndex(lexical_path)
+        # Depodan farklı bir derlemeye ait indeks yanlış chunk'ları döndürür
+        if not _same_build(store_build, lexical.meta.get('build_id')) or lexical.meta['count'] != len(chunks):
+            lexical = None
+    router = None
+    if os.path.exists(os.path.join(router_path, 'meta.json')):
+        router = TableRouter(router_path)
+        if not _same_build(store_build, router.meta.get('build_id')) or router.meta['count'] != len(chunks):
+            router = None
+    vectors = None
+    if needs_rescore(params) and os.path.exists(vectors_path):
+        if _same_build(store_build, read_vectors_build_id(vectors_path)):
+            vectors = np.load(vectors_path, mmap_mode='r')
+            if vectors.shape != (len(chunks), index.d):
+                vectors = None
+    return RagGeneration(index, chunks, params, signature, generation, time.time(), lexical, router, vectors)
+
+
+class IndexReloader:
+    """
+    Geçerli RAG neslini tutan, dosya değişikliklerini izleyen ve yeni nesli
+    arka planda yükleyip atomik olarak devreye alan sınıf.
+    """
+
+    def __init__(
+        self,
+        initial: Optional[RagGeneration],
+        overrides: Optional[Dict[str, Any]] = None,
+        logger=None,
+        loader: Callable[..., RagGeneration] = load_generation,
+        signature_fn: Callable[[], tuple] = files_signature,
+        on_load: Optional[Callable[[RagGeneration], None]] = None,
+    ):
+        """
+        Args:
+            on_load: `reload` yeni bir nesli devreye aldıktan sonra çağrılır (örn. başlangıçta
+                yüklenemeyen veritabanını hazır işaretlemek için).
+        """
+        self.current = initial
+        self.overrides = overrides or {}
+        self.logger = logger
+        self._loader = loader
+        self._signature_fn = signature_fn
+        self._on_load = on_load
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _log(self, level: str, message: str):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def load_initial(self) -> RagGeneration:
+        """İlk nesli yükleyip devreye alır; `reload`'dan farklı olarak hata durumunda istisna yükseltir."""
+        with self._lock:
+            rag = self._loader(generation=1, overrides=self.overrides)
+            self.current = rag
+        return rag
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Dosyalar değiştiyse (veya `force` verilmişse) yeni nesli yükler ve devreye alır.
+        Aynı anda yalnızca bir yükleme yapılır. Yükleme başarısız olursa eski nesil kalır.
+
+        Returns:
+            Yeni nesil devreye alındıysa True.
+        """
+        with self._lock:
+            current = self.current
+            signature = self._signature_fn()
+            if not force and current is not None and signature == current.signature:
+                return False
+            next_generation = (current.generation + 1) if current else 1
+            started = time.perf_counter()
+            try:
+                rag = self._loader(generation=next_generation, overrides=self.overrides)
+            except Exception as e:
+                self._log('error', f"RAG database reload failed, keeping generation {current.generation if current else None}: {e}")
+                return False
+            # Tek bir referans ataması: süren sorgular eski nesli kullanmaya devam eder
+            self.current = rag
+            self._log('info', f"RAG database generation {rag.generation} loaded in {time.perf_counter() - started:.2f}s ({len(rag.chunks)} chunks)")
+        if self._on_load:
+            self._on_load(rag)
+        return True
+
+    def _watch(self, interval: float):
+        last_seen = self._signature_fn()
+        while not self._stop.wait(interval):
+            signature = self._signature_fn()
+            current = self.current
+            # Derleme betiği dosyaları sırayla yazdığından, imza iki yoklama boyunca
+            # sabit kalana kadar beklenir; yarım güncellenmiş veritabanı yüklenmez.
+            if signature == last_seen and (current is None or signature != current.signature):
+                self.reload()
+            last_seen = signature
+
+    def start_watching(self, interval: float):
+        """Dosya değişikliklerini arka plan iş parçacığında `interval` saniyede bir yoklar."""
+        if interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="index-watcher", daemon=True)
+        self._watcher.start()
+        self._log('info', f"Watching RAG database files every {interval}s for changes")
+
+    def stop_watching(self):
+        self._stop.set()
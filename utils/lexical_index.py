@@ -0,0 +1,269 @@
+"""
+Chunk'lar için BM25 tabanlı sözcüksel (lexical) ters indeks.
+
+Yoğun vektör araması "2023 İstanbul hane halkı" gibi tablo adı, yıl ve bölge adı içeren
+birebir eşleşme sorgularını sık kaçırır. Bu indeks, vektör aramasıyla birlikte kullanılır
+ve iki sıralama karşılıklı sıra birleştirmesi (reciprocal rank fusion) ile birleştirilir.
+
+Türkçe'ye uygun belirteçleme:
+    - Büyük/küçük harf dönüşümü Türkçe kurallarıyla yapılır (I -> ı, İ -> i).
+    - Kesme işaretinden sonraki ekler ayrı belirteç olur ("İstanbul'da" -> istanbul, da).
+    - Sayılar (yıllar) olduğu gibi tutulur; diğer sözcükler ilk 5 harflerine kısaltılır.
+      Eklemeli bir dil olan Türkçe'de bu basit kök bulma yöntemi ("hanehalkının" ->
+      "haneh") çekim eklerinin büyük kısmını eşleştirir.
+
+Dizin yapısı (`tuik_lexical/`):
+    vocab.json   -> Sıralı terim listesi (i. terimin kayıtları offsets[i]:offsets[i + 1])
+    offsets.npy  -> int64, (V + 1)
+    docs.npy     -> int32, kayıtlardaki chunk satır numaraları
+    tf.npy       -> uint16, terimin chunk içindeki tekrar sayısı
+    doc_len.npy  -> int32, chunk başına belirteç sayısı
+    deleted.npy  -> uint8, indekste olmayan (silinmiş) chunk'ların işareti
+    meta.json    -> Chunk deposunun derleme kimliği, belge sayısı, ortalama uzunluk, BM25 parametreleri
+"""
+import json
+import os
+import re
+import shutil
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+LEXICAL_INDEX_DIR = 'tuik_lexical'
+STEM_LENGTH = 5
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def turkish_casefold(text: str) -> str:
+    return text.replace('I', 'ı').replace('İ', 'i').lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Metni Türkçe kurallarıyla küçük harfe çevirip kısaltılmış belirteçlere ayırır."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(turkish_casefold(text)):
+        if not token.isdigit():
+            token = token[:STEM_LENGTH]
+        tokens.append(token)
+    return tokens
+
+
+def _collect_postings(
+    texts: Iterable[Tuple[int, str]], doc_len: np.ndarray, deleted: np.ndarray
+) -> Tuple[Dict[str, Tuple[array, array]], int]:
+    """
+    Metinleri belirteçlere ayırıp terim başına (satır, tekrar) kayıtlarını toplar;
+    `doc_len`'i doldurur ve işlenen satırları `deleted`'da silinmemiş işaretler.
+    """
+    postings: Dict[str, Tuple[array, array]] = {}
+    indexed = 0
+    for row, text in texts:
+        tokens = tokenize(text)
+        doc_len[row] = len(tokens)
+        deleted[row] = 0
+        indexed += 1
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            entry = postings.get(token)
+            if entry is None:
+                entry = postings[token] = (array('i'), array('H'))
+            entry[0].append(row)
+            entry[1].append(min(tf, 65535))
+    return postings, indexed
+
+
+def _flatten_postings(postings: Dict[str, Tuple[array, array]]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """Terim sözlüğünü sıralı terim listesi, ofsetler, satırlar ve tekrar sayılarına dönüştürür."""
+    vocab = sorted(postings)
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    for i, term in enumerate(vocab):
+        offsets[i + 1] = offsets[i] + len(postings[term][0])
+    docs = np.empty(int(offsets[-1]), dtype=np.int32)
+    tfs = np.empty(int(offsets[-1]), dtype=np.uint16)
+    for i, term in enumerate(vocab):
+        term_docs, term_tfs = postings.pop(term)
+        docs[offsets[i]:offsets[i + 1]] = np.frombuffer(term_docs, dtype=np.int32)
+        tfs[offsets[i]:offsets[i + 1]] = np.frombuffer(term_tfs, dtype=np.uint16)
+    return vocab, offsets, docs, tfs
+
+
+def _save_index(path, vocab, offsets, docs, tfs, doc_len, deleted, meta):
+    """İndeks dosyalarını geçici dizine yazıp dizini hedef konuma taşır."""
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, 'offsets.npy'), offsets)
+    np.save(os.path.join(tmp_path, 'docs.npy'), docs)
+    np.save(os.path.join(tmp_path, 'tf.npy'), tfs)
+    np.save(os.path.join(tmp_path, 'doc_len.npy'), doc_len)
+    np.save(os.path.join(tmp_path, 'deleted.npy'), deleted)
+    with open(os.path.join(tmp_path, 'vocab.json'), 'w', encoding='utf-8') as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmp_path, path)
+
+
+def build_lexical_index(
+    texts: Iterable[Tuple[int, str]],
+    count: int,
+    path: str = LEXICAL_INDEX_DIR,
+    k1: float = 1.2,
+    b: float = 0.75,
+    build_id: Optional[str] = None,
+) -> int:
+    """
+    (satır numarası, metin) ikililerinden ters indeksi oluşturup diske yazar.
+    Verilmeyen satırlar (örn. silinmiş chunk'lar) silinmiş sayılır ve hiçbir terimle
+    eşleşmez. `build_id`, metinlerin alındığı chunk deposunun derleme kimliğidir.
+
+    Returns:
+        İndekslenen chunk sayısı.
+    """
+    doc_len = np.zeros(count, dtype=np.int32)
+    deleted = np.ones(count, dtype=np.uint8)
+    postings, indexed = _collect_postings(texts, doc_len, deleted)
+    vocab, offsets, docs, tfs = _flatten_postings(postings)
+    meta = {'build_id': build_id, 'count': count, 'indexed': indexed, 'avgdl': float(doc_len.sum()) / max(1, indexed), 'k1': k1, 'b': b}
+    _save_index(path, vocab, offsets, docs, tfs, doc_len, deleted, meta)
+    return indexed
+
+
+def build_from_store(store, path: str = LEXICAL_INDEX_DIR) -> int:
+    """Chunk deposundaki silinmemiş tüm chunk'lardan indeksi oluşturur."""
+    deleted = np.asarray(store.deleted[:store.count])
+    texts = ((i, store.text(i)) for i in range(store.count) if not deleted[i])
+    return build_lexical_index(texts, store.count, path, build_id=store.build_id)
+
+
+def append_from_store(store, removed_rows: np.ndarray, start_row: int, path: str = LEXICAL_INDEX_DIR) -> int:
+    """
+    Mevcut indeksi, `append_chunks` ile güncellenen depoya göre günceller: silinen satırların
+    kayıtları çıkarılır, yalnızca `start_row`'dan sonraki yeni chunk'lar belirteçlere ayrılır.
+    Kayıt dizileri yeniden yazılsa da metin işleme maliyeti değişiklik miktarıyla orantılıdır.
+
+    Returns:
+        İndeksteki (silinmemiş) chunk sayısı.
+    """
+    old = LexicalIndex(path)
+    old_count = int(old.meta['count'])
+    if start_row != old_count:
+        raise ValueError(f"Lexical index covers {old_count} rows but new chunks start at row {start_row}")
+    doc_len = np.zeros(store.count, dtype=np.int32)
+    doc_len[:old_count] = old.doc_len[:old_count]
+    deleted = np.zeros(store.count, dtype=np.uint8)
+    deleted[:old_count] = old.deleted[:old_count]
+    removed_rows = np.asarray(removed_rows, dtype=np.int64)
+    removed_rows = removed_rows[deleted[removed_rows] == 0]
+    deleted[removed_rows] = 1
+    doc_len[removed_rows] = 0
+
+    store_deleted = np.asarray(store.deleted[:store.count])
+    deleted[start_row:] = 1
+    texts = ((i, store.text(i)) for i in range(start_row, store.count) if not store_deleted[i])
+    postings, added = _collect_postings(texts, doc_len, deleted)
+    new_vocab, new_offsets, new_docs, new_tfs = _flatten_postings(postings)
+
+    # Eski ve yeni kayıtları terim numarasına göre kararlı sıralayarak birleştir; yeni
+    # satırlar eskilerden büyük olduğundan her terimin kayıtları sıralı kalır
+    vocab = sorted(set(old.terms) | set(new_vocab))
+    position = {term: i for i, term in enumerate(vocab)}
+    old_map = np.empty(len(old.terms), dtype=np.int64)
+    for term, i in old.terms.items():
+        old_map[i] = position[term]
+    new_map = np.array([position[term] for term in new_vocab], dtype=np.int64)
+    old_docs = np.asarray(old.docs)
+    keep = deleted[old_docs] == 0
+    term_ids = np.concatenate([
+        np.repeat(old_map, np.diff(np.asarray(old.offsets)))[keep],
+        np.repeat(new_map, np.diff(new_offsets)),
+    ])
+    order = np.argsort(term_ids, kind='stable')
+    docs = np.concatenate([old_docs[keep], new_docs])[order]
+    tfs = np.concatenate([np.asarray(old.tfs)[keep], new_tfs])[order]
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=offsets[1:])
+
+    indexed = old.count - len(removed_rows) + added
+    meta = dict(old.meta, build_id=store.build_id, count=store.count, indexed=indexed, avgdl=float(doc_len.sum()) / max(1, indexed))
+    del old
+    _save_index(path, vocab, offsets, docs, tfs, doc_len, deleted, meta)
+    return indexed
+
+
+class LexicalIndex:
+    """Bellek eşlemeli BM25 ters indeksi."""
+
+    def __init__(self, path: str = LEXICAL_INDEX_DIR):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, 'vocab.json'), 'r', encoding='utf-8') as f:
+            self.terms = {term: i for i, term in enumerate(json.load(f))}
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        self.docs = np.load(os.path.join(path, 'docs.npy'), mmap_mode='r')
+        self.tfs = np.load(os.path.join(path, 'tf.npy'), mmap_mode='r')
+        self.doc_len = np.load(os.path.join(path, 'doc_len.npy'), mmap_mode='r')
+        deleted_path = os.path.join(path, 'deleted.npy')
+        self.deleted = np.load(deleted_path, mmap_mode='r') if os.path.exists(deleted_path) else np.zeros(self.meta['count'], dtype=np.uint8)
+        self.count = int(self.meta['indexed'])
+
+    def __len__(self):
+        return self.count
+
+    def search(self, query: str, top_k: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sorguya en yüksek BM25 skorlu `top_k` chunk'ı döndürür.
+
+        Args:
+            query: Kullanıcı sorusu.
+            top_k: Döndürülecek en fazla sonuç sayısı.
+            allowed: Verilirse yalnızca bu satır numaraları arasında arar.
+
+        Returns:
+            (skorlar, satır numaraları) ikilisi, skora göre azalan sırada.
+        """
+        k1, b, avgdl = self.meta['k1'], self.meta['b'], self.meta['avgdl']
+        doc_parts, score_parts = [], []
+        for token in set(tokenize(query)):
+            term = self.terms.get(token)
+            if term is None:
+                continue
+            start, end = int(self.offsets[term]), int(self.offsets[term + 1])
+            docs = np.asarray(self.docs[start:end])
+            tf = np.asarray(self.tfs[start:end], dtype=np.float32)
+            idf = np.log(1.0 + (self.count - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = k1 * (1.0 - b + b * np.asarray(self.doc_len[docs], dtype=np.float32) / avgdl)
+            doc_parts.append(docs)
+            score_parts.append(idf * tf * (k1 + 1.0) / (tf + norm))
+        if not doc_parts:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+        # Silinmiş chunk'lar hiçbir zaman döndürülmez
+        keep = np.asarray(self.deleted[docs]) == 0
+        if allowed is not None:
+            keep &= np.isin(docs, allowed)
+        docs, scores = docs[keep], scores[keep]
+        if len(docs) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+            docs, scores = docs[best], scores[best]
+        order = np.argsort(-scores, kind='stable')
+        return scores[order], docs[order].astype(np.int64)
+
+
+def reciprocal_rank_fusion(rankings: List[Iterable[int]], top_k: int, k: int = 60) -> List[int]:
+    """Birden fazla sıralamayı, her sonucun sıralardaki 1 / (k + sıra) toplamıyla birleştirir."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            if doc < 0:
+                continue
+            scores[int(doc)] = scores.get(int(doc), 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda doc: -scores[doc])[:top_k]
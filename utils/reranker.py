@@ -0,0 +1,84 @@
+"""
+Vektör/BM25 adaylarını soru-chunk çiftleri üzerinden yeniden sıralayan cross-encoder aşaması.
+
+Cross-encoder soruyu ve chunk'ı birlikte okuduğundan, ayrı ayrı kodlanmış vektörlerin
+benzerliğinden daha isabetli bir sıralama verir; ancak her çift için modelin çalıştırılması
+gerekir. Bu yüzden:
+    - Yalnızca ilk aşamanın getirdiği sınırlı sayıda aday (örn. 50) puanlanır,
+    - Çiftler gruplar halinde puanlanır ve her gruptan sonra istek başına süre bütçesi
+      kontrol edilir; bütçe aşılırsa ilk aşamanın (vektör/RRF) sıralaması kullanılır.
+
+Modelin ilk `top_k` sonucu daha az ama daha ilgili chunk'tan oluşan bir bağlam üretir;
+bu da LLM'e giden prompt'u kısaltır.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sentence_transformers import CrossEncoder
+
+DEFAULT_RERANK_MODEL = 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1'
+
+
+class Reranker:
+    """Süre bütçeli, gruplar halinde puanlayan cross-encoder yeniden sıralayıcı."""
+
+    def __init__(self, model_name: str = DEFAULT_RERANK_MODEL, candidates: int = 50, batch_size: int = 16, budget_ms: float = 300.0, model=None):
+        """
+        Args:
+            model_name: sentence-transformers CrossEncoder model adı.
+            candidates: İlk aşamadan alınıp puanlanacak aday sayısı.
+            batch_size: Tek seferde puanlanan soru-chunk çifti sayısı.
+            budget_ms: İstek başına yeniden sıralama süresi; aşılırsa ilk aşama sıralaması kullanılır.
+            model: Önceden yüklenmiş bir model (verilmezse `model_name` yüklenir).
+        """
+        self.model = model if model is not None else CrossEncoder(model_name)
+        self.model_name = model_name
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.stats = {'requests': 0, 'pairs_scored': 0, 'timeouts': 0, 'total_ms': 0.0}
+        self._lock = threading.Lock()
+
+    def rerank(
+        self, question: str, chunks: List[Dict[str, Any]], top_k: int, deadline: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Chunk'ları soruyla ilgilerine göre yeniden sıralayıp ilk `top_k` tanesini döndürür.
+
+        Args:
+            deadline: `time.perf_counter()` cinsinden son an; verilmezse `budget_ms` kullanılır.
+                Bir isteğin birden fazla sorusu aynı bütçeyi paylaşabilsin diye dışarıdan verilebilir.
+
+        Returns:
+            (chunk'lar, yeniden sıralandı mı) ikilisi. Bütçe aşıldıysa ikinci değer False'tur ve
+            ilk aşamanın sıralaması döner; böyle sonuçlar önbelleğe alınmamalıdır.
+        """
+        started = time.perf_counter()
+        if deadline is None:
+            deadline = started + self.budget_ms / 1000.0
+        scores, timed_out = [], False
+        for start in range(0, len(chunks), self.batch_size):
+            if time.perf_counter() > deadline:
+                timed_out = True
+                break
+            pairs = [(question, chunk['text']) for chunk in chunks[start:start + self.batch_size]]
+            scores.extend(np.asarray(self.model.predict(pairs, batch_size=len(pairs)), dtype=np.float32).ravel().tolist())
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['pairs_scored'] += len(scores)
+            self.stats['total_ms'] += elapsed_ms
+            self.stats['timeouts'] += int(timed_out)
+        if timed_out:
+            # Bütçe aşıldı: kısmi puanlar güvenilmez, ilk aşamanın sıralaması korunur
+            return chunks[:top_k], False
+        order = np.argsort(-np.asarray(scores), kind='stable')
+        return [chunks[i] for i in order[:top_k]], True
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['avg_ms'] = stats['total_ms'] / stats['requests'] if stats['requests'] else 0.0
+        return dict(stats, model=self.model_name, candidates=self.candidates, budget_ms=self.budget_ms)
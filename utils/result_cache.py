@@ -0,0 +1,164 @@
+"""
+Tekrarlanan ve neredeyse aynı sorular için iki katmanlı arama sonucu önbelleği.
+
+    1. Birebir katman: Normalize edilmiş soru + arama ayarları anahtarlı LRU. İsabette soru
+       kodlanmaz ve arama yapılmaz.
+    2. Anlamsal katman: Soru vektörü, aynı arama ayarlarıyla önbelleğe alınmış bir sorunun
+       vektörüne kosinüs benzerliği eşiğinin üzerinde yakınsa o sonuç kullanılır. İsabette
+       yalnızca kodlama yapılır, FAISS/BM25 araması atlanır.
+
+Önbellekte hazır prompt paketi değil, bulunan chunk'lar tutulur; paket her seferinde
+gelen soruyla yeniden oluşturulur. Her iki katmanın da boyut (LRU) ve yaşam süresi (TTL)
+sınırı vardır. Kayıtlar bir RAG nesline aittir: nesil değiştiğinde önbellek boşaltılır.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from utils.lexical_index import turkish_casefold
+
+
+def normalize_question(question: str) -> str:
+    """Büyük/küçük harf, fazla boşluk ve sondaki noktalama farklarını yok sayar."""
+    return " ".join(turkish_casefold(question).split()).rstrip(" ?.!")
+
+
+class ResultCache:
+    """Birebir (LRU) ve anlamsal (kosinüs benzerliği) katmanlı sonuç önbelleği."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, semantic_threshold: float = 0.97):
+        """
+        Args:
+            max_entries: Her katmanda tutulacak en fazla kayıt sayısı (0: önbellek kapalı).
+            ttl: Kaydın geçerli kalacağı süre, saniye (0: süresiz).
+            semantic_threshold: Anlamsal isabet için gereken en düşük kosinüs benzerliği (0: katman kapalı).
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        self.generation = None
+        self.stats = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        self._exact: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # Anlamsal katman: sabit kapasiteli vektör matrisi ve yuvalar; LRU sırası yuva numaralarıyla tutulur
+        self._vectors: Optional[np.ndarray] = None
+        self._slot_params: List[Optional[Hashable]] = [None] * max_entries
+        self._slot_chunks: List[Optional[list]] = [None] * max_entries
+        self._slot_times = np.zeros(max_entries, dtype=np.float64)
+        self._slot_lru: "OrderedDict[int, None]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - stored_at > self.ttl
+
+    def _clear_locked(self):
+        self._exact.clear()
+        self._slot_lru.clear()
+        self._slot_params = [None] * self.max_entries
+        self._slot_chunks = [None] * self.max_entries
+
+    def clear(self):
+        with self._lock:
+            self._clear_locked()
+
+    def sync(self, generation: int):
+        """Önbelleği verilen RAG nesline bağlar; nesil değiştiyse tüm kayıtları siler."""
+        with self._lock:
+            if generation != self.generation:
+                self._clear_locked()
+                self.generation = generation
+
+    def get_exact(self, question: str, params: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """Aynı soru aynı ayarlarla daha önce arandıysa bulunan chunk'ları döndürür."""
+        if not self.enabled:
+            return None
+        key = (normalize_question(question), params)
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is None:
+                return None
+            stored_at, chunks = entry
+            if self._expired(stored_at, time.time()):
+                del self._exact[key]
+                return None
+            self._exact.move_to_end(key)
+            self.stats['exact_hits'] += 1
+            return chunks
+
+    def get_semantic(self, embedding: np.ndarray, params: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """Aynı ayarlarla aranmış, vektörü eşiğin üzerinde benzer bir sorunun chunk'larını döndürür."""
+        if not self.enabled:
+            return None
+        if not self.semantic_threshold:
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+        query = self._unit(embedding)
+        with self._lock:
+            if self._vectors is None or not self._slot_lru:
+                self.stats['misses'] += 1
+                return None
+            now = time.time()
+            slots = [slot for slot in self._slot_lru if self._slot_params[slot] == params]
+            expired = [slot for slot in slots if self._expired(self._slot_times[slot], now)]
+            for slot in expired:
+                self._free_slot(slot)
+            slots = [slot for slot in slots if slot not in expired]
+            if slots:
+                scores = self._vectors[slots] @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.semantic_threshold:
+                    slot = slots[best]
+                    self._slot_lru.move_to_end(slot)
+                    self.stats['semantic_hits'] += 1
+                    return self._slot_chunks[slot]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, question: str, embedding: np.ndarray, params: Hashable, chunks: List[Dict[str, Any]]):
+        """Bir aramanın sonucunu her iki katmana ekler; dolu katmanlarda en eski kullanılan kayıt atılır."""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            key = (normalize_question(question), params)
+            self._exact[key] = (now, chunks)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+
+            if not self.semantic_threshold:
+                return
+            vector = self._unit(embedding)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            if len(self._slot_lru) < self.max_entries:
+                slot = next(i for i in range(self.max_entries) if self._slot_chunks[i] is None)
+            else:
+                slot, _ = self._slot_lru.popitem(last=False)
+            self._vectors[slot] = vector
+            self._slot_params[slot] = params
+            self._slot_chunks[slot] = chunks
+            self._slot_times[slot] = now
+            self._slot_lru[slot] = None
+
+    def _free_slot(self, slot: int):
+        self._slot_lru.pop(slot, None)
+        self._slot_params[slot] = None
+        self._slot_chunks[slot] = None
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, generation=self.generation, exact_entries=len(self._exact), semantic_entries=len(self._slot_lru))
@@ -0,0 +1,151 @@
+"""
+Sunucu bileşenlerini (embedding modeli, RAG veritabanı, yeniden sıralama modeli) arka plan
+iş parçacıklarında paralel yükleyen ve hazır olma durumunu raporlayan yardımcı.
+
+Sunucu önce argümanları işler ve taşıma katmanını (SSE portu / stdio) açar; bileşenler bu
+sırada eşzamanlı yüklenir. Böylece açılış süresi yüklemelerin toplamı değil en yavaşının
+süresi kadar olur. İstekler hazır olana kadar bekletilir; bir bileşen yüklenemezse
+beklemeden hata döndürülür. Durum bir sağlık aracıyla (ve SSE'de `/health` ile) dışarıya açılır.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class StagedLoader:
+    """Adlandırılmış yükleme fonksiyonlarını ayrı iş parçacıklarında çalıştırıp sonuçlarını tutar."""
+
+    def __init__(self, loaders: Dict[str, Callable[[], Any]], logger=None):
+        self.loaders = loaders
+        self.logger = logger
+        self.started_at: Optional[float] = None
+        self._results: Dict[str, Any] = {}
+        self._components: Dict[str, Dict[str, Any]] = {name: {'state': 'pending'} for name in loaders}
+        self._lock = threading.Lock()
+        self._settled = threading.Event()
+        # `wait_ready` ile bekleyen olay döngüleri; yüklemeler bitince iş parçacığından uyandırılır
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._remaining = len(loaders)
+
+    def _log(self, level: str, message: str):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def start(self):
+        """Tüm yüklemeleri arka planda başlatır (beklemez)."""
+        self.started_at = time.time()
+        if not self.loaders:
+            with self._lock:
+                self._settle()
+        for name, loader in self.loaders.items():
+            threading.Thread(target=self._run, args=(name, loader), name=f"load-{name}", daemon=True).start()
+
+    def _run(self, name: str, loader: Callable[[], Any]):
+        started = time.perf_counter()
+        with self._lock:
+            self._components[name] = {'state': 'loading'}
+        self._log('info', f"Loading {name}...")
+        try:
+            result = loader()
+            component = {'state': 'ready'}
+            self._log('info', f"{name} loaded in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            result, component = None, {'state': 'failed', 'error': str(e)}
+            self._log('error', f"Failed to load {name}: {e}")
+        component['seconds'] = round(time.perf_counter() - started, 3)
+        with self._lock:
+            self._results[name] = result
+            self._components[name] = component
+            self._remaining -= 1
+            # Bir bileşen başarısız olduysa diğerleri beklenmeden hata döndürülebilir
+            if self._remaining == 0 or component['state'] == 'failed':
+                self._settle()
+
+    def _settle(self):
+        # Kilit tutulurken çağrılır
+        self._settled.set()
+        for loop, future in self._waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+        self._waiters.clear()
+
+    def mark_ready(self, name: str, result: Any):
+        """
+        Başlangıçta yüklenemeyen bir bileşen sonradan (örn. veritabanı oluşturulup yeniden
+        yüklendiğinde) kullanılabilir hale geldiyse hazır işaretler. Diğer durumlarda bir şey yapmaz.
+        """
+        with self._lock:
+            component = self._components.get(name)
+            if component is None or component['state'] != 'failed':
+                return
+            self._results[name] = result
+            self._components[name] = {'state': 'ready', 'seconds': component.get('seconds'), 'recovered': True}
+            # Başka bileşenler hâlâ yükleniyorsa istekler yeniden onları bekler
+            if self._remaining and not any(c['state'] == 'failed' for c in self._components.values()):
+                self._settled.clear()
+        self._log('info', f"{name} recovered and is ready")
+
+    def mark_failed(self, name: str, error: str):
+        """Yüklendikten sonra kullanılamaz hale gelen bir bileşeni (örn. çöken çalışan süreçler) başarısız işaretler."""
+        with self._lock:
+            self._results[name] = None
+            self._components[name] = dict(self._components.get(name, {}), state='failed', error=error)
+            self._settle()
+        self._log('error', f"{name} failed: {error}")
+
+    def get(self, name: str) -> Any:
+        """Yüklenen bileşeni döndürür; henüz yüklenmediyse veya yüklenemediyse None."""
+        with self._lock:
+            return self._results.get(name)
+
+    @property
+    def state(self) -> str:
+        """'starting', 'ready' veya 'failed'."""
+        with self._lock:
+            states = [component['state'] for component in self._components.values()]
+        if 'failed' in states:
+            return 'failed'
+        return 'ready' if all(state == 'ready' for state in states) else 'starting'
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: dict(component) for name, component in self._components.items()}
+        return {
+            'state': self.state,
+            'uptime_seconds': round(time.time() - self.started_at, 3) if self.started_at else 0.0,
+            'components': components,
+        }
+
+    def wait(self, timeout: Optional[float] = None) -> str:
+        """`wait_ready`'nin bloklayan hali (olay döngüsü olmayan süreçler için)."""
+        self._settled.wait(timeout)
+        return self.state
+
+    async def wait_ready(self, timeout: float) -> str:
+        """
+        Tüm bileşenler yüklenene veya biri başarısız olana kadar en fazla `timeout` saniye
+        bekler ve son durumu döndürür. Olay döngüsünü bloklamaz.
+        """
+        state = self.state
+        if state != 'starting' or timeout <= 0:
+            return state
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._settled.is_set():
+                return self.state
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+        return self.state
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
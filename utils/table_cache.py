@@ -0,0 +1,81 @@
+"""
+Excel dosyalarından okunup sadeleştirilmiş tabloların disk önbelleği.
+
+`pd.read_excel` (openpyxl/xlrd) derlemenin en çok işlemci harcayan adımıdır. Okunan her
+tablo, boş satır/sütunları atıldıktan sonra dosya yolu, değişiklik zamanı ve boyutundan
+türetilen bir anahtarla saklanır. Yeniden çalıştırmalarda, `--reprocess-failed`
+geçişlerinde ve farklı chunk'lama ayarlarıyla yapılan denemelerde değişmemiş dosyalar
+tekrar ayrıştırılmaz; kaynak dosya değiştiğinde anahtar da değiştiği için eski kayıt
+kendiliğinden geçersiz olur. Kayıt adları dosya yolunun özetiyle başladığından, bir dosyanın
+yeni tablosu yazılınca aynı dosyanın eski kayıtları silinir ve önbellek büyümeye devam etmez.
+
+Tablolar `DataFrame.to_pickle` ile saklanır: TÜİK tablolarında aynı sütunda metin ve
+sayı birlikte bulunduğundan, hücre türlerini olduğu gibi koruyan bu format tercih edilmiştir.
+"""
+import glob
+import hashlib
+import os
+from typing import Optional
+
+import pandas as pd
+
+TABLE_CACHE_DIR = 'table_cache'
+
+
+def read_table(file_path: str) -> pd.DataFrame:
+    """Excel dosyasını başlıksız okur ve tamamen boş satır/sütunları atar."""
+    df = pd.read_excel(file_path, header=None, engine='openpyxl' if file_path.endswith('.xlsx') else 'xlrd')
+    df.dropna(how='all', inplace=True); df.dropna(how='all', axis=1, inplace=True)
+    return df
+
+
+class TableCache:
+    """Dosya yolu + mtime + boyut anahtarlı, sadeleştirilmiş tablo önbelleği."""
+
+    def __init__(self, path: str = TABLE_CACHE_DIR):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    def _path_prefix(self, file_path: str) -> str:
+        return os.path.join(self.path, hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest())
+
+    def _entry_path(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        return f"{self._path_prefix(file_path)}-{stat.st_mtime_ns}-{stat.st_size}.pkl"
+
+    def __contains__(self, file_path: str) -> bool:
+        return os.path.exists(self._entry_path(file_path))
+
+    def get(self, file_path: str) -> Optional[pd.DataFrame]:
+        entry = self._entry_path(file_path)
+        if not os.path.exists(entry):
+            return None
+        try:
+            return pd.read_pickle(entry)
+        except Exception:
+            # Bozuk kayıt: yeniden ayrıştırılsın
+            return None
+
+    def put(self, file_path: str, df: pd.DataFrame):
+        """Tabloyu yazar ve aynı dosyanın eski (değişiklik zamanı / boyutu tutmayan) kayıtlarını siler."""
+        entry = self._entry_path(file_path)
+        df.to_pickle(f"{entry}.tmp", compression=None)
+        os.replace(f"{entry}.tmp", entry)
+        for stale in glob.glob(f"{glob.escape(self._path_prefix(file_path))}-*.pkl"):
+            if stale != entry:
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+    def load(self, file_path: str) -> pd.DataFrame:
+        """Tabloyu önbellekten döndürür; yoksa Excel dosyasını ayrıştırıp önbelleğe ekler."""
+        df = self.get(file_path)
+        if df is None:
+            df = read_table(file_path)
+            self.put(file_path, df)
+        return df
+
+    def parse(self, file_path: str) -> int:
+        """Dosyayı ayrıştırıp önbelleğe yazar (işlem havuzunda çalıştırılır); satır sayısını döndürür."""
+        return len(self.load(file_path))
@@ -0,0 +1,234 @@
+"""
+Düzenli TÜİK tablolarını LLM kullanmadan chunk'lara dönüştüren yapısal ayrıştırıcı.
+
+TÜİK tablolarının çoğu "başlık satırları x satır etiketleri" şeklinde düz bir ızgaradır:
+    - Üstte tek hücreli başlık / birim satırları,
+    - Ardından sütun başlıkları (çoğunlukla yıllar, birleştirilmiş hücreler),
+    - Solda (iki dilli tablolarda sağda da) satır etiketleri, ortada sayısal değerler,
+    - Gövde içinde değer içermeyen ara başlık satırları ("Erkek", "Kadın" gibi),
+    - Altta kaynak / dipnot satırları.
+
+`analyze_table` bu yapıyı DataFrame üzerinden tespit eder ve tablonun ne kadar düzenli
+olduğunu 0-1 arası bir skorla verir. Skoru eşiğin üzerindeki tablolar için
+`structural_chunks`, her değer hücresi için başlık, birim, ara başlık, satır ve sütun
+etiketlerini içeren tek bir cümle üretir. Düzensiz tablolar Gemini'ye gönderilir.
+"""
+import re
+from collections import namedtuple
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+# TÜİK tablolarında boş değer yerine kullanılan işaretler
+MISSING_MARKERS = {'', '-', '–', '—', '..', '...', 'x', 'X', ':'}
+FOOTER_PREFIXES = ('kaynak', 'source', 'not', 'note', 'açıklama', 'explanation', '*', '(')
+UNIT_PATTERN = re.compile(r'(birim|unit)\s*[:：]|^\(.*\)$|\[.*\]$', re.IGNORECASE)
+DEFAULT_REGULARITY_THRESHOLD = 0.9
+MAX_HEADER_ROWS = 4
+
+TableLayout = namedtuple(
+    "TableLayout",
+    ["score", "title", "unit", "column_labels", "label_columns", "data_rows", "section_of_row"],
+)
+
+
+def _clean(value: Any) -> Optional[str]:
+    """Hücre değerini boşlukları sadeleştirilmiş metne çevirir; boş hücreler için None döndürür."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    text = " ".join(str(value).split())
+    return None if text in MISSING_MARKERS else text
+
+
+def _number(value: Any) -> Optional[float]:
+    """Hücre sayısal bir değer içeriyorsa float olarak döndürür."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return None if pd.isna(value) else float(value)
+    text = _clean(value)
+    if text is None:
+        return None
+    text = text.replace(' ', '')
+    # Türkçe biçim: 1.234.567,8
+    if re.fullmatch(r'-?\d{1,3}(\.\d{3})+(,\d+)?', text) or re.fullmatch(r'-?\d+,\d+', text):
+        text = text.replace('.', '').replace(',', '.')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return f"{value:.6f}".rstrip('0').rstrip('.')
+
+
+def _label(value: Any) -> Optional[str]:
+    """Başlık hücresini etikete çevirir (2020.0 -> '2020')."""
+    number = _number(value) if not isinstance(value, str) else None
+    if number is not None:
+        return format_value(number)
+    return _clean(value)
+
+
+def _is_year(number: float) -> bool:
+    return number.is_integer() and 1900 <= number <= 2100
+
+
+def _is_year_row(numbers: List[float]) -> bool:
+    return len(numbers) >= 2 and all(_is_year(n) for n in numbers) and numbers == sorted(numbers)
+
+
+def _is_year_column(numbers: List[float]) -> bool:
+    """Sütundaki sayılar farklı ve sıralı (artan / azalan) yıllarsa True: satır etiketi sütunudur."""
+    return (
+        len(numbers) >= 2 and all(_is_year(n) for n in numbers) and len(set(numbers)) == len(numbers)
+        and numbers in (sorted(numbers), sorted(numbers, reverse=True))
+    )
+
+
+def analyze_table(df: pd.DataFrame) -> Optional[TableLayout]:
+    """
+    Tablonun başlık, etiket ve değer bölgelerini tespit eder.
+
+    Args:
+        df: `pd.read_excel(..., header=None)` ile okunmuş, boş satır/sütunları atılmış tablo.
+
+    Returns:
+        Tablonun yapısı ve düzenlilik skoru; yapı hiç tespit edilemezse None.
+    """
+    if df.empty:
+        return None
+    values = df.to_numpy(dtype=object)
+    n_rows, n_cols = values.shape
+    numbers = [[_number(values[r][c]) for c in range(n_cols)] for r in range(n_rows)]
+    texts = [[_clean(values[r][c]) for c in range(n_cols)] for r in range(n_rows)]
+
+    # Sütunlar: sayısal hücreleri çoğunlukta olanlar değer, diğerleri etiket sütunudur
+    value_columns, label_columns = [], []
+    for c in range(n_cols):
+        filled = [r for r in range(n_rows) if texts[r][c] is not None or numbers[r][c] is not None]
+        numeric = sum(1 for r in filled if numbers[r][c] is not None)
+        if filled and numeric / len(filled) >= 0.6:
+            value_columns.append(c)
+        elif filled:
+            label_columns.append(c)
+    # Satırları yıllar olan tablolarda (Yıl | Erkek | Kadın) soldaki yıl sütunu sayısal olsa da
+    # değer değil satır etiketidir; en az bir değer sütunu kalmak koşuluyla etiket sayılır
+    while len(value_columns) > 1 and _is_year_column([numbers[r][value_columns[0]] for r in range(n_rows) if numbers[r][value_columns[0]] is not None]):
+        label_columns.append(value_columns.pop(0))
+    label_columns.sort()
+    if not value_columns or not label_columns:
+        return None
+
+    # İlk veri satırı: etiketi olan ve yıl başlığı olmayan sayısal değerler içeren satır
+    first_data_row = None
+    for r in range(n_rows):
+        row_numbers = [numbers[r][c] for c in value_columns if numbers[r][c] is not None]
+        has_label = any(texts[r][c] is not None for c in label_columns)
+        if row_numbers and has_label and not _is_year_row(row_numbers):
+            first_data_row = r
+            break
+    if first_data_row is None:
+        return None
+
+    # Veri öncesi satırlar: değer sütunlarına taşmayan tek hücreli satırlar başlık/birim,
+    # değer sütunlarında etiket taşıyanlar sütun başlığı, yalnızca satır etiketi olanlar ara başlıktır
+    title_parts, unit, header_rows, section = [], None, [], None
+    for r in range(first_data_row):
+        filled = [c for c in range(n_cols) if texts[r][c] is not None]
+        in_values = [c for c in filled if c in value_columns]
+        if len(filled) == 1 and not in_values and not header_rows:
+            if UNIT_PATTERN.search(texts[r][filled[0]]):
+                unit = texts[r][filled[0]]
+            else:
+                title_parts.append(texts[r][filled[0]])
+        elif in_values:
+            header_rows.append(r)
+        elif filled:
+            section = " - ".join(dict.fromkeys(texts[r][c] for c in filled))
+    if not header_rows or len(header_rows) > MAX_HEADER_ROWS:
+        return None
+
+    # Birleştirilmiş başlık hücreleri yalnızca ilk sütunda değer taşır: yatayda ileri doldur
+    column_labels: Dict[int, str] = {}
+    filled_headers = []
+    for r in header_rows:
+        row, last = [], None
+        for c in range(n_cols):
+            label = _label(values[r][c])
+            if label is not None:
+                last = label
+            row.append(label if label is not None else (last if c in value_columns else None))
+        filled_headers.append(row)
+    for c in value_columns:
+        parts = []
+        for row in filled_headers:
+            if row[c] and row[c] not in parts:
+                parts.append(row[c])
+        if parts:
+            column_labels[c] = " / ".join(parts)
+
+    # Gövde: değer içeren satırlar veri, içermeyenler ara başlık; sondaki değersiz satırlar dipnottur
+    body = list(range(first_data_row, n_rows))
+    while body and not any(numbers[body[-1]][c] is not None for c in value_columns):
+        body.pop()
+    data_rows, section_of_row = [], {}
+    numeric_cells = text_cells = 0
+    for r in body:
+        row_numbers = [c for c in value_columns if numbers[r][c] is not None]
+        row_texts = [c for c in value_columns if numbers[r][c] is None and texts[r][c] is not None]
+        numeric_cells += len(row_numbers)
+        text_cells += len(row_texts)
+        if row_numbers:
+            data_rows.append(r)
+            section_of_row[r] = section
+        else:
+            label = " - ".join(dict.fromkeys(texts[r][c] for c in range(n_cols) if texts[r][c] is not None))
+            if label and not label.lower().startswith(FOOTER_PREFIXES):
+                section = label
+
+    if not data_rows:
+        return None
+    numeric_share = numeric_cells / max(1, numeric_cells + text_cells)
+    labelled_share = len(column_labels) / len(value_columns)
+    score = numeric_share * labelled_share
+    return TableLayout(score, " ".join(title_parts), unit, column_labels, label_columns, data_rows, section_of_row)
+
+
+def structural_chunks(df: pd.DataFrame, file_name: str, layout: Optional[TableLayout] = None) -> List[Dict[str, Any]]:
+    """
+    Düzenli bir tablodaki her değer hücresini bağlamı tam bir cümleye dönüştürür.
+    Chunk yapısı LLM ile üretilenlerle aynıdır; yalnızca türü 'table_cell' olur.
+    """
+    layout = layout or analyze_table(df)
+    if layout is None:
+        return []
+    values = df.to_numpy(dtype=object)
+    title = layout.title or file_name
+    unit = f" ({layout.unit.strip('()[] ')})" if layout.unit else ""
+    chunks = []
+    previous_labels: Dict[int, str] = {}
+    for r in layout.data_rows:
+        labels = []
+        for c in layout.label_columns:
+            label = _label(values[r][c])
+            # Birleştirilmiş satır etiketleri: ilk etiket sütunu boşsa bir önceki satırınki geçerlidir
+            if label is None and c == layout.label_columns[0] and previous_labels.get(c):
+                label = previous_labels[c]
+            if label is not None:
+                previous_labels[c] = label
+                if label not in labels:
+                    labels.append(label)
+        row_label = " - ".join(labels)
+        section = layout.section_of_row.get(r)
+        context = f"{section}, {row_label}" if section else row_label
+        for c, column_label in layout.column_labels.items():
+            number = _number(values[r][c])
+            if number is None:
+                continue
+            text = f"{title}{unit}: {context} için {column_label} değeri {format_value(number)}."
+            chunks.append({'text': text, 'metadata': {'source': file_name, 'type': 'table_cell'}})
+    return chunks
@@ -0,0 +1,186 @@
+"""
+Sorguları önce ilgili tablolara yönlendiren, tablo başına tek vektörlü küçük indeks.
+
+Her TÜİK tablosundan binlerce veri noktası chunk'ı üretilir. Yönlendirme açıkken sunucu
+sorguyu önce bu indekste arar, en yakın N tabloyu seçer ve chunk aramasını yalnızca bu
+tabloların chunk'larıyla sınırlar (kabadan inceye arama). Tablo sayısı chunk sayısından
+kat kat az olduğundan ilk adımın maliyeti derlem büyüdükçe neredeyse sabit kalır; sonuçlar
+da birkaç tutarlı tablodan gelir.
+
+Bir tablonun vektörü; dosya adından türetilen başlığı, kategorisi ve ilk birkaç chunk'ının
+metninden oluşan açıklamanın embedding'idir.
+
+Dizin yapısı (`tuik_tables/`):
+    vectors.npy  -> float32, (tablo sayısı, boyut)
+    tables.json  -> Her satır için {"source": dosya adı, "category": kategori}
+    meta.json    -> Chunk deposunun derleme kimliği ve satır sayısı, tablo sayısı, vektör boyutu
+"""
+import json
+import os
+import shutil
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from utils.faiss_index import filtered_search
+
+TABLE_ROUTER_DIR = 'tuik_tables'
+SAMPLE_CHUNKS = 3
+TITLE_PREFIX = 'İstatistiksel_Tablolar_'
+
+
+def table_title(source: str) -> str:
+    """Dosya adını okunabilir bir tablo başlığına çevirir."""
+    title = os.path.splitext(source)[0]
+    if title.startswith(TITLE_PREFIX):
+        title = title[len(TITLE_PREFIX):]
+    return title.replace('_', ' ').strip()
+
+
+def table_descriptions(store, samples: int = SAMPLE_CHUNKS, sources: Optional[Iterable[str]] = None) -> Tuple[List[dict], List[str]]:
+    """
+    Chunk deposundaki her kaynak tablo (veya yalnızca `sources` tabloları) için yönlendirmede
+    kodlanacak açıklamayı oluşturur. Silinmiş chunk'lar ve yalnızca silinmiş chunk'ı kalan
+    tablolar atlanır.
+
+    Returns:
+        (tablo bilgileri, açıklama metinleri) ikilisi.
+    """
+    mask = np.asarray(store.deleted[:store.count]) == 0
+    if sources is not None:
+        sources = set(sources)
+        codes = [code for code, name in enumerate(store.sources) if name in sources]
+        mask &= np.isin(np.asarray(store.source_codes[:store.count]), codes)
+    live = np.flatnonzero(mask)
+    codes = np.asarray(store.source_codes[:store.count])[live]
+    # Satırları kaynak koduna göre kararlı sıralayıp her tablonun ilk chunk'larını al
+    order = np.argsort(codes, kind='stable')
+    boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+    tables, descriptions = [], []
+    for group in np.split(order, boundaries) if len(order) else []:
+        rows = live[group[:samples]]
+        metadata = store[int(rows[0])]['metadata']
+        source, category = metadata['source'], metadata.get('category', '')
+        parts = [f"Tablo: {table_title(source)}."]
+        if category:
+            parts.append(f"Kategori: {category}.")
+        parts.extend(store.text(int(row)) for row in rows)
+        tables.append({'source': source, 'category': category})
+        descriptions.append(" ".join(parts))
+    return tables, descriptions
+
+
+def build_table_router(store, encode_fn: Callable[[List[str]], np.ndarray], path: str = TABLE_ROUTER_DIR) -> int:
+    """
+    Tablo açıklamalarını kodlayıp yönlendirme indeksini diske yazar.
+
+    Returns:
+        İndekslenen tablo sayısı.
+    """
+    tables, descriptions = table_descriptions(store)
+    vectors = np.ascontiguousarray(encode_fn(descriptions), dtype='float32') if descriptions else np.empty((0, 0), dtype='float32')
+    _save_router(path, tables, vectors, store)
+    return len(tables)
+
+
+def append_table_router(
+    store, encode_fn: Callable[[List[str]], np.ndarray], changed_sources: Iterable[str], path: str = TABLE_ROUTER_DIR
+) -> int:
+    """
+    Mevcut yönlendirme indeksini `append_chunks` ile güncellenen depoya göre günceller:
+    yalnızca değişen (yeniden işlenen, eklenen veya silinen) tabloların satırları çıkarılıp
+    depoda kalanların açıklamaları yeniden kodlanır.
+
+    Returns:
+        İndekslenen tablo sayısı.
+    """
+    changed_sources = set(changed_sources)
+    with open(os.path.join(path, 'tables.json'), 'r', encoding='utf-8') as f:
+        old_tables = json.load(f)
+    keep = [i for i, table in enumerate(old_tables) if table['source'] not in changed_sources]
+    tables = [old_tables[i] for i in keep]
+    vectors = np.load(os.path.join(path, 'vectors.npy'))[keep] if keep else None
+    added, descriptions = table_descriptions(store, sources=changed_sources)
+    if descriptions:
+        new_vectors = np.ascontiguousarray(encode_fn(descriptions), dtype='float32')
+        vectors = new_vectors if vectors is None else np.concatenate([vectors, new_vectors])
+        tables.extend(added)
+    if vectors is None:
+        vectors = np.empty((0, 0), dtype='float32')
+    _save_router(path, tables, np.ascontiguousarray(vectors, dtype='float32'), store)
+    return len(tables)
+
+
+def _save_router(path: str, tables: List[dict], vectors: np.ndarray, store):
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, 'vectors.npy'), vectors)
+    with open(os.path.join(tmp_path, 'tables.json'), 'w', encoding='utf-8') as f:
+        json.dump(tables, f, ensure_ascii=False)
+    meta = {'build_id': store.build_id, 'count': store.count, 'tables': len(tables), 'dimension': int(vectors.shape[1]) if len(tables) else 0}
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmp_path, path)
+
+
+class TableRouter:
+    """Tablo vektörleri üzerinde tam tarama yapan yönlendirme indeksi."""
+
+    def __init__(self, path: str = TABLE_ROUTER_DIR):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, 'tables.json'), 'r', encoding='utf-8') as f:
+            self.tables = json.load(f)
+        vectors = np.load(os.path.join(path, 'vectors.npy'))
+        self.index = faiss.IndexFlatL2(self.meta['dimension'] or 1)
+        if len(self.tables):
+            self.index.add(vectors)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def route(self, queries: np.ndarray, n: int, category: Optional[str] = None) -> List[List[str]]:
+        """
+        Her sorgu için en yakın `n` tablonun dosya adlarını döndürür.
+
+        Args:
+            queries: (sorgu sayısı, boyut) float32 sorgu vektörleri.
+            n: Sorgu başına seçilecek tablo sayısı.
+            category: Verilirse yalnızca bu kategorideki tablolar arasından seçilir.
+        """
+        if not len(self.tables):
+            return [[] for _ in range(len(queries))]
+        search_params = None
+        if category is not None:
+            ids = np.array([i for i, table in enumerate(self.tables) if table['category'] == category], dtype='int64')
+            if not len(ids):
+                return [[] for _ in range(len(queries))]
+            # Seçici arama bitene kadar referanslı kalmalı
+            selector = faiss.IDSelectorBatch(ids)
+            search_params = faiss.SearchParameters(sel=selector)
+        _, indices = self.index.search(np.ascontiguousarray(queries, dtype='float32'), min(n, len(self.tables)), params=search_params)
+        return [[self.tables[i]['source'] for i in row if i >= 0] for row in indices]
+
+
+def routed_rows(store, tables: List[str], category: Optional[str] = None, fallback: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+    """Yönlendirilen tabloların (varsa kategori filtresine de uyan) chunk satırlarını döndürür; tablo yoksa `fallback`."""
+    if not tables:
+        return fallback
+    return np.concatenate([store.row_filter(category=category, source=table) for table in tables])
+
+
+def search_each(index: faiss.Index, params: Dict[str, Any], queries: np.ndarray, k: int, allowed_rows: List[Optional[np.ndarray]]) -> List[np.ndarray]:
+    """Her sorguyu kendi satır kümesi içinde ayrı ayrı arar (satır kümesi None ise tüm indekste)."""
+    indices = []
+    for query, allowed in zip(np.ascontiguousarray(queries, dtype='float32'), allowed_rows):
+        if allowed is None:
+            indices.append(index.search(query[None, :], k)[1][0])
+        else:
+            indices.append(filtered_search(index, params, query[None, :], k, allowed)[1][0])
+    return indices
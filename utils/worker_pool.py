@@ -0,0 +1,161 @@
+"""
+Kodlama ve aramayı birden fazla çekirdeğe yayan çalışan süreç havuzu.
+
+Tek bir süreçte embedding kodlaması ve FAISS/BM25 araması Python'un tek çekirdek sınırına
+takılır. Havuz N adet çalışan süreç başlatır; her süreç `factory(*args)` ile kendi arama
+nesnesini bir kez oluşturur ve görevler (`worker_call`) bu nesnenin metotlarını çağırır.
+
+    - Süreçler `spawn` ile başlatılır: ana süreçteki iş parçacıkları (yükleyiciler, dosya
+      izleyici) ve torch/OpenMP durumu kopyalanmaz.
+    - FAISS indeksi, chunk deposu, BM25 indeksi ve tam vektörler bellek eşlemeli açıldığından
+      tüm süreçler aynı dosyaların sayfa önbelleğini paylaşır; bellek N katına çıkmaz
+      (yalnızca embedding modeli her süreçte ayrı yüklenir).
+    - Her süreçte torch ve FAISS iş parçacığı sayısı `threads` ile sınırlanır; varsayılan
+      çekirdek sayısı / süreç sayısıdır, böylece süreçler çekirdekleri birbiriyle paylaşmaz.
+
+Havuz bir `Executor` olduğundan doğrudan `loop.run_in_executor` ile kullanılabilir. Bir süreç
+çökerse (`BrokenProcessPool`) `restart` havuzu aynı nesne üzerinde yeniden kurar; havuzu
+tutan kodun (örn. `BatchingEncoder`) değişmesi gerekmez.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+import faiss
+
+# Çalışan süreçte oluşturulan arama nesnesi ve başlangıç bariyeri
+_worker = None
+_barrier = None
+
+
+def default_threads(workers: int) -> int:
+    """Süreç başına iş parçacığı sayısı: çekirdekler süreçler arasında eşit bölünür."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def limit_threads(threads: int):
+    """Bu süreçteki FAISS (OpenMP) ve torch iş parçacığı sayısını sınırlar."""
+    faiss.omp_set_num_threads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _initialize(factory: Callable[..., Any], args: tuple, threads: int, barrier):
+    global _worker, _barrier
+    limit_threads(threads)
+    _barrier = barrier
+    _worker = factory(*args)
+
+
+def _ready() -> int:
+    # Her süreç bir görev alana kadar bekler: N görev ancak N ayrı süreçte aynı anda çalışabilir
+    _barrier.wait()
+    return os.getpid()
+
+
+def worker_call(method: str, *args):
+    """Çalışan süreçteki arama nesnesinin `method` metodunu çağırır."""
+    return getattr(_worker, method)(*args)
+
+
+class WorkerPool(Executor):
+    """Aynı arama nesnesini her biri kendi sürecinde tutan sabit boyutlu süreç havuzu."""
+
+    def __init__(self, workers: int, factory: Callable[..., Any], args: tuple = (), threads: Optional[int] = None, logger=None):
+        """
+        Args:
+            workers: Çalışan süreç sayısı.
+            factory: Çalışan süreçte arama nesnesini oluşturan, modül düzeyinde (pickle edilebilir) fonksiyon.
+            args: `factory` argümanları.
+            threads: Süreç başına torch/FAISS iş parçacığı sayısı (None: `default_threads`).
+        """
+        self.workers = workers
+        self.factory = factory
+        self.args = args
+        self.threads = threads or default_threads(workers)
+        self.logger = logger
+        self.pids: List[int] = []
+        self.restarts = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._restart_lock = threading.Lock()
+
+    def start(self) -> 'WorkerPool':
+        """
+        Süreçleri başlatır ve hepsi arama nesnesini oluşturana kadar bekler.
+
+        Raises:
+            BrokenProcessPool: Bir süreçte `factory` başarısız olursa.
+        """
+        context = multiprocessing.get_context('spawn')
+        self._executor = ProcessPoolExecutor(
+            self.workers, mp_context=context, initializer=_initialize,
+            initargs=(self.factory, self.args, self.threads, context.Barrier(self.workers)),
+        )
+        futures = [self._executor.submit(_ready) for _ in range(self.workers)]
+        try:
+            self.pids = [future.result() for future in futures]
+        except Exception:
+            # Bir süreç başlatılamazsa havuz kullanılamaz; kalan süreçler kapatılır
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        if self.logger:
+            self.logger.info(f"{self.workers} workers ready (pids: {self.pids}, {self.threads} threads each)")
+        return self
+
+    def is_broken(self) -> bool:
+        """Havuz başlatılmamışsa, kapatıldıysa veya bir süreci çöktüyse True."""
+        if self._executor is None:
+            return True
+        try:
+            # Bozuk havuz görevi beklemeden reddeder
+            self._executor.submit(os.getpid)
+        except (BrokenProcessPool, RuntimeError):
+            return True
+        return False
+
+    def restart(self, max_attempts: int = 3, backoff: float = 1.0) -> 'WorkerPool':
+        """
+        Bozulan havuzu kapatıp süreçleri yeniden başlatır; başarısız denemeler arasında üstel
+        olarak bekler. Aynı anda gelen çağrılardan yalnızca biri yeniden başlatır, diğerleri
+        onu bekler ve havuz artık sağlamsa hemen döner.
+
+        Raises:
+            BrokenProcessPool: `max_attempts` denemenin hepsinde süreçler başlatılamazsa.
+        """
+        with self._restart_lock:
+            if not self.is_broken():
+                return self
+            error = None
+            for attempt in range(max_attempts):
+                if attempt:
+                    time.sleep(backoff * (2 ** (attempt - 1)))
+                self.shutdown(wait=False, cancel_futures=True)
+                if self.logger:
+                    self.logger.warning(f"Restarting broken worker pool (attempt {attempt + 1}/{max_attempts})")
+                try:
+                    self.start()
+                except Exception as e:
+                    error = e
+                    continue
+                self.restarts += 1
+                return self
+            raise BrokenProcessPool(f"Worker pool could not be restarted after {max_attempts} attempts: {error}")
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if self._executor is None:
+            raise RuntimeError("Worker pool has not been started")
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def info(self) -> Dict[str, Any]:
+        return {'workers': self.workers, 'threads_per_worker': self.threads, 'pids': list(self.pids), 'restarts': self.restarts}